@@ -8,9 +8,19 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
+import threading
+import time
 
-from django.core.asgi import get_asgi_application
+started = time.perf_counter()
+
+from django.core.asgi import get_asgi_application  # noqa: E402
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "eco.settings")
 
 application = get_asgi_application()
+
+from ecommerce.warmup import warm_up  # noqa: E402
+
+# The server imports this module from its running event loop, where the
+# database cannot be used; /ecommerce/ready/ answers 503 until this is done.
+threading.Thread(target=warm_up, args=(started,), name="warm-up", daemon=True).start()
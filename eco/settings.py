@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 import os
 
@@ -47,6 +48,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "ecommerce.middleware.RequestStatsMiddleware",
+    "ecommerce.routers.PrimaryPinningMiddleware",
+    "django.middleware.gzip.GZipMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -54,6 +58,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "ecommerce.audit.AuditContextMiddleware",
+    "ecommerce.tenants.TenantMiddleware",
 ]
 
 ROOT_URLCONF = "eco.urls"
@@ -81,17 +87,165 @@ WSGI_APPLICATION = "eco.wsgi.application"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 # CHANGE IF NEEDED
+# Set DB_ENGINE=django.db.backends.sqlite3 and DB_NAME=<file> to run locally
+# (for example the benchmarks) without the docker-compose Postgres.
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
-        "NAME": "postgres",
-        "USER": "postgres",
-        "PASSWORD": "postgres",
-        "HOST": "localhost",
-        "PORT": "5435",
+        "ENGINE": os.getenv("DB_ENGINE", "django.db.backends.postgresql"),
+        "NAME": os.getenv("DB_NAME", "postgres"),
+        "USER": os.getenv("DB_USER", "postgres"),
+        "PASSWORD": os.getenv("DB_PASSWORD", "postgres"),
+        "HOST": os.getenv("DB_HOST", "localhost"),
+        "PORT": os.getenv("DB_PORT", "5435"),
     }
 }
 
+# Connection management, selected with DB_CONN_MODE:
+#   close      - open a new connection for every request (Django's default)
+#   persistent - keep connections for DB_CONN_MAX_AGE seconds and check
+#                they are still usable before reusing them
+#   pool       - psycopg 3 connection pool (requires psycopg[pool]); Django
+#                does not allow persistent connections together with a pool
+DB_CONN_MODE = os.getenv("DB_CONN_MODE", "persistent")
+if DB_CONN_MODE == "persistent":
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", 60))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif DB_CONN_MODE == "pool":
+    if DATABASES["default"]["ENGINE"] != "django.db.backends.postgresql":
+        raise ImproperlyConfigured("DB_CONN_MODE=pool needs the PostgreSQL backend.")
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        }
+    }
+elif DB_CONN_MODE != "close":
+    raise ImproperlyConfigured(
+        f"DB_CONN_MODE must be close, persistent or pool, not {DB_CONN_MODE!r}."
+    )
+
+# Read replicas, as a comma-separated DB_REPLICAS list of HOST[:PORT] entries
+# (or database file names with SQLite). Replicas share the primary's other
+# settings; tests read from the primary through TEST["MIRROR"].
+ECOMMERCE_READ_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(","))):
+    alias = f"replica{index + 1}"
+    config = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+    if "sqlite" in config["ENGINE"]:
+        config["NAME"] = replica
+    else:
+        config["HOST"], _, port = replica.partition(":")
+        config["PORT"] = port or config["PORT"]
+    DATABASES[alias] = config
+    ECOMMERCE_READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["ecommerce.routers.PrimaryReplicaRouter"]
+
+# Seconds a client keeps reading from the primary after it writes
+ECOMMERCE_PRIMARY_PIN_SECONDS = int(os.getenv("DB_PRIMARY_PIN_SECONDS", 5))
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    "DEFAULT_FILTER_BACKENDS": ["ecommerce.filters.QueryFilterBackend"],
+    "DEFAULT_PAGINATION_CLASS": "ecommerce.pagination.IdCursorPagination",
+    "PAGE_SIZE": int(os.getenv("PAGE_SIZE", 100)),
+    "DEFAULT_RENDERER_CLASSES": [
+        "ecommerce.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "ecommerce.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# Render and parse JSON with orjson when it is installed. Output is
+# byte-identical to DRF's JSONRenderer either way.
+ECOMMERCE_FAST_JSON = os.getenv("FAST_JSON", "true").lower() == "true"
+
+# Upper bound for the ?page_size= query parameter on list endpoints
+ECOMMERCE_MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 1000))
+
+# Reverse lookups report the planner's row estimate instead of an exact
+# count once the estimate reaches this many rows (PostgreSQL only)
+ECOMMERCE_EXACT_COUNT_THRESHOLD = int(os.getenv("EXACT_COUNT_THRESHOLD", 10000))
+
+
+# Effective-permission cache used by Person.get_permission_codes()
+# The process-local default is only invalidated in the process that made a
+# change, so with several workers a revoked permission is still granted by
+# the others for up to "timeout" seconds. Use
+# "ecommerce.cache.DjangoPermissionCache" with a shared CACHES alias (Redis,
+# Memcached) to invalidate across workers.
+
+ECOMMERCE_PERMISSION_CACHE = {
+    "BACKEND": "ecommerce.cache.LocMemPermissionCache",
+    "OPTIONS": {
+        "max_entries": 10000,
+        "timeout": float(os.getenv("PERMISSION_CACHE_TIMEOUT", 5)),
+    },
+}
+
+# Maintain the ecommerce_personpermission table of effective permissions.
+# Run "manage.py rebuild_person_permissions" after turning this on.
+ECOMMERCE_MATERIALIZE_PERMISSIONS = (
+    os.getenv("MATERIALIZE_PERMISSIONS", "false").lower() == "true"
+)
+
+
+# Per-endpoint request statistics collected by RequestStatsMiddleware.
+# The /ecommerce/stats/ endpoint is only served when EXPOSE_STATS is on.
+ECOMMERCE_REQUEST_STATS = {
+    "WINDOW": 1000,
+    "DUPLICATE_THRESHOLD": 3,
+    "EXPOSE_STATS": os.getenv("EXPOSE_STATS", str(DEBUG)).lower() == "true",
+}
+
+
+# Append every RBAC change to the log served by /ecommerce/changes/?since=
+ECOMMERCE_CHANGE_FEED = os.getenv("CHANGE_FEED", "true").lower() == "true"
+
+
+# Audit trail of RBAC changes, served at /ecommerce/audit/. Events are queued
+# after commit and written in batches by a background thread.
+ECOMMERCE_AUDIT = {
+    "ENABLED": os.getenv("AUDIT", "true").lower() == "true",
+    "BACKGROUND": True,
+    "BATCH_SIZE": int(os.getenv("AUDIT_BATCH_SIZE", 500)),
+    "FLUSH_INTERVAL": float(os.getenv("AUDIT_FLUSH_INTERVAL", 1.0)),
+    "QUEUE_SIZE": int(os.getenv("AUDIT_QUEUE_SIZE", 10000)),
+    "PUT_TIMEOUT": 0.05,
+}
+
+
+# Thread pool that hashes and verifies person passwords. Logins beyond
+# MAX_PENDING concurrent hashes get a 503 instead of queueing.
+ECOMMERCE_PASSWORD_HASHING = {
+    "WORKERS": int(os.getenv("HASH_WORKERS", os.cpu_count() or 1)),
+    "MAX_PENDING": int(os.getenv("HASH_MAX_PENDING", 4 * (os.cpu_count() or 1))),
+    "TIMEOUT": float(os.getenv("HASH_TIMEOUT", 5.0)),
+}
+
+
+# Requests act as the tenant whose id is in this header, which the gateway
+# in front of the API sets; see ecommerce.tenants
+ECOMMERCE_TENANCY = {
+    "HEADER": os.getenv("TENANT_HEADER", "X-Tenant"),
+    "DEFAULT_TENANT": int(os.getenv("DEFAULT_TENANT", 1)),
+}
+
+
+# Steps run by eco/wsgi.py and eco/asgi.py before a worker reports ready at
+# /ecommerce/ready/, see ecommerce.warmup.DEFAULT_WARMUP
+ECOMMERCE_WARMUP = {
+    "ENABLED": os.getenv("WARMUP", "true").lower() == "true",
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -0,0 +1,145 @@
+from collections import defaultdict
+
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+
+from ecommerce import versioning
+from ecommerce.models import Person, Role
+
+ADDED = "added"
+REMOVED = "removed"
+ALREADY_PRESENT = "already_present"
+NOT_PRESENT = "not_present"
+NOT_FOUND = "not_found"
+
+
+class Relation:
+    """Set-based access to the through table of a many-to-many field."""
+
+    def __init__(self, field):
+        self.through = field.remote_field.through
+        self.source_model = field.model
+        self.target_model = field.related_model
+        self.source = f"{field.m2m_field_name()}_id"
+        self.target = f"{field.m2m_reverse_field_name()}_id"
+        # Rows of a relation between rows of the same model, like
+        # Role.includes, are inserted one source at a time so the receivers
+        # validating each addition see the rows added before it.
+        self.recursive = self.source_model is self.target_model
+
+    def existing_ids(self, model, ids, using):
+        queryset = model.objects.using(using).filter(pk__in=ids)
+        return set(queryset.values_list("pk", flat=True))
+
+    def existing_rows(self, pairs, using):
+        rows = (
+            self.through.objects.using(using)
+            .filter(
+                **{
+                    f"{self.source}__in": {source for source, _ in pairs},
+                    f"{self.target}__in": {target for _, target in pairs},
+                }
+            )
+            .values_list("pk", self.source, self.target)
+        )
+        return {(source, target): pk for pk, source, target in rows}
+
+    def send(self, action, instance, target_ids, using):
+        # Direct through-table writes bypass the related manager, so emit the
+        # same m2m_changed signals it would to keep the cache invalidation in
+        # ecommerce.signals working. Receivers may stash state on the
+        # instance between pre_* and post_*, so both get the same object.
+        # ``verified`` tells them that ``pk_set`` only holds rows that exist,
+        # so pre_remove needs no lookup per source.
+        m2m_changed.send(
+            sender=self.through,
+            action=action,
+            instance=instance,
+            reverse=False,
+            model=self.target_model,
+            pk_set=set(target_ids),
+            using=using,
+            verified=True,
+        )
+
+    def classify(self, pairs, present, missing_status, using):
+        sources = self.existing_ids(self.source_model, {s for s, _ in pairs}, using)
+        targets = self.existing_ids(self.target_model, {t for _, t in pairs}, using)
+        valid = [(s, t) for s, t in pairs if s in sources and t in targets]
+        existing = self.existing_rows(valid, using) if valid else {}
+
+        statuses = []
+        changes = {}
+        for pair in pairs:
+            source, target = pair
+            if source not in sources or target not in targets:
+                statuses.append(NOT_FOUND)
+            elif pair in changes or (pair in existing) != present:
+                statuses.append(missing_status)
+            else:
+                statuses.append(None)
+                changes[pair] = existing.get(pair)
+        return statuses, changes
+
+    def add(self, pairs):
+        """Insert the given (source id, target id) pairs.
+
+        Returns one status per pair: ``added``, ``already_present`` or
+        ``not_found`` when either id does not exist.
+        """
+        using = router.db_for_write(self.through)
+        with transaction.atomic(using=using), versioning.batch():
+            statuses, changes = self.classify(pairs, False, ALREADY_PRESENT, using)
+            by_source = group_by_source(changes)
+            if self.recursive:
+                batches = [{source: targets} for source, targets in by_source.items()]
+            else:
+                batches = [by_source]
+            for batch in batches:
+                self.insert(batch, using)
+        return [status or ADDED for status in statuses]
+
+    def insert(self, by_source, using):
+        instances = {source: self.source_model(pk=source) for source in by_source}
+        for source, targets in by_source.items():
+            self.send("pre_add", instances[source], targets, using)
+        self.through.objects.using(using).bulk_create(
+            [
+                self.through(**{self.source: source, self.target: target})
+                for source, targets in by_source.items()
+                for target in targets
+            ],
+            ignore_conflicts=True,
+        )
+        for source, targets in by_source.items():
+            self.send("post_add", instances[source], targets, using)
+
+    def remove(self, pairs):
+        """Delete the given (source id, target id) pairs.
+
+        Returns one status per pair: ``removed``, ``not_present`` or
+        ``not_found`` when either id does not exist.
+        """
+        using = router.db_for_write(self.through)
+        with transaction.atomic(using=using), versioning.batch():
+            statuses, changes = self.classify(pairs, True, NOT_PRESENT, using)
+            by_source = group_by_source(changes)
+            instances = {source: self.source_model(pk=source) for source in by_source}
+            for source, targets in by_source.items():
+                self.send("pre_remove", instances[source], targets, using)
+            self.through.objects.using(using).filter(pk__in=changes.values()).delete()
+            for source, targets in by_source.items():
+                self.send("post_remove", instances[source], targets, using)
+        return [status or REMOVED for status in statuses]
+
+
+def group_by_source(pairs):
+    grouped = defaultdict(list)
+    for source, target in pairs:
+        grouped[source].append(target)
+    return grouped
+
+
+role_permissions = Relation(Role._meta.get_field("permissions"))
+role_includes = Relation(Role._meta.get_field("includes"))
+person_roles = Relation(Person._meta.get_field("roles"))
@@ -0,0 +1,136 @@
+import json
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.settings import api_settings
+
+from ecommerce import passwords
+from ecommerce.cache import aget_permission_codes_for_persons
+from ecommerce.models import Permission, Person, Role
+from ecommerce.serializers import LoginSerializer, PermissionCheckSerializer
+
+# Read-only endpoints served natively under ASGI. DRF views are sync-only, so
+# these are plain Django async views using the async ORM; response bodies
+# match the DRF serializers of the equivalent sync endpoints.
+
+PERMISSION_FIELDS = ("id", "code", "name", "bit")
+
+
+def bad_request(errors):
+    return JsonResponse(errors, status=400)
+
+
+def get_page_size(request):
+    try:
+        page_size = int(request.GET.get("page_size", api_settings.PAGE_SIZE))
+    except ValueError:
+        page_size = api_settings.PAGE_SIZE
+    return max(1, min(page_size, settings.ECOMMERCE_MAX_PAGE_SIZE))
+
+
+@require_GET
+async def permission_list(request):
+    """Keyset-paginated permissions: ``?after=<id>&page_size=<n>``."""
+    try:
+        after = int(request.GET.get("after", 0))
+    except ValueError:
+        return bad_request({"after": ["A valid integer is required."]})
+    page_size = get_page_size(request)
+
+    queryset = Permission.objects.filter(pk__gt=after).order_by("pk")
+    rows = [row async for row in queryset.values(*PERMISSION_FIELDS)[: page_size + 1]]
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        query = request.GET.copy()
+        query["after"] = rows[-1]["id"]
+        next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+    return JsonResponse({"next": next_url, "results": rows})
+
+
+@require_GET
+async def permission_detail(request, pk):
+    row = await Permission.objects.filter(pk=pk).values(*PERMISSION_FIELDS).afirst()
+    if row is None:
+        raise Http404
+    return JsonResponse(row)
+
+
+@require_GET
+async def role_detail(request, pk):
+    row = await Role.objects.filter(pk=pk).values("id", "name").afirst()
+    if row is None:
+        raise Http404
+    permissions = Role.permissions.through.objects.filter(role_id=pk)
+    row["permissions"] = [
+        permission_id
+        async for permission_id in permissions.order_by("permission_id").values_list(
+            "permission_id", flat=True
+        )
+    ]
+    includes = Role.includes.through.objects.filter(from_role_id=pk)
+    row["includes"] = [
+        role_id
+        async for role_id in includes.order_by("to_role_id").values_list(
+            "to_role_id", flat=True
+        )
+    ]
+    return JsonResponse(row)
+
+
+@require_GET
+async def person_detail(request, pk):
+    row = await Person.objects.filter(pk=pk).values("id", "name", "email").afirst()
+    if row is None:
+        raise Http404
+    through = Person.roles.through.objects.filter(person_id=pk)
+    row["roles"] = [
+        role_id
+        async for role_id in through.order_by("role_id").values_list(
+            "role_id", flat=True
+        )
+    ]
+    return JsonResponse(row)
+
+
+@csrf_exempt
+@require_POST
+async def permission_check(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return bad_request({"detail": "JSON parse error."})
+    serializer = PermissionCheckSerializer(data=data)
+    if not serializer.is_valid():
+        return bad_request(serializer.errors)
+    person_ids = serializer.validated_data["person_ids"]
+    codes = serializer.validated_data["codes"]
+
+    codes_by_person = await aget_permission_codes_for_persons(person_ids)
+    matrix = [[code in codes_by_person[pk] for code in codes] for pk in person_ids]
+    return JsonResponse({"person_ids": person_ids, "codes": codes, "matrix": matrix})
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    # The hash runs on the hashing pool; this coroutine holds no thread while
+    # it waits.
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return bad_request({"detail": "JSON parse error."})
+    serializer = LoginSerializer(data=data)
+    if not serializer.is_valid():
+        return bad_request(serializer.errors)
+    try:
+        person = await passwords.aauthenticate(**serializer.validated_data)
+    except passwords.PoolBusy as error:
+        response = JsonResponse({"detail": error.detail}, status=error.status_code)
+        response["Retry-After"] = str(error.wait)
+        return response
+    if person is None:
+        return JsonResponse({"detail": "Invalid email or password."}, status=401)
+    return JsonResponse({"id": person.id, "name": person.name, "email": person.email})
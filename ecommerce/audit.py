@@ -0,0 +1,217 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Audit trail of changes to the RBAC graph. Events are captured from the model
+# and M2M signals, queued in process once the change commits, and written with
+# bulk_create by a background thread, so a write request never waits for an
+# audit insert. The queue is bounded: when writers outpace the database, the
+# request that finds it full writes a batch itself instead of growing memory
+# or dropping events.
+
+DEFAULT_AUDIT = {
+    "ENABLED": True,
+    # Write from a background thread; otherwise call flush() explicitly or
+    # let full batches be written by the requests that queue them.
+    "BACKGROUND": True,
+    "BATCH_SIZE": 500,
+    # Seconds a partial batch may wait before it is written
+    "FLUSH_INTERVAL": 1.0,
+    "QUEUE_SIZE": 10000,
+    # Seconds a request waits for room in a full queue before writing a
+    # batch itself
+    "PUT_TIMEOUT": 0.05,
+}
+
+_request = ContextVar("ecommerce_audit_request", default=None)
+
+
+def get_config():
+    return {**DEFAULT_AUDIT, **getattr(settings, "ECOMMERCE_AUDIT", {})}
+
+
+def is_enabled():
+    return get_config()["ENABLED"]
+
+
+def get_actor():
+    """Return (actor, remote address) for the current request, if any."""
+    request = _request.get()
+    if request is None:
+        return "", None
+    user = getattr(request, "user", None)
+    actor = user.get_username() if user is not None and user.is_authenticated else ""
+    return actor, request.META.get("REMOTE_ADDR") or None
+
+
+class AuditWriter:
+    def __init__(self, batch_size, flush_interval, queue_size, put_timeout):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        # Also restarts the thread in workers forked after it started.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self.run, name="ecommerce-audit", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, event, background=True):
+        if background:
+            self.start()
+        try:
+            self.queue.put(event, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure: make room by writing a batch from this thread.
+            self.write(self.drain())
+            self.queue.put(event)
+        if not background and self.queue.qsize() >= self.batch_size:
+            self.write(self.drain())
+
+    def drain(self):
+        events = []
+        while len(events) < self.batch_size:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def collect(self):
+        """Wait for a batch that is full or has waited FLUSH_INTERVAL."""
+        events = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(events) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                events.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return events
+
+    def write(self, events):
+        from ecommerce.models import AuditEvent
+
+        if events:
+            AuditEvent.objects.using(DEFAULT_DB_ALIAS).bulk_create(events)
+
+    def flush(self):
+        """Write every queued event from the calling thread."""
+        while events := self.drain():
+            self.write(events)
+
+    def run(self):
+        while True:
+            events = self.collect()
+            try:
+                self.write(events)
+            except Exception:
+                logger.exception("Failed to write %d audit events", len(events))
+            finally:
+                # This thread never sees request_finished.
+                close_old_connections()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = get_config()
+                _writer = AuditWriter(
+                    batch_size=config["BATCH_SIZE"],
+                    flush_interval=config["FLUSH_INTERVAL"],
+                    queue_size=config["QUEUE_SIZE"],
+                    put_timeout=config["PUT_TIMEOUT"],
+                )
+    return _writer
+
+
+def reset_writer(**kwargs):
+    global _writer
+    if kwargs.get("setting", "ECOMMERCE_AUDIT") == "ECOMMERCE_AUDIT":
+        _writer = None
+
+
+setting_changed.connect(reset_writer)
+
+
+def flush():
+    if _writer is not None:
+        _writer.flush()
+
+
+atexit.register(flush)
+
+
+def record(action, target, relation="", related_ids=()):
+    """Queue an event for ``target`` once the current transaction commits."""
+    from ecommerce.models import AuditEvent
+
+    actor, remote_addr = get_actor()
+    event = AuditEvent(
+        tenant_id=target.tenant_id,
+        created_at=timezone.now(),
+        actor=actor,
+        remote_addr=remote_addr,
+        action=action,
+        target_type=target._meta.model_name,
+        target_id=target.pk,
+        relation=relation,
+        related_ids=sorted(related_ids),
+    )
+    background = get_config()["BACKGROUND"]
+    transaction.on_commit(lambda: get_writer().put(event, background))
+
+
+class AuditContextMiddleware:
+    """Make the current request available to record() for the actor."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+
+    async def __acall__(self, request):
+        token = _request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request.reset(token)
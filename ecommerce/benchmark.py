@@ -0,0 +1,258 @@
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from ecommerce.cache import (
+    get_permission_cache,
+    invalidate_persons,
+    invalidate_roles,
+    person_key,
+)
+from ecommerce.middleware import percentile
+from ecommerce.models import Permission, Person, Role
+
+# Each case is a callable taking a random generator and performing one
+# operation. Cases are timed one call at a time so the results include
+# p50/p99 latency as well as throughput.
+#
+# The test client keeps its database connection open across requests, so
+# every call is wrapped in the request_started/request_finished signals a
+# real server sends. That applies the configured connection management
+# (DB_CONN_MODE) and makes connection setup part of the measured latency.
+
+
+LOGIN_EMAIL = "login@bench.example"
+LOGIN_PASSWORD = "benchmark password"
+DEFAULT_LOGIN_COSTS = (
+    PBKDF2PasswordHasher.iterations // 10,
+    PBKDF2PasswordHasher.iterations,
+)
+
+
+class BenchmarkPasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 with the iteration count of the login case being measured."""
+
+    iterations = PBKDF2PasswordHasher.iterations
+
+
+def id_sample(model, size, rng):
+    # Probe random ids in the key range rather than ORDER BY random(), which
+    # sorts the whole table.
+    bounds = model.objects.aggregate(low=Min("pk"), high=Max("pk"))
+    if bounds["low"] is None:
+        raise ValueError(f"No {model._meta.verbose_name_plural} to benchmark.")
+    probes = {rng.randint(bounds["low"], bounds["high"]) for _ in range(size)}
+    ids = list(model.objects.filter(pk__in=probes).values_list("pk", flat=True))
+    if not ids:
+        ids = [bounds["low"]]
+    return lambda: rng.choice(ids)
+
+
+def build_cases(client, rng, sample_size=1000, check_batch=100):
+    permission_id = id_sample(Permission, sample_size, rng)
+    role_id = id_sample(Role, sample_size, rng)
+    person_id = id_sample(Person, sample_size, rng)
+    codes = list(Permission.objects.values_list("code", flat=True)[:sample_size])
+
+    def get(name, **kwargs):
+        return lambda: client.get(reverse(name, kwargs=kwargs or None))
+
+    def check():
+        data = {
+            "person_ids": [person_id() for _ in range(check_batch)],
+            "codes": rng.sample(codes, min(len(codes), 5)),
+        }
+        return client.post(
+            reverse("permission-check"), data, content_type="application/json"
+        )
+
+    def ping():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+    def cold_codes():
+        # Drop only the entries this lookup reads; clearing the whole cache
+        # would also be measured and would evict other users' entries.
+        pk = person_id()
+        entry = get_permission_cache().get_many([person_key(pk)]).get(person_key(pk))
+        if entry is not None:
+            invalidate_roles(entry[1])
+        invalidate_persons([pk])
+        return Person(pk=pk).get_permission_codes()
+
+    return {
+        "permission-list": get("permission-list"),
+        "permission-detail": lambda: get("permission-detail", pk=permission_id())(),
+        "role-list": get("role-list"),
+        "role-detail": lambda: get("role-detail", pk=role_id())(),
+        "person-list": get("person-list"),
+        "person-detail": lambda: get("person-detail", pk=person_id())(),
+        "permission-check": check,
+        "connection": ping,
+        "Person.get_permissions": lambda: list(
+            Person(pk=person_id()).get_permissions()
+        ),
+        "Person.get_permission_codes[cold]": cold_codes,
+        "Person.get_permission_codes[warm]": lambda: Person(
+            pk=person_id()
+        ).get_permission_codes(),
+    }
+
+
+def request_cycle(case):
+    # Inside a transaction (as under the test runner) request_finished would
+    # drop the connection, so there is no cycle to emulate.
+    if connection.in_atomic_block:
+        return case
+
+    def call():
+        request_started.send(sender=__name__)
+        try:
+            return case()
+        finally:
+            request_finished.send(sender=__name__)
+
+    return call
+
+
+def connection_info():
+    config = connection.settings_dict
+    return {
+        "conn_max_age": config["CONN_MAX_AGE"],
+        "health_checks": config["CONN_HEALTH_CHECKS"],
+        "pool": config["OPTIONS"].get("pool"),
+    }
+
+
+def measure(case, iterations, warmup):
+    case = request_cycle(case)
+    for _ in range(warmup):
+        case()
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = case()
+        timings.append((time.perf_counter() - start) * 1000)
+        status_code = getattr(response, "status_code", 200)
+        if status_code >= 400:
+            raise RuntimeError(f"Benchmark request failed with {status_code}")
+    elapsed = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "throughput_per_s": iterations / elapsed if elapsed else None,
+        "mean_ms": sum(timings) / len(timings),
+        "p50_ms": percentile(timings, 0.50),
+        "p99_ms": percentile(timings, 0.99),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def login_case(client):
+    def login():
+        data = {"email": LOGIN_EMAIL, "password": LOGIN_PASSWORD}
+        return client.post(reverse("login"), data, content_type="application/json")
+
+    return login
+
+
+def measure_logins(client, costs, iterations, warmup, only=None, log=None):
+    """Measure the login endpoint with passwords hashed at each PBKDF2 cost.
+
+    The cost is also the configured one, so no login upgrades the hash.
+    """
+    results = {}
+    costs = [cost for cost in costs if not only or f"login[pbkdf2={cost}]" in only]
+    if not costs:
+        return results
+    person = Person.objects.create(name="Login benchmark", email=LOGIN_EMAIL)
+    try:
+        hashers = ["ecommerce.benchmark.BenchmarkPasswordHasher"]
+        with override_settings(PASSWORD_HASHERS=hashers):
+            for cost in costs:
+                BenchmarkPasswordHasher.iterations = cost
+                Person.objects.filter(pk=person.pk).update(
+                    password=make_password(LOGIN_PASSWORD)
+                )
+                name = f"login[pbkdf2={cost}]"
+                results[name] = measure(login_case(client), iterations, warmup)
+                log(f"{name}: p50={results[name]['p50_ms']:.2f}ms")
+    finally:
+        BenchmarkPasswordHasher.iterations = PBKDF2PasswordHasher.iterations
+        person.delete()
+    return results
+
+
+def run(
+    iterations=200,
+    warmup=20,
+    seed=0,
+    only=None,
+    host="localhost",
+    login_costs=DEFAULT_LOGIN_COSTS,
+    log=None,
+):
+    """Run every benchmark case and return a JSON-serialisable report."""
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    client = Client(HTTP_HOST=host)
+    cases = build_cases(client, rng)
+    results = {}
+    for name, case in cases.items():
+        if only and name not in only:
+            continue
+        results[name] = measure(case, iterations, warmup)
+        log(f"{name}: p50={results[name]['p50_ms']:.2f}ms")
+    results.update(measure_logins(client, login_costs, iterations, warmup, only, log))
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "database": connection.vendor,
+            "connections": connection_info(),
+            "python": platform.python_version(),
+            "iterations": iterations,
+            "seed": seed,
+            "dataset": {
+                "permissions": Permission.objects.count(),
+                "roles": Role.objects.count(),
+                "persons": Person.objects.count(),
+                "person_roles": Person.roles.through.objects.count(),
+                "role_permissions": Role.permissions.through.objects.count(),
+            },
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current):
+    """Yield (case, baseline p50, current p50, relative change) rows."""
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"]
+        yield name, before["p50_ms"], result["p50_ms"], change
+
+
+def load(path):
+    with open(path) as handle:
+        return json.load(handle)
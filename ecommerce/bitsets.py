@@ -0,0 +1,136 @@
+import base64
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from ecommerce.tenants import get_current_tenant_id
+from ecommerce.cache import (
+    get_codes_for_roles,
+    get_permission_cache,
+    get_permission_codes_for_persons,
+)
+
+# Effective permissions as an int with bit ``Permission.bit`` set for every
+# permission held. Masks are serialised as unpadded base64url of the
+# little-endian bytes so downstream services can authorise offline with
+# ``has_bit(decode_mask(value), bit)``. Bits come from a counter that only
+# moves forward, so the bit of a deleted permission is never handed out again
+# and masks issued earlier can never grant a newer permission.
+#
+# Bits are allocated per tenant, so a tenant's masks only grow with its own
+# catalog. Catalogs are cached per tenant; code running outside any tenant
+# uses DEFAULT_TENANT's.
+
+CATALOG_KEY = "catalog:bits"
+
+BIT_COUNTER = "ecommerce.permission.bits"
+
+
+def catalog_key(tenant_id):
+    return f"{CATALOG_KEY}:{tenant_id}"
+
+
+def allocate_bits(tenant_id, count):
+    """Reserve ``count`` consecutive bits of a tenant and return the first one."""
+    from ecommerce.models import Permission, ResourceVersion
+
+    # Like versioning.allocate_versions(): the counter update holds a row lock
+    # until commit, so concurrent allocations never overlap.
+    now = timezone.now()
+    name = f"{BIT_COUNTER}:{tenant_id}"
+    with transaction.atomic():
+        rows = ResourceVersion.objects.filter(name=name)
+        if not rows.update(version=F("version") + count, updated_at=now):
+            # First allocation: continue after the bits already in use.
+            highest = Permission.all_tenants.filter(tenant_id=tenant_id).aggregate(
+                Max("bit")
+            )["bit__max"]
+            ResourceVersion.objects.get_or_create(
+                name=name,
+                defaults={
+                    "version": 0 if highest is None else highest + 1,
+                    "updated_at": now,
+                },
+            )
+            rows.update(version=F("version") + count, updated_at=now)
+        return rows.values_list("version", flat=True).get() - count
+
+
+def assign_missing_bits(tenant_id):
+    from ecommerce.models import Permission
+
+    with transaction.atomic():
+        missing = list(
+            Permission.all_tenants.select_for_update()
+            .filter(tenant_id=tenant_id, bit__isnull=True)
+            .order_by("pk")
+        )
+        if not missing:
+            return
+        first_bit = allocate_bits(tenant_id, len(missing))
+        for offset, permission in enumerate(missing):
+            permission.bit = first_bit + offset
+        Permission.all_tenants.bulk_update(missing, ["bit"])
+
+
+def get_permission_bits():
+    """Map every permission code of the active tenant to its bit position."""
+    from ecommerce.models import Permission
+
+    cache = get_permission_cache()
+    tenant_id = get_current_tenant_id()
+    key = catalog_key(tenant_id)
+    bits = cache.get_many([key]).get(key)
+    if bits is None:
+        # Read from the primary so the cached catalog is never stale.
+        permissions = Permission.all_tenants.using(DEFAULT_DB_ALIAS).filter(
+            tenant_id=tenant_id
+        )
+        if permissions.filter(bit__isnull=True).exists():
+            assign_missing_bits(tenant_id)
+        bits = dict(permissions.values_list("code", "bit"))
+        cache.set_many({key: bits})
+    return bits
+
+
+def invalidate_permission_bits(tenant_id):
+    get_permission_cache().delete_many([catalog_key(tenant_id)])
+
+
+def mask_for_codes(codes, bits):
+    mask = 0
+    for code in codes:
+        if code in bits:
+            mask |= 1 << bits[code]
+    return mask
+
+
+def get_masks_for_roles(role_ids):
+    bits = get_permission_bits()
+    return {
+        pk: mask_for_codes(codes, bits)
+        for pk, codes in get_codes_for_roles(role_ids).items()
+    }
+
+
+def get_masks_for_persons(person_ids):
+    bits = get_permission_bits()
+    return {
+        pk: mask_for_codes(codes, bits)
+        for pk, codes in get_permission_codes_for_persons(person_ids).items()
+    }
+
+
+def has_bit(mask, bit):
+    return bool(mask & (1 << bit))
+
+
+def encode_mask(mask):
+    raw = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_mask(value):
+    raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+    return int.from_bytes(raw, "little")
@@ -0,0 +1,331 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.module_loading import import_string
+
+from ecommerce.tenants import current_tenant
+
+# Effective permissions are cached in two layers so that invalidation stays
+# precise and cheap:
+#   person:<id> -> (tenant id, frozenset of role ids held by the person)
+#   role:<id>   -> frozenset of permission codes granted by the role,
+#                  including those of the roles it includes
+# Changing a role's permissions only drops that role's entry instead of the
+# entries of every person holding it. Entries are shared by all tenants; a
+# person of another tenant than the active one holds no roles.
+#
+# Invalidation only reaches the cache of the process that made the change.
+# With several worker processes, use DjangoPermissionCache on a shared CACHES
+# alias (Redis, Memcached); the process-local default keeps entries for
+# TIMEOUT seconds only, so other workers serve a revoked permission or a
+# stale bit catalog for at most that long.
+
+DEFAULT_PERMISSION_CACHE = {
+    "BACKEND": "ecommerce.cache.LocMemPermissionCache",
+    "OPTIONS": {"max_entries": 10000, "timeout": 5},
+}
+
+
+def person_key(person_id):
+    return f"person:{person_id}"
+
+
+def role_key(role_id):
+    return f"role:{role_id}"
+
+
+class BasePermissionCache:
+    def get_many(self, keys):
+        raise NotImplementedError
+
+    def set_many(self, mapping):
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocMemPermissionCache(BasePermissionCache):
+    """Process-local cache with least-recently-used eviction.
+
+    Only suitable for a single process unless ``timeout`` bounds how long
+    other processes may serve entries invalidated elsewhere.
+    """
+
+    def __init__(self, max_entries=10000, timeout=None):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if key not in self._data:
+                    continue
+                expires, value = self._data[key]
+                if expires is not None and expires <= now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, mapping):
+        expires = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = (expires, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoPermissionCache(BasePermissionCache):
+    """Stores entries in one of the caches configured in ``CACHES``.
+
+    Keys carry a generation number kept in the same cache. The alias may be
+    shared with other users, so clear() moves to a new generation instead of
+    clearing the backend; entries of old generations are left to expire.
+    """
+
+    def __init__(self, alias="default", timeout=None, key_prefix="ecommerce:perm"):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def generation_key(self):
+        return f"{self.key_prefix}:generation"
+
+    def _start_generation(self):
+        # Seeded from the clock so an evicted generation key never brings
+        # back the entries of an earlier generation.
+        self.cache.add(self.generation_key, time.time_ns(), timeout=None)
+
+    def _generation(self):
+        generation = self.cache.get(self.generation_key)
+        if generation is None:
+            self._start_generation()
+            generation = self.cache.get(self.generation_key)
+        return generation
+
+    def _keys(self, keys):
+        prefix = f"{self.key_prefix}:{self._generation()}"
+        return {key: f"{prefix}:{key}" for key in keys}
+
+    def get_many(self, keys):
+        keys = self._keys(keys)
+        found = self.cache.get_many(keys.values())
+        return {key: found[full] for key, full in keys.items() if full in found}
+
+    def set_many(self, mapping):
+        keys = self._keys(mapping)
+        self.cache.set_many(
+            {keys[key]: value for key, value in mapping.items()},
+            timeout=self.timeout,
+        )
+
+    def delete_many(self, keys):
+        self.cache.delete_many(self._keys(keys).values())
+
+    def clear(self):
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            self._start_generation()
+
+
+_permission_cache = None
+_permission_cache_lock = threading.Lock()
+
+
+def get_permission_cache():
+    global _permission_cache
+    if _permission_cache is None:
+        with _permission_cache_lock:
+            if _permission_cache is None:
+                config = getattr(
+                    settings, "ECOMMERCE_PERMISSION_CACHE", DEFAULT_PERMISSION_CACHE
+                )
+                backend = import_string(config["BACKEND"])
+                _permission_cache = backend(**config.get("OPTIONS", {}))
+    return _permission_cache
+
+
+def reset_permission_cache(**kwargs):
+    global _permission_cache
+    if kwargs.get("setting", "ECOMMERCE_PERMISSION_CACHE") == (
+        "ECOMMERCE_PERMISSION_CACHE"
+    ):
+        _permission_cache = None
+
+
+setting_changed.connect(reset_permission_cache)
+
+
+def _split(cache, ids, make_key):
+    ids = set(ids)
+    cached = cache.get_many(make_key(pk) for pk in ids)
+    result = {}
+    missing = set()
+    for pk in ids:
+        key = make_key(pk)
+        if key in cached:
+            result[pk] = cached[key]
+        else:
+            missing.add(pk)
+    return result, missing
+
+
+def _store(cache, missing, rows, make_key):
+    loaded = {pk: set() for pk in missing}
+    for pk, value in rows:
+        loaded[pk].add(value)
+    loaded = {pk: frozenset(values) for pk, values in loaded.items()}
+    cache.set_many({make_key(pk): value for pk, value in loaded.items()})
+    return loaded
+
+
+# Cache fills always read from the primary: a lagging replica would put stale
+# entries back right after a write invalidated them.
+def _person_role_rows(person_ids):
+    from ecommerce.models import PersonRole
+
+    # Read across tenants: an entry filled by another tenant's request must
+    # still be right for the person's own tenant.
+    return (
+        PersonRole.all_tenants.using(DEFAULT_DB_ALIAS)
+        .filter(person_id__in=person_ids)
+        .values_list("person_id", "role_id", "tenant_id")
+    )
+
+
+def _store_persons(cache, missing, rows):
+    role_ids = {pk: set() for pk in missing}
+    tenants = {}
+    for pk, role_id, tenant_id in rows:
+        role_ids[pk].add(role_id)
+        tenants[pk] = tenant_id
+    # Persons without roles have no tenant here, which is fine as they hold
+    # nothing whichever tenant asks.
+    loaded = {pk: (tenants.get(pk), frozenset(ids)) for pk, ids in role_ids.items()}
+    cache.set_many({person_key(pk): value for pk, value in loaded.items()})
+    return loaded
+
+
+def _visible_roles(entries):
+    tenant_id = current_tenant.get()
+    return {
+        pk: roles if tenant_id is None or owner in (None, tenant_id) else frozenset()
+        for pk, (owner, roles) in entries.items()
+    }
+
+
+def _role_code_rows(role_ids):
+    from ecommerce.models import Role
+
+    # A role grants the permissions of every role it includes, itself among
+    # them through its closure self link.
+    return (
+        Role.permissions.through.objects.using(DEFAULT_DB_ALIAS)
+        .filter(role__ancestor_links__ancestor_id__in=role_ids)
+        .values_list("role__ancestor_links__ancestor_id", "permission__code")
+    )
+
+
+def _combine(role_ids_by_person, codes_by_role):
+    return {
+        pk: frozenset().union(*(codes_by_role[role_id] for role_id in role_ids))
+        for pk, role_ids in role_ids_by_person.items()
+    }
+
+
+def get_role_ids_for_persons(person_ids):
+    cache = get_permission_cache()
+    result, missing = _split(cache, person_ids, person_key)
+    if missing:
+        rows = _person_role_rows(missing)
+        result.update(_store_persons(cache, missing, rows))
+    return _visible_roles(result)
+
+
+def get_codes_for_roles(role_ids):
+    cache = get_permission_cache()
+    result, missing = _split(cache, role_ids, role_key)
+    if missing:
+        rows = _role_code_rows(missing)
+        result.update(_store(cache, missing, rows, role_key))
+    return result
+
+
+def get_permission_codes_for_persons(person_ids):
+    """Map each person id to the frozenset of permission codes it holds.
+
+    Runs at most two queries for the whole batch and none when every entry
+    is already cached.
+    """
+    role_ids_by_person = get_role_ids_for_persons(person_ids)
+    all_role_ids = set().union(*role_ids_by_person.values())
+    codes_by_role = get_codes_for_roles(all_role_ids) if all_role_ids else {}
+    return _combine(role_ids_by_person, codes_by_role)
+
+
+async def aget_role_ids_for_persons(person_ids):
+    cache = get_permission_cache()
+    result, missing = _split(cache, person_ids, person_key)
+    if missing:
+        rows = [row async for row in _person_role_rows(missing)]
+        result.update(_store_persons(cache, missing, rows))
+    return _visible_roles(result)
+
+
+async def aget_codes_for_roles(role_ids):
+    cache = get_permission_cache()
+    result, missing = _split(cache, role_ids, role_key)
+    if missing:
+        rows = [row async for row in _role_code_rows(missing)]
+        result.update(_store(cache, missing, rows, role_key))
+    return result
+
+
+async def aget_permission_codes_for_persons(person_ids):
+    """Async counterpart of get_permission_codes_for_persons()."""
+    role_ids_by_person = await aget_role_ids_for_persons(person_ids)
+    all_role_ids = set().union(*role_ids_by_person.values())
+    codes_by_role = await aget_codes_for_roles(all_role_ids) if all_role_ids else {}
+    return _combine(role_ids_by_person, codes_by_role)
+
+
+def invalidate_persons(person_ids):
+    get_permission_cache().delete_many([person_key(pk) for pk in person_ids])
+
+
+def invalidate_roles(role_ids):
+    get_permission_cache().delete_many([role_key(pk) for pk in role_ids])
@@ -0,0 +1,131 @@
+import itertools
+import random
+
+from django.db import transaction
+
+from ecommerce import hierarchy, materialized, versioning
+from ecommerce.bitsets import allocate_bits
+from ecommerce.cache import get_permission_cache
+from ecommerce.models import Permission, Person, Role
+from ecommerce.tenants import get_current_tenant_id
+
+# Synthetic RBAC graphs for benchmarking. Role and permission popularity
+# follow a Zipf-like curve: a few roles are held by most persons and a few
+# permissions appear in most roles, like real department/role catalogs.
+
+
+def zipf_weights(count, exponent=1.0):
+    return list(
+        itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count))
+    )
+
+
+def pick_distinct(rng, population, cum_weights, count):
+    count = min(count, len(population))
+    picked = {}
+    while len(picked) < count:
+        picks = rng.choices(range(len(population)), cum_weights=cum_weights, k=count)
+        picked.update(dict.fromkeys(picks))
+    # Index by rank so the result only depends on the seed, not on the ids.
+    return [population[index] for index in list(picked)[:count]]
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def generate(
+    persons=1000,
+    roles=100,
+    permissions=50,
+    roles_per_person=3,
+    permissions_per_role=10,
+    seed=0,
+    batch_size=5000,
+    log=None,
+):
+    """Populate an empty database and return the number of rows created."""
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    created = {}
+
+    with transaction.atomic():
+        first_bit = allocate_bits(get_current_tenant_id(), permissions)
+        permission_ids = [
+            p.pk
+            for p in Permission.objects.bulk_create(
+                (
+                    Permission(
+                        code=f"p{i:06d}", name=f"Permission {i}", bit=first_bit + i
+                    )
+                    for i in range(permissions)
+                ),
+                batch_size=batch_size,
+            )
+        ]
+        created["permissions"] = len(permission_ids)
+        log(f"Created {len(permission_ids)} permissions")
+
+        role_ids = [
+            r.pk
+            for r in Role.objects.bulk_create(
+                (Role(name=f"Role {i}") for i in range(roles)),
+                batch_size=batch_size,
+            )
+        ]
+        hierarchy.add_roles(role_ids)
+        created["roles"] = len(role_ids)
+        log(f"Created {len(role_ids)} roles")
+
+        permission_weights = zipf_weights(len(permission_ids))
+        RolePermission = Role.permissions.through
+        rows = (
+            RolePermission(role_id=role_id, permission_id=permission_id)
+            for role_id in role_ids
+            for permission_id in pick_distinct(
+                rng,
+                permission_ids,
+                permission_weights,
+                rng.randint(1, 2 * permissions_per_role - 1),
+            )
+        )
+        created["role_permissions"] = 0
+        for batch in batched(rows, batch_size):
+            RolePermission.objects.bulk_create(batch)
+            created["role_permissions"] += len(batch)
+        log(f"Created {created['role_permissions']} role permissions")
+
+    role_weights = zipf_weights(len(role_ids))
+    PersonRole = Person.roles.through
+    created["persons"] = created["person_roles"] = 0
+    for start in range(0, persons, batch_size):
+        with transaction.atomic():
+            batch = Person.objects.bulk_create(
+                Person(name=f"Person {i}", email=f"person{i}@bench.example")
+                for i in range(start, min(start + batch_size, persons))
+            )
+            assignments = [
+                PersonRole(person_id=person.pk, role_id=role_id)
+                for person in batch
+                for role_id in pick_distinct(
+                    rng,
+                    role_ids,
+                    role_weights,
+                    rng.randint(1, 2 * roles_per_person - 1),
+                )
+            ]
+            PersonRole.objects.bulk_create(assignments, batch_size=batch_size)
+        created["persons"] += len(batch)
+        created["person_roles"] += len(assignments)
+        log(f"Created {created['persons']}/{persons} persons")
+
+    # Bulk writes bypass the signals that keep derived state in sync.
+    get_permission_cache().clear()
+    for model in (Permission, Role, Person):
+        versioning.bump_collection(model)
+    if materialized.is_enabled():
+        log("Rebuilding materialized person permissions")
+        materialized.rebuild()
+    return created
@@ -0,0 +1,105 @@
+from django.db.models import Value
+from django.db.models.functions import Upper
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from ecommerce.models import Permission, Person, Role
+
+# Query parameter filters for the list endpoints. Every filter is written so
+# that it matches one of the indexes created in the 0014_search_indexes and
+# 0016_tenant_pattern_indexes migrations:
+#   person email     UPPER(email) = UPPER(%s)         person_email_upper_idx
+#   person name      UPPER(name) LIKE 'PREFIX%'       person_name_upper_idx
+#   person search    UPPER(name) LIKE '%TEXT%'        person_name_trgm_idx
+#   role name        name LIKE 'prefix%'              role_name_like_idx
+#   permission code  code LIKE 'prefix%'              permission_code_like_idx
+# The last two lead with tenant_id, which the tenant filter always supplies.
+# The name indexes need PostgreSQL; other databases fall back to scans.
+# Role and permission filters are semi-joins on the indexed through tables.
+
+
+def upper(value):
+    return Upper(Value(value))
+
+
+class QueryFilter(serializers.Serializer):
+    """Validates query parameters; ``filter_<name>`` applies each one.
+
+    ``depends_on`` maps parameters to the other models their results depend
+    on, whose collection versions then join the list validators.
+    """
+
+    depends_on = {}
+
+    def filter(self, queryset):
+        for name, value in self.validated_data.items():
+            queryset = getattr(self, f"filter_{name}")(queryset, value)
+        return queryset
+
+
+class PersonFilter(QueryFilter):
+    email = serializers.CharField(max_length=254, required=False)
+    name = serializers.CharField(max_length=100, required=False)
+    search = serializers.CharField(min_length=3, max_length=100, required=False)
+    role = serializers.IntegerField(required=False)
+    permission = serializers.CharField(max_length=7, required=False)
+
+    depends_on = {"role": [Role], "permission": [Role, Permission]}
+
+    def filter_email(self, queryset, value):
+        return queryset.alias(email_upper=Upper("email")).filter(
+            email_upper=upper(value)
+        )
+
+    def filter_name(self, queryset, value):
+        return queryset.alias(name_upper=Upper("name")).filter(
+            name_upper__startswith=upper(value)
+        )
+
+    def filter_search(self, queryset, value):
+        # Trigram indexes cannot narrow down patterns shorter than three
+        # characters, hence min_length.
+        return queryset.alias(name_upper=Upper("name")).filter(
+            name_upper__contains=upper(value)
+        )
+
+    def filter_role(self, queryset, value):
+        holders = Person.roles.through.objects.filter(role_id=value)
+        return queryset.filter(pk__in=holders.values("person_id"))
+
+    def filter_permission(self, queryset, value):
+        return queryset.filter(pk__in=Permission.holder_ids(code=value))
+
+
+class RoleFilter(QueryFilter):
+    name = serializers.CharField(max_length=100, required=False)
+    permission = serializers.CharField(max_length=7, required=False)
+
+    depends_on = {"permission": [Permission]}
+
+    def filter_name(self, queryset, value):
+        return queryset.filter(name__startswith=value)
+
+    def filter_permission(self, queryset, value):
+        return queryset.filter(pk__in=Permission.granting_role_ids(code=value))
+
+
+class PermissionFilter(QueryFilter):
+    code = serializers.CharField(max_length=7, required=False)
+
+    def filter_code(self, queryset, value):
+        return queryset.filter(code__startswith=value)
+
+
+class QueryFilterBackend(BaseFilterBackend):
+    """Apply the view's ``filter_class`` to list requests."""
+
+    def filter_queryset(self, request, queryset, view):
+        filter_class = getattr(view, "filter_class", None)
+        if filter_class is None or request.method not in ("GET", "HEAD"):
+            return queryset
+        if view.kwargs.get(getattr(view, "lookup_url_kwarg", None) or "pk"):
+            return queryset
+        query = filter_class(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return query.filter(queryset)
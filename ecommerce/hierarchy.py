@@ -0,0 +1,103 @@
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+
+from ecommerce.models import Role, RoleClosure, Tenant
+
+# Role.includes is kept acyclic and its transitive closure is stored in
+# RoleClosure. Adding the include R -> S adds paths(a, R) * paths(S, d)
+# chains for every ancestor a of R and descendant d of S; removing it
+# subtracts the same amount and drops pairs left without a chain.
+
+
+def add_roles(role_ids, using=None):
+    """Create the self links of roles created with bulk_create()."""
+    RoleClosure.objects.using(using).bulk_create(
+        [RoleClosure(ancestor_id=pk, descendant_id=pk) for pk in role_ids],
+        ignore_conflicts=True,
+    )
+
+
+def ancestor_ids(role_ids):
+    """Return the given roles and every role including them."""
+    return set(
+        RoleClosure.objects.filter(descendant_id__in=role_ids).values_list(
+            "ancestor_id", flat=True
+        )
+    )
+
+
+def lock(tenant_id):
+    # Concurrent transactions can each add an include that only makes a cycle
+    # together with the other's, without sharing any role, and both pass the
+    # cycle check. Serialise the hierarchy writers of a tenant on its row.
+    list(
+        Tenant.objects.select_for_update()
+        .filter(pk=tenant_id)
+        .values_list("pk", flat=True)
+    )
+
+
+def check_includes(pairs):
+    """Raise ValidationError if any (role, included role) pair makes a cycle."""
+    errors = []
+    for role_id, included_id in pairs:
+        if role_id == included_id:
+            errors.append(f"Role {role_id} cannot include itself.")
+        elif RoleClosure.objects.filter(
+            ancestor_id=included_id, descendant_id=role_id
+        ).exists():
+            errors.append(
+                f"Role {role_id} cannot include role {included_id}, "
+                "which already includes it."
+            )
+    if errors:
+        raise ValidationError(errors)
+
+
+def apply_includes(pairs, sign, using=None):
+    """Update the closure after adding (sign 1) or removing (-1) includes."""
+    using = using or router.db_for_write(RoleClosure)
+    connection = connections[using]
+    closure = connection.ops.quote_name(RoleClosure._meta.db_table)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for role_id, included_id in pairs:
+            if sign > 0:
+                cursor.execute(
+                    f"INSERT INTO {closure} (ancestor_id, descendant_id, paths) "
+                    "SELECT a.ancestor_id, d.descendant_id, a.paths * d.paths "
+                    f"FROM {closure} a, {closure} d "
+                    "WHERE a.descendant_id = %s AND d.ancestor_id = %s "
+                    "ON CONFLICT (ancestor_id, descendant_id) DO UPDATE "
+                    f"SET paths = {closure}.paths + excluded.paths",
+                    [role_id, included_id],
+                )
+            else:
+                cursor.execute(
+                    f"UPDATE {closure} SET paths = paths - ("
+                    f"SELECT a.paths * d.paths FROM {closure} a, {closure} d "
+                    "WHERE a.descendant_id = %s AND d.ancestor_id = %s "
+                    f"AND a.ancestor_id = {closure}.ancestor_id "
+                    f"AND d.descendant_id = {closure}.descendant_id) "
+                    f"WHERE ancestor_id IN (SELECT ancestor_id FROM {closure} "
+                    "WHERE descendant_id = %s) "
+                    f"AND descendant_id IN (SELECT descendant_id FROM {closure} "
+                    "WHERE ancestor_id = %s)",
+                    [role_id, included_id, role_id, included_id],
+                )
+                cursor.execute(f"DELETE FROM {closure} WHERE paths <= 0")
+
+
+def rebuild(using=None):
+    """Recompute the whole closure from Role.includes."""
+    using = using or router.db_for_write(RoleClosure)
+    with transaction.atomic(using=using):
+        RoleClosure.objects.using(using).all().delete()
+        add_roles(Role.objects.using(using).values_list("pk", flat=True), using)
+        edges = list(
+            Role.includes.through.objects.using(using).values_list(
+                "from_role_id", "to_role_id"
+            )
+        )
+        # Path counts do not depend on the order the includes are applied in.
+        apply_includes(edges, 1, using)
+    return len(edges)
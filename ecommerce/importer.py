@@ -0,0 +1,299 @@
+import csv
+import json
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from ecommerce import hierarchy, versioning
+from ecommerce.assignments import ADDED, person_roles, role_includes, role_permissions
+from ecommerce.bitsets import allocate_bits
+from ecommerce.models import Permission, Person, Role
+from ecommerce.serializers import (
+    PermissionImportSerializer,
+    PersonImportSerializer,
+    PersonRoleImportSerializer,
+    RoleImportSerializer,
+    RoleIncludeImportSerializer,
+    RolePermissionImportSerializer,
+)
+from ecommerce.tenants import get_current_tenant_id
+
+# Bulk loader for the formats written by ecommerce.export. Rows are grouped
+# into batches per resource; each batch is validated in memory, checked for
+# duplicates and unresolved references with one query per model, and written
+# with bulk_create plus set-based through-table inserts in one transaction.
+# References may be ids or natural keys (permission code, role name, email).
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Import order, so rows can reference objects created earlier in the file
+RESOURCES = [
+    "permissions",
+    "roles",
+    "persons",
+    "role_permissions",
+    "role_includes",
+    "person_roles",
+]
+LIST_FIELDS = {"roles": "permissions", "persons": "roles"}
+NATURAL_KEYS = {Permission: "code", Role: "name", Person: "email"}
+
+
+def parse_ndjson(lines, resource="all"):
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, {"non_field_errors": ["Invalid JSON."]}
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, {"non_field_errors": ["Expected an object."]}
+            continue
+        record_type = record.pop("type", None) if resource == "all" else resource
+        yield line_number, record_type, record
+
+
+def parse_csv(lines, resource):
+    lines = (
+        line.decode("utf-8") if isinstance(line, bytes) else line for line in lines
+    )
+    list_field = LIST_FIELDS.get(resource)
+    # Line 1 is the header
+    for line_number, row in enumerate(csv.DictReader(lines), start=2):
+        row = {key: value for key, value in row.items() if value != ""}
+        if list_field in row:
+            row[list_field] = [ref for ref in row[list_field].split(";") if ref]
+        yield line_number, resource, row
+
+
+def resolve(model, refs):
+    """Map each id or natural key in ``refs`` to a primary key."""
+    ids = {ref for ref in refs if isinstance(ref, int)}
+    keys = {ref for ref in refs if isinstance(ref, str)}
+    resolved = {}
+    if ids:
+        resolved.update((pk, pk) for pk in model.objects.in_bulk(ids))
+    if keys:
+        field = NATURAL_KEYS[model]
+        # Natural keys are unique per tenant, so not usable with in_bulk().
+        found = model.objects.filter(**{f"{field}__in": keys}).values_list(field, "pk")
+        resolved.update(found)
+    return resolved
+
+
+class Importer:
+    serializers = {
+        "permissions": PermissionImportSerializer,
+        "roles": RoleImportSerializer,
+        "persons": PersonImportSerializer,
+        "role_permissions": RolePermissionImportSerializer,
+        "role_includes": RoleIncludeImportSerializer,
+        "person_roles": PersonRoleImportSerializer,
+    }
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.created = Counter()
+        self.assigned = Counter()
+        self.errors = []
+
+    @property
+    def report(self):
+        return {
+            "created": dict(+self.created),
+            "assigned": dict(+self.assigned),
+            "errors": self.errors,
+        }
+
+    def error(self, line, resource, errors):
+        self.errors.append({"line": line, "type": resource, "errors": errors})
+
+    def run(self, records):
+        pending = {resource: [] for resource in RESOURCES}
+        for line, resource, data in records:
+            if resource not in pending:
+                if resource is not None:
+                    data = {"type": [f"Unknown type {resource!r}."]}
+                self.error(line, resource, data)
+                continue
+            pending[resource].append((line, data))
+            if len(pending[resource]) >= self.chunk_size:
+                # Flush everything this resource may reference first.
+                for earlier in RESOURCES[: RESOURCES.index(resource) + 1]:
+                    self.flush(earlier, pending[earlier])
+                    pending[earlier] = []
+        for resource in RESOURCES:
+            self.flush(resource, pending[resource])
+        return self.report
+
+    def validate(self, resource, rows):
+        valid = []
+        for line, data in rows:
+            serializer = self.serializers[resource](data=data)
+            if serializer.is_valid():
+                valid.append((line, serializer.validated_data))
+            else:
+                self.error(line, resource, serializer.errors)
+        return valid
+
+    def unique(self, resource, rows, model, field):
+        values = [data[field] for _, data in rows]
+        taken = set(
+            model.objects.filter(**{f"{field}__in": values}).values_list(
+                field, flat=True
+            )
+        )
+        unique = []
+        for line, data in rows:
+            if data[field] in taken:
+                self.error(line, resource, {field: ["Already exists."]})
+            else:
+                taken.add(data[field])
+                unique.append((line, data))
+        return unique
+
+    def flush(self, resource, rows):
+        if not rows:
+            return
+        rows = self.validate(resource, rows)
+        if not rows:
+            return
+        with transaction.atomic(), versioning.batch():
+            getattr(self, f"import_{resource}")(rows)
+
+    def assign(self, resource, relation, rows, source_model, target_model, fields):
+        source_field, target_field = fields
+        sources = resolve(source_model, {data[source_field] for _, data in rows})
+        targets = resolve(target_model, {data[target_field] for _, data in rows})
+        pairs = []
+        lines = []
+        for line, data in rows:
+            source = sources.get(data[source_field])
+            target = targets.get(data[target_field])
+            if source is None or target is None:
+                missing = source_field if source is None else target_field
+                self.error(line, resource, {missing: ["Not found."]})
+                continue
+            pairs.append((source, target))
+            lines.append(line)
+        if not pairs:
+            return
+        try:
+            statuses = relation.add(pairs)
+        except ValidationError as exc:
+            # Role includes that would form a cycle; the whole batch is
+            # rolled back, so report it on every row.
+            for line in lines:
+                self.error(line, resource, {"non_field_errors": exc.messages})
+            return
+        self.assigned[resource] += sum(status == ADDED for status in statuses)
+
+    def log_created(self, instances):
+        # bulk_create() sends no post_save, so feed the change log here.
+        if versioning.feed_enabled():
+            versioning.log_changes(map(versioning.object_change, instances))
+
+    def import_permissions(self, rows):
+        rows = self.unique("permissions", rows, Permission, "code")
+        first_bit = allocate_bits(get_current_tenant_id(), len(rows))
+        permissions = Permission.objects.bulk_create(
+            Permission(bit=first_bit + offset, **data)
+            for offset, (_, data) in enumerate(rows)
+        )
+        self.created["permissions"] += len(permissions)
+        self.log_created(permissions)
+        versioning.bump_collection(Permission)
+
+    def import_roles(self, rows):
+        rows = self.unique("roles", rows, Role, "name")
+        roles = Role.objects.bulk_create(Role(name=data["name"]) for _, data in rows)
+        hierarchy.add_roles([role.pk for role in roles])
+        self.created["roles"] += len(roles)
+        self.log_created(roles)
+        versioning.bump_collection(Role)
+        self.assign(
+            "role_permissions",
+            role_permissions,
+            [
+                (line, {"role_id": role.pk, "permission_id": ref})
+                for role, (line, data) in zip(roles, rows)
+                for ref in data.get("permissions", [])
+            ],
+            Role,
+            Permission,
+            ("role_id", "permission_id"),
+        )
+
+    def import_persons(self, rows):
+        rows = self.unique("persons", rows, Person, "email")
+        persons = Person.objects.bulk_create(
+            Person(
+                name=data["name"],
+                email=data["email"],
+                password=data.get("password", ""),
+            )
+            for _, data in rows
+        )
+        self.created["persons"] += len(persons)
+        self.log_created(persons)
+        versioning.bump_collection(Person)
+        self.assign(
+            "person_roles",
+            person_roles,
+            [
+                (line, {"person_id": person.pk, "role_id": ref})
+                for person, (line, data) in zip(persons, rows)
+                for ref in data.get("roles", [])
+            ],
+            Person,
+            Role,
+            ("person_id", "role_id"),
+        )
+
+    def import_role_permissions(self, rows):
+        self.assign(
+            "role_permissions",
+            role_permissions,
+            rows,
+            Role,
+            Permission,
+            ("role_id", "permission_id"),
+        )
+
+    def import_role_includes(self, rows):
+        self.assign(
+            "role_includes",
+            role_includes,
+            rows,
+            Role,
+            Role,
+            ("role_id", "included_role_id"),
+        )
+
+    def import_person_roles(self, rows):
+        self.assign(
+            "person_roles",
+            person_roles,
+            rows,
+            Person,
+            Role,
+            ("person_id", "role_id"),
+        )
+
+
+def import_lines(lines, resource="all", file_format="ndjson", chunk_size=None):
+    """Import NDJSON or CSV lines and return a report with per-row errors."""
+    if file_format == "csv":
+        if resource not in RESOURCES:
+            raise ValueError("CSV imports need a single resource.")
+        records = parse_csv(lines, resource)
+    elif resource == "all" or resource in RESOURCES:
+        records = parse_ndjson(lines, resource)
+    else:
+        raise ValueError(f"Unknown resource {resource!r}.")
+    return Importer(chunk_size or DEFAULT_CHUNK_SIZE).run(records)
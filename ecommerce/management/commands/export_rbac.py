@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce.export import DEFAULT_CHUNK_SIZE, RESOURCES, iter_export
+from ecommerce.tenants import iter_in_tenant, tenant_exists
+
+
+class Command(BaseCommand):
+    help = "Stream persons, roles, permissions and assignments as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--resource", default="all", choices=["all", *RESOURCES])
+        parser.add_argument("--format", default="ndjson", choices=["ndjson", "csv"])
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            "--tenant", type=int, help="Tenant id to export, all tenants if omitted."
+        )
+        parser.add_argument("--output", help="File to write instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options["tenant"] is not None and not tenant_exists(options["tenant"]):
+            raise CommandError(f"Unknown tenant {options['tenant']}.")
+        try:
+            chunks = iter_export(
+                options["resource"], options["format"], options["chunk_size"]
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        chunks = iter_in_tenant(chunks, options["tenant"])
+
+        if options["output"]:
+            with open(options["output"], "w", newline="") as handle:
+                handle.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
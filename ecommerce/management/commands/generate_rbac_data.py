@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce import datagen
+from ecommerce.models import Person
+
+
+class Command(BaseCommand):
+    help = "Fill an empty database with a synthetic RBAC graph for benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--persons", type=int, default=10000)
+        parser.add_argument("--roles", type=int, default=1000)
+        parser.add_argument("--permissions", type=int, default=200)
+        parser.add_argument("--roles-per-person", type=int, default=3)
+        parser.add_argument("--permissions-per-role", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if Person.objects.exists():
+            raise CommandError("The database already contains persons.")
+        created = datagen.generate(
+            persons=options["persons"],
+            roles=options["roles"],
+            permissions=options["permissions"],
+            roles_per_person=options["roles_per_person"],
+            permissions_per_role=options["permissions_per_role"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            log=self.stdout.write,
+        )
+        summary = ", ".join(f"{count} {name}" for name, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary}."))
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce import tenants
+from ecommerce.importer import DEFAULT_CHUNK_SIZE, RESOURCES, import_lines
+
+
+class Command(BaseCommand):
+    help = "Bulk import persons, roles, permissions and assignments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON or CSV file to import.")
+        parser.add_argument("--resource", default="all", choices=["all", *RESOURCES])
+        parser.add_argument("--format", default="ndjson", choices=["ndjson", "csv"])
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            "--tenant",
+            type=int,
+            help="Tenant id to import into, the default tenant if omitted.",
+        )
+
+    def handle(self, *args, **options):
+        tenant_id = options["tenant"] or tenants.get_config()["DEFAULT_TENANT"]
+        if not tenants.tenant_exists(tenant_id):
+            raise CommandError(f"Unknown tenant {tenant_id}.")
+        scope = tenants.tenant_scope(tenant_id)
+        with open(options["path"], newline="") as handle, scope:
+            try:
+                report = import_lines(
+                    handle,
+                    options["resource"],
+                    options["format"],
+                    options["chunk_size"],
+                )
+            except ValueError as error:
+                raise CommandError(error)
+
+        for error in report["errors"]:
+            self.stderr.write(json.dumps(error))
+        self.stdout.write(json.dumps({**report, "errors": len(report["errors"])}))
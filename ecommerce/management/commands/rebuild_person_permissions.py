@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce import materialized
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized person permission table and verify it."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify-only",
+            action="store_true",
+            help="Only compare the table with the through tables.",
+        )
+        parser.add_argument("--database", default=None)
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        if not options["verify_only"]:
+            rows = materialized.rebuild(using=using)
+            self.stdout.write(f"Rebuilt {rows} person permission rows.")
+
+        missing, unexpected = materialized.verify(using=using)
+        if missing or unexpected:
+            raise CommandError(
+                f"Person permission table is out of date: {missing} missing, "
+                f"{unexpected} unexpected rows."
+            )
+        self.stdout.write(self.style.SUCCESS("Person permission table verified."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce import hierarchy, materialized
+from ecommerce.cache import get_permission_cache
+
+
+class Command(BaseCommand):
+    help = "Recompute the role inheritance closure from the role includes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=None)
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        edges = hierarchy.rebuild(using=using)
+        get_permission_cache().clear()
+        self.stdout.write(f"Rebuilt the role closure from {edges} includes.")
+        if materialized.is_enabled():
+            rows = materialized.rebuild(using=using)
+            self.stdout.write(f"Rebuilt {rows} person permission rows.")
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from ecommerce import benchmark
+
+
+class Command(BaseCommand):
+    help = "Measure throughput and latency of every endpoint and write JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument(
+            "--case", action="append", dest="cases", help="Only run this case."
+        )
+        parser.add_argument(
+            "--login-cost",
+            action="append",
+            type=int,
+            dest="login_costs",
+            help="PBKDF2 iterations to measure logins with (repeatable).",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument(
+            "--compare", help="Print p50 changes against an earlier report."
+        )
+
+    def handle(self, *args, **options):
+        report = benchmark.run(
+            iterations=options["iterations"],
+            warmup=options["warmup"],
+            seed=options["seed"],
+            only=options["cases"],
+            host=options["host"],
+            login_costs=options["login_costs"] or benchmark.DEFAULT_LOGIN_COSTS,
+            log=self.stderr.write,
+        )
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(report, handle, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if options["compare"]:
+            baseline = benchmark.load(options["compare"])
+            for name, before, after, change in benchmark.compare(baseline, report):
+                self.stdout.write(
+                    f"{name:40} {before:9.2f}ms -> {after:9.2f}ms {change:+8.1%}"
+                )
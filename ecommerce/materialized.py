@@ -0,0 +1,214 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from ecommerce.models import Permission, Person, PersonPermission, Role, RoleClosure
+
+# Each change to Person.roles or Role.permissions is a set of
+# (person, role) or (role, permission) pairs. The pairs are joined with the
+# other through table, via the role closure, to get per (person, permission)
+# deltas, which are added to or subtracted from PersonPermission.grants in one
+# statement. ``grants`` counts the include chains from a held role to a role
+# granting the permission. Changes to Role.includes are rare and recompute
+# the rows of the affected persons instead.
+
+CHUNK_SIZE = 500
+
+
+def is_enabled():
+    return getattr(settings, "ECOMMERCE_MATERIALIZE_PERMISSIONS", False)
+
+
+def _tables(connection):
+    quote = connection.ops.quote_name
+    return {
+        "grants": quote(PersonPermission._meta.db_table),
+        "person": quote(Person._meta.db_table),
+        "permission": quote(Permission._meta.db_table),
+        "person_roles": quote(Person.roles.through._meta.db_table),
+        "role_permissions": quote(Role.permissions.through._meta.db_table),
+        "closure": quote(RoleClosure._meta.db_table),
+    }
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), CHUNK_SIZE):
+        yield values[start : start + CHUNK_SIZE]
+
+
+def _upsert(cursor, tables, select, params):
+    cursor.execute(
+        f"INSERT INTO {tables['grants']} (person_id, permission_id, code, grants) "
+        f"{select} "
+        "ON CONFLICT (person_id, permission_id) DO UPDATE "
+        f"SET grants = {tables['grants']}.grants + excluded.grants",
+        params,
+    )
+
+
+def _delete_exhausted(cursor, tables, person_ids=None):
+    sql = f"DELETE FROM {tables['grants']} WHERE grants <= 0"
+    params = []
+    if person_ids is not None:
+        sql += f" AND person_id IN ({_placeholders(person_ids)})"
+        params = person_ids
+    cursor.execute(sql, params)
+
+
+def apply_person_roles(person_ids, role_ids, sign):
+    """Apply a change to every (person, role) pair in the cross product."""
+    role_ids = list(role_ids)
+    if not role_ids:
+        return
+    using = router.db_for_write(PersonPermission)
+    connection = connections[using]
+    tables = _tables(connection)
+    roles = _placeholders(role_ids)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for chunk in _chunks(person_ids):
+            persons = _placeholders(chunk)
+            if sign > 0:
+                _upsert(
+                    cursor,
+                    tables,
+                    "SELECT p.id, rp.permission_id, perm.code, SUM(c.paths) "
+                    f"FROM {tables['person']} p "
+                    f"JOIN {tables['closure']} c ON c.ancestor_id IN ({roles}) "
+                    f"JOIN {tables['role_permissions']} rp "
+                    "ON rp.role_id = c.descendant_id "
+                    f"JOIN {tables['permission']} perm ON perm.id = rp.permission_id "
+                    f"WHERE p.id IN ({persons}) "
+                    "GROUP BY p.id, rp.permission_id, perm.code",
+                    role_ids + chunk,
+                )
+            else:
+                cursor.execute(
+                    f"UPDATE {tables['grants']} SET grants = grants - ("
+                    f"SELECT SUM(c.paths) FROM {tables['closure']} c "
+                    f"JOIN {tables['role_permissions']} rp "
+                    "ON rp.role_id = c.descendant_id "
+                    f"WHERE c.ancestor_id IN ({roles}) "
+                    f"AND rp.permission_id = {tables['grants']}.permission_id) "
+                    f"WHERE person_id IN ({persons}) AND permission_id IN ("
+                    f"SELECT rp.permission_id FROM {tables['closure']} c "
+                    f"JOIN {tables['role_permissions']} rp "
+                    "ON rp.role_id = c.descendant_id "
+                    f"WHERE c.ancestor_id IN ({roles}))",
+                    role_ids + chunk + role_ids,
+                )
+                _delete_exhausted(cursor, tables, chunk)
+
+
+def apply_role_permissions(role_ids, permission_ids, sign):
+    """Apply a change to every (role, permission) pair in the cross product."""
+    role_ids = list(role_ids)
+    permission_ids = list(permission_ids)
+    if not role_ids or not permission_ids:
+        return
+    using = router.db_for_write(PersonPermission)
+    connection = connections[using]
+    tables = _tables(connection)
+    roles = _placeholders(role_ids)
+    permissions = _placeholders(permission_ids)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if sign > 0:
+            _upsert(
+                cursor,
+                tables,
+                "SELECT pr.person_id, perm.id, perm.code, SUM(c.paths) "
+                f"FROM {tables['closure']} c "
+                f"JOIN {tables['person_roles']} pr ON pr.role_id = c.ancestor_id "
+                f"JOIN {tables['permission']} perm ON perm.id IN ({permissions}) "
+                f"WHERE c.descendant_id IN ({roles}) "
+                "GROUP BY pr.person_id, perm.id, perm.code",
+                permission_ids + role_ids,
+            )
+        else:
+            cursor.execute(
+                f"UPDATE {tables['grants']} SET grants = grants - ("
+                f"SELECT SUM(c.paths) FROM {tables['closure']} c "
+                f"JOIN {tables['person_roles']} pr ON pr.role_id = c.ancestor_id "
+                f"WHERE c.descendant_id IN ({roles}) "
+                f"AND pr.person_id = {tables['grants']}.person_id) "
+                f"WHERE permission_id IN ({permissions}) AND person_id IN ("
+                f"SELECT pr.person_id FROM {tables['closure']} c "
+                f"JOIN {tables['person_roles']} pr ON pr.role_id = c.ancestor_id "
+                f"WHERE c.descendant_id IN ({roles}))",
+                role_ids + permission_ids + role_ids,
+            )
+            _delete_exhausted(cursor, tables)
+
+
+def update_code(permission):
+    PersonPermission.objects.filter(permission=permission).exclude(
+        code=permission.code
+    ).update(code=permission.code)
+
+
+def _expected_select(tables, where=""):
+    return (
+        "SELECT pr.person_id, rp.permission_id, perm.code, SUM(c.paths) "
+        f"FROM {tables['person_roles']} pr "
+        f"JOIN {tables['closure']} c ON c.ancestor_id = pr.role_id "
+        f"JOIN {tables['role_permissions']} rp ON rp.role_id = c.descendant_id "
+        f"JOIN {tables['permission']} perm ON perm.id = rp.permission_id "
+        f"{where}"
+        "GROUP BY pr.person_id, rp.permission_id, perm.code"
+    )
+
+
+def refresh_role_holders(role_ids):
+    """Recompute the rows of every person holding one of ``role_ids``."""
+    role_ids = list(role_ids)
+    if not role_ids:
+        return
+    using = router.db_for_write(PersonPermission)
+    connection = connections[using]
+    tables = _tables(connection)
+    holders = (
+        f"SELECT person_id FROM {tables['person_roles']} "
+        f"WHERE role_id IN ({_placeholders(role_ids)})"
+    )
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {tables['grants']} WHERE person_id IN ({holders})",
+            role_ids,
+        )
+        cursor.execute(
+            f"INSERT INTO {tables['grants']} (person_id, permission_id, code, grants) "
+            f"{_expected_select(tables, f'WHERE pr.person_id IN ({holders}) ')}",
+            role_ids,
+        )
+
+
+def rebuild(using=None):
+    """Recompute the whole table from the through tables."""
+    using = using or router.db_for_write(PersonPermission)
+    connection = connections[using]
+    tables = _tables(connection)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {tables['grants']}")
+        cursor.execute(
+            f"INSERT INTO {tables['grants']} (person_id, permission_id, code, grants) "
+            f"{_expected_select(tables)}"
+        )
+        return cursor.rowcount
+
+
+def verify(using=None):
+    """Return (missing, unexpected): row counts that differ from a rebuild."""
+    using = using or router.db_for_read(PersonPermission)
+    connection = connections[using]
+    tables = _tables(connection)
+    actual = f"SELECT person_id, permission_id, code, grants FROM {tables['grants']}"
+    expected = _expected_select(tables)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM ({expected} EXCEPT {actual}) diff")
+        missing = cursor.fetchone()[0]
+        cursor.execute(f"SELECT COUNT(*) FROM ({actual} EXCEPT {expected}) diff")
+        unexpected = cursor.fetchone()[0]
+    return missing, unexpected
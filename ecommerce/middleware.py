@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUEST_STATS = {
+    # Number of recent requests kept per endpoint for percentiles
+    "WINDOW": 1000,
+    # A statement executed this many times in one request is flagged as N+1
+    "DUPLICATE_THRESHOLD": 3,
+    # Serve the collected statistics at /ecommerce/stats/
+    "EXPOSE_STATS": False,
+}
+
+
+def get_config():
+    return {**DEFAULT_REQUEST_STATS, **getattr(settings, "ECOMMERCE_REQUEST_STATS", {})}
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class RequestStats:
+    """Rolling per-endpoint samples shared by all threads of a worker."""
+
+    METRICS = ("wall_ms", "db_ms", "render_ms", "queries")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+            self._totals = defaultdict(Counter)
+
+    def record(self, endpoint, sample, duplicates):
+        window = get_config()["WINDOW"]
+        with self._lock:
+            samples = self._samples.setdefault(
+                endpoint, {metric: deque(maxlen=window) for metric in self.METRICS}
+            )
+            for metric in self.METRICS:
+                samples[metric].append(sample[metric])
+            totals = self._totals[endpoint]
+            totals["requests"] += 1
+            if duplicates:
+                totals["flagged_requests"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for endpoint, samples in self._samples.items():
+                result[endpoint] = {
+                    **self._totals[endpoint],
+                    **{
+                        metric: {
+                            "p50": percentile(values, 0.50),
+                            "p95": percentile(values, 0.95),
+                            "p99": percentile(values, 0.99),
+                        }
+                        for metric, values in samples.items()
+                    },
+                }
+            return result
+
+
+request_stats = RequestStats()
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+
+# Connections are shared by the requests running on a thread, like all async
+# requests of an ASGI worker, so every connection gets one permanent wrapper
+# that records into the recorder of the request it runs for.
+current_recorder = ContextVar("ecommerce_query_recorder", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_recorders():
+    # Covers connections opened before this module was imported.
+    for connection in connections.all():
+        install_recorder(connection)
+
+
+connection_created.connect(install_recorder)
+
+
+class RequestStatsMiddleware:
+    """Record query count, DB time, render time and wall time per URL name.
+
+    Results are added to the response as a ``Server-Timing`` header and
+    aggregated in ``request_stats`` for the stats endpoint. Runs natively
+    under both WSGI and ASGI so async views do not pay for a thread hop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        install_recorders()
+        recorder = self.start(request)
+        token = current_recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder)
+
+    async def __acall__(self, request):
+        # Async ORM calls run on the thread-sensitive executor, whose
+        # connections are only reachable from that thread. The recorder
+        # reaches them through the context sync_to_async() copies.
+        await sync_to_async(install_recorders)()
+        recorder = self.start(request)
+        token = current_recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder)
+
+    def start(self, request):
+        request._stats_start = time.perf_counter()
+        request._stats_view_done = None
+        return QueryRecorder()
+
+    def finish(self, request, response, recorder):
+        end = time.perf_counter()
+        view_done = request._stats_view_done or end
+        sample = {
+            "wall_ms": (end - request._stats_start) * 1000,
+            "db_ms": recorder.duration * 1000,
+            "render_ms": (end - view_done) * 1000,
+            "queries": recorder.count,
+        }
+        threshold = get_config()["DUPLICATE_THRESHOLD"]
+        duplicates = {
+            sql: count
+            for sql, count in recorder.statements.items()
+            if count >= threshold
+        }
+        if duplicates:
+            logger.warning(
+                "Repeated queries on %s: %s",
+                request.path,
+                "; ".join(f"{count}x {sql}" for sql, count in duplicates.items()),
+            )
+
+        match = request.resolver_match
+        if match is not None:
+            request_stats.record(match.view_name, sample, duplicates)
+
+        timing = [
+            f'db;dur={sample["db_ms"]:.1f};desc="{sample["queries"]} queries"',
+            f'render;dur={sample["render_ms"]:.1f}',
+            f'total;dur={sample["wall_ms"]:.1f}',
+        ]
+        if duplicates:
+            timing.append(f'nplusone;desc="{len(duplicates)} repeated statements"')
+        response.headers["Server-Timing"] = ", ".join(timing)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, so anything after it
+        # is serialisation to bytes.
+        request._stats_view_done = time.perf_counter()
+        return response
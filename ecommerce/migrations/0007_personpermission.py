@@ -0,0 +1,56 @@
+# Generated by Django 5.1 on 2026-10-18 17:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ecommerce", "0006_alter_role_permissions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PersonPermission",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("code", models.CharField(max_length=7)),
+                ("grants", models.IntegerField(default=1)),
+                (
+                    "permission",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="person_grants",
+                        to="ecommerce.permission",
+                    ),
+                ),
+                (
+                    "person",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="permission_grants",
+                        to="ecommerce.person",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["person", "code"], name="person_code_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("person", "permission"), name="unique_person_permission"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1 on 2026-10-18 17:33
+
+from django.db import migrations, models
+
+
+def assign_bits(apps, schema_editor):
+    Permission = apps.get_model("ecommerce", "Permission")
+    permissions = list(Permission.objects.order_by("pk"))
+    for bit, permission in enumerate(permissions):
+        permission.bit = bit
+    Permission.objects.bulk_update(permissions, ["bit"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ecommerce", "0007_personpermission"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="permission",
+            name="bit",
+            field=models.PositiveIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(assign_bits, migrations.RunPython.noop),
+    ]
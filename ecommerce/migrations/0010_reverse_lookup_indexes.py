@@ -0,0 +1,32 @@
+# Generated by Django 5.1 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ecommerce", "0009_resource_versions"),
+    ]
+
+    operations = [
+        # The auto-created through tables only index each column on its own;
+        # these let "persons with role X" and "roles with permission X" be read
+        # as ordered index range scans for keyset pagination.
+        migrations.RunSQL(
+            'CREATE INDEX "person_roles_role_person_idx" '
+            'ON "ecommerce_person_roles" ("role_id", "person_id")',
+            'DROP INDEX "person_roles_role_person_idx"',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX "role_permissions_permission_role_idx" '
+            'ON "ecommerce_role_permissions" ("permission_id", "role_id")',
+            'DROP INDEX "role_permissions_permission_role_idx"',
+        ),
+        migrations.AddIndex(
+            model_name="personpermission",
+            index=models.Index(
+                fields=["permission", "person"], name="permission_person_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1 on 2026-10-18 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def add_self_links(apps, schema_editor):
+    Role = apps.get_model("ecommerce", "Role")
+    RoleClosure = apps.get_model("ecommerce", "RoleClosure")
+    RoleClosure.objects.bulk_create(
+        (
+            RoleClosure(ancestor_id=pk, descendant_id=pk)
+            for pk in Role.objects.values_list("pk", flat=True).iterator()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ecommerce", "0010_reverse_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="role",
+            name="includes",
+            field=models.ManyToManyField(
+                blank=True, related_name="included_by", to="ecommerce.role"
+            ),
+        ),
+        migrations.CreateModel(
+            name="RoleClosure",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("paths", models.IntegerField(default=1)),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="ecommerce.role",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="ecommerce.role",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["descendant", "ancestor"], name="closure_descendant_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("ancestor", "descendant"), name="unique_role_closure"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(add_self_links, migrations.RunPython.noop),
+    ]
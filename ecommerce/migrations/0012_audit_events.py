@@ -0,0 +1,48 @@
+# Generated by Django 5.1 on 2026-10-18 17:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ecommerce", "0011_role_hierarchy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("actor", models.CharField(blank=True, max_length=150)),
+                ("remote_addr", models.GenericIPAddressField(blank=True, null=True)),
+                ("action", models.CharField(max_length=10)),
+                ("target_type", models.CharField(max_length=20)),
+                ("target_id", models.BigIntegerField()),
+                ("relation", models.CharField(blank=True, max_length=20)),
+                ("related_ids", models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["actor", "created_at"], name="audit_actor_idx"
+                    ),
+                    models.Index(
+                        fields=["target_type", "target_id", "created_at"],
+                        name="audit_target_idx",
+                    ),
+                    models.Index(fields=["created_at"], name="audit_created_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-18 18:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ecommerce", "0012_audit_events"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLogEntry",
+            fields=[
+                ("version", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("resource", models.CharField(max_length=20)),
+                ("action", models.CharField(max_length=10)),
+                ("object_id", models.BigIntegerField(blank=True, null=True)),
+                ("data", models.JSONField(blank=True, null=True)),
+            ],
+        ),
+    ]
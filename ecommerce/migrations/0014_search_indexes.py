@@ -0,0 +1,50 @@
+# Generated by Django 5.1 on 2026-10-18 18:03
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# Name search indexes for PostgreSQL, matching the expressions used by
+# ecommerce.filters. Built concurrently so the person table stays writable;
+# the trigram index needs the pg_trgm extension.
+POSTGRESQL_INDEXES = {
+    "person_name_upper_idx": ('ON "ecommerce_person" (UPPER("name") text_pattern_ops)'),
+    "person_name_trgm_idx": (
+        'ON "ecommerce_person" USING gin (UPPER("name") gin_trgm_ops)'
+    ),
+}
+
+
+def create_name_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, definition in POSTGRESQL_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" {definition}'
+        )
+
+
+def drop_name_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in POSTGRESQL_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("ecommerce", "0013_change_log"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="person",
+            index=models.Index(
+                django.db.models.functions.text.Upper("email"),
+                name="person_email_upper_idx",
+            ),
+        ),
+        migrations.RunPython(create_name_indexes, drop_name_indexes),
+    ]
@@ -0,0 +1,294 @@
+# Generated by Django 5.1 on 2026-10-18 18:16
+
+import django.db.models.deletion
+import ecommerce.tenants
+from django.core.management.color import no_style
+from django.db import migrations, models
+from django.db.migrations.exceptions import IrreversibleError
+
+# On PostgreSQL the person and person_roles tables are rebuilt as hash
+# partitioned tables on tenant_id, so that queries, indexes and vacuum of one
+# tenant only touch its partition. Unique keys of a partitioned table must
+# include the partition key, so there:
+#   - the primary keys are (tenant_id, id), with a separate index on id;
+#   - person_roles is unique on (tenant_id, person_id, role_id) and references
+#     person through (tenant_id, person_id);
+#   - personpermission.person has no database constraint.
+# Django still treats id as the primary key; ids come from one sequence per
+# table. Other databases keep plain tables with a tenant_id column.
+PARTITIONS = 16
+
+PARTITIONED_TABLES = {
+    "ecommerce_person": [
+        'ALTER TABLE "ecommerce_person" ADD PRIMARY KEY ("tenant_id", "id")',
+        'ALTER TABLE "ecommerce_person" ADD CONSTRAINT "unique_person_email" '
+        'UNIQUE ("tenant_id", "email")',
+        'ALTER TABLE "ecommerce_person" ADD CONSTRAINT "ecommerce_person_tenant_id_fk" '
+        'FOREIGN KEY ("tenant_id") REFERENCES "ecommerce_tenant" ("id") '
+        "DEFERRABLE INITIALLY DEFERRED",
+        'CREATE INDEX "person_id_idx" ON "ecommerce_person" ("id")',
+        'CREATE INDEX "person_email_upper_idx" ON "ecommerce_person" (UPPER("email"))',
+        # From 0014_search_indexes
+        'CREATE INDEX "person_name_upper_idx" '
+        'ON "ecommerce_person" (UPPER("name") text_pattern_ops)',
+        'CREATE INDEX "person_name_trgm_idx" '
+        'ON "ecommerce_person" USING gin (UPPER("name") gin_trgm_ops)',
+    ],
+    "ecommerce_person_roles": [
+        'ALTER TABLE "ecommerce_person_roles" ADD PRIMARY KEY ("tenant_id", "id")',
+        'ALTER TABLE "ecommerce_person_roles" '
+        'ADD CONSTRAINT "ecommerce_person_roles_person_id_role_id_uniq" '
+        'UNIQUE ("tenant_id", "person_id", "role_id")',
+        'ALTER TABLE "ecommerce_person_roles" '
+        'ADD CONSTRAINT "ecommerce_person_roles_person_id_fk" '
+        'FOREIGN KEY ("tenant_id", "person_id") '
+        'REFERENCES "ecommerce_person" ("tenant_id", "id") '
+        "DEFERRABLE INITIALLY DEFERRED",
+        'ALTER TABLE "ecommerce_person_roles" '
+        'ADD CONSTRAINT "ecommerce_person_roles_role_id_fk" '
+        'FOREIGN KEY ("role_id") REFERENCES "ecommerce_role" ("id") '
+        "DEFERRABLE INITIALLY DEFERRED",
+        'CREATE INDEX "person_roles_id_idx" ON "ecommerce_person_roles" ("id")',
+        'CREATE INDEX "person_roles_person_idx" '
+        'ON "ecommerce_person_roles" ("person_id")',
+        'CREATE INDEX "person_roles_role_person_idx" '
+        'ON "ecommerce_person_roles" ("role_id", "person_id")',
+    ],
+}
+
+
+def create_default_tenant(apps, schema_editor):
+    Tenant = apps.get_model("ecommerce", "Tenant")
+    tenant_id = ecommerce.tenants.get_config()["DEFAULT_TENANT"]
+    Tenant.objects.using(schema_editor.connection.alias).create(
+        pk=tenant_id, name="default"
+    )
+    connection = schema_editor.connection
+    for sql in connection.ops.sequence_reset_sql(no_style(), [Tenant]):
+        schema_editor.execute(sql)
+
+
+def partition_table(schema_editor, table, statements):
+    old = f"{table}_unpartitioned"
+    sequence = f"{table}_id_seq"
+    execute = schema_editor.execute
+    execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    execute(f'CREATE TABLE "{table}" (LIKE "{old}") PARTITION BY HASH ("tenant_id")')
+    for remainder in range(PARTITIONS):
+        execute(
+            f'CREATE TABLE "{table}_p{remainder}" PARTITION OF "{table}" '
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+    execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    # Also drops the old id sequence and the foreign keys into the old table.
+    execute(f'DROP TABLE "{old}" CASCADE')
+    execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{table}"."id"')
+    execute(
+        f'SELECT setval(\'"{sequence}"\', COALESCE(MAX("id"), 0) + 1, false) '
+        f'FROM "{table}"'
+    )
+    execute(
+        f'ALTER TABLE "{table}" ALTER COLUMN "id" '
+        f"SET DEFAULT nextval('\"{sequence}\"')"
+    )
+    for sql in statements:
+        execute(sql)
+
+
+def partition_by_tenant(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, statements in PARTITIONED_TABLES.items():
+        partition_table(schema_editor, table, statements)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        raise IrreversibleError(
+            "The partitioned person tables cannot be converted back."
+        )
+
+
+def tenant_field(related_name):
+    return models.ForeignKey(
+        default=ecommerce.tenants.get_current_tenant_id,
+        editable=False,
+        on_delete=django.db.models.deletion.CASCADE,
+        related_name=related_name,
+        to="ecommerce.tenant",
+    )
+
+
+def log_tenant_field():
+    return models.ForeignKey(
+        db_constraint=False,
+        default=ecommerce.tenants.get_current_tenant_id,
+        on_delete=django.db.models.deletion.DO_NOTHING,
+        related_name="+",
+        to="ecommerce.tenant",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ecommerce", "0014_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tenant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.RunPython(create_default_tenant, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="permission",
+            name="code",
+            field=models.CharField(max_length=7),
+        ),
+        migrations.AlterField(
+            model_name="person",
+            name="email",
+            field=models.EmailField(max_length=254),
+        ),
+        migrations.AlterField(
+            model_name="personpermission",
+            name="person",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="permission_grants",
+                to="ecommerce.person",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="role",
+            name="name",
+            field=models.CharField(max_length=100),
+        ),
+        # The auto-created through table becomes the PersonRole model as is;
+        # 0010_reverse_lookup_indexes created the index.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="PersonRole",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "person",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="ecommerce.person",
+                            ),
+                        ),
+                        (
+                            "role",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="ecommerce.role",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "ecommerce_person_roles",
+                        "indexes": [
+                            models.Index(
+                                fields=["role", "person"],
+                                name="person_roles_role_person_idx",
+                            )
+                        ],
+                        "unique_together": {("person", "role")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="person",
+                    name="roles",
+                    field=models.ManyToManyField(
+                        related_name="persons",
+                        through="ecommerce.PersonRole",
+                        to="ecommerce.role",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="permission",
+            name="tenant",
+            field=tenant_field("permissions"),
+        ),
+        migrations.AddField(
+            model_name="role",
+            name="tenant",
+            field=tenant_field("roles"),
+        ),
+        migrations.AddField(
+            model_name="person",
+            name="tenant",
+            field=tenant_field("persons"),
+        ),
+        migrations.AddField(
+            model_name="personrole",
+            name="tenant",
+            field=tenant_field("+"),
+        ),
+        migrations.AddField(
+            model_name="auditevent",
+            name="tenant",
+            field=log_tenant_field(),
+        ),
+        migrations.AddField(
+            model_name="changelogentry",
+            name="tenant",
+            field=log_tenant_field(),
+        ),
+        migrations.AddIndex(
+            model_name="auditevent",
+            index=models.Index(
+                fields=["tenant", "created_at"], name="audit_tenant_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="changelogentry",
+            index=models.Index(
+                fields=["tenant", "version"], name="changelog_tenant_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="permission",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "code"), name="unique_permission_code"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="person",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "email"), name="unique_person_email"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="role",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "name"), name="unique_role_name"
+            ),
+        ),
+        migrations.RunPython(partition_by_tenant, unpartition),
+    ]
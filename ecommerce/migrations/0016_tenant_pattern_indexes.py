@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Prefix search indexes for the role name and permission code filters of
+# ecommerce.filters on PostgreSQL. Both columns lost the *_like index of their
+# unique flag in 0015_tenants; the per-tenant unique constraints do not
+# support LIKE outside the C collation.
+POSTGRESQL_INDEXES = {
+    "permission_code_like_idx": (
+        'ON "ecommerce_permission" ("tenant_id", "code" varchar_pattern_ops)'
+    ),
+    "role_name_like_idx": (
+        'ON "ecommerce_role" ("tenant_id", "name" varchar_pattern_ops)'
+    ),
+}
+
+
+def create_pattern_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, definition in POSTGRESQL_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" {definition}'
+        )
+
+
+def drop_pattern_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in POSTGRESQL_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("ecommerce", "0015_tenants"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_pattern_indexes, drop_pattern_indexes),
+    ]
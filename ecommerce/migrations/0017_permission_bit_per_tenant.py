@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-18 18:35
+
+from django.db import migrations, models
+
+# Bits become unique per tenant. Existing bits are kept, as masks holding them
+# may have been issued; each tenant's counter continues after its highest bit
+# (see ecommerce.bitsets.allocate_bits).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ecommerce", "0016_tenant_pattern_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="permission",
+            name="bit",
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="permission",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "bit"), name="unique_permission_bit"
+            ),
+        ),
+    ]
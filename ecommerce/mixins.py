@@ -0,0 +1,140 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from ecommerce import tenants, versioning
+
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+
+class ConditionalGetMixin:
+    """Answer list and retrieve requests for unchanged data with 304.
+
+    The ETag and Last-Modified validators come from ``updated_at`` and the
+    collection's ResourceVersion (and those of the collections the list's
+    filters read), so a 304 costs a single narrow query and never serialises
+    anything. Collection versions are shared by all tenants,
+    so validators include the caller's tenant and responses vary on the
+    tenant header.
+    """
+
+    def make_etag(self, *parts):
+        parts += (
+            tenants.current_tenant.get(),
+            self.request.accepted_renderer.format,
+            self.request.META.get("QUERY_STRING", ""),
+        )
+        digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def not_modified(self, etag, updated_at):
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            self.set_validators(response, etag, updated_at)
+        return response
+
+    def set_validators(self, response, etag, updated_at):
+        response.headers.setdefault("ETag", etag)
+        patch_vary_headers(response, [tenants.get_config()["HEADER"]])
+        if updated_at is not None:
+            response.headers.setdefault(
+                "Last-Modified", http_date(updated_at.timestamp())
+            )
+        return response
+
+    def get_list_models(self):
+        """The models whose collection versions validate the list."""
+        models = [self.get_queryset().model]
+        depends_on = getattr(getattr(self, "filter_class", None), "depends_on", {})
+        for name, related in depends_on.items():
+            if name in self.request.query_params:
+                models += [model for model in related if model not in models]
+        return models
+
+    def list(self, request, *args, **kwargs):
+        models = self.get_list_models()
+        versions, updated_at = versioning.get_collection_versions(models)
+        names = map(versioning.collection_name, models)
+        etag = self.make_etag(*(part for pair in zip(names, versions) for part in pair))
+        response = self.not_modified(etag, updated_at)
+        if response is not None:
+            return response
+        response = super().list(request, *args, **kwargs)
+        return self.set_validators(response, etag, updated_at)
+
+    def retrieve(self, request, *args, **kwargs):
+        model = self.get_queryset().model
+        if any(header in request.headers for header in CONDITIONAL_HEADERS):
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            updated_at = (
+                self.filter_queryset(self.get_queryset())
+                .prefetch_related(None)
+                .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                .values_list("updated_at", flat=True)
+                .first()
+            )
+            if updated_at is not None:
+                etag = self.make_etag(
+                    model._meta.label_lower, kwargs[lookup_url_kwarg], updated_at
+                )
+                response = self.not_modified(etag, updated_at)
+                if response is not None:
+                    return response
+
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        etag = self.make_etag(model._meta.label_lower, instance.pk, instance.updated_at)
+        return self.set_validators(Response(serializer.data), etag, instance.updated_at)
+
+
+class SparseFieldsMixin:
+    """Load only the columns and relations a ``?fields=``/``?exclude=`` read needs.
+
+    ``prefetches`` maps many-to-many field names to the prefetch used when the
+    field is part of the response.
+    """
+
+    prefetches = {}
+
+    def get_sparse_fields(self):
+        serializer_class = self.get_serializer_class()
+        if not hasattr(serializer_class, "get_sparse_fields"):
+            return None
+        return serializer_class.get_sparse_fields(self.request)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset.prefetch_related(*self.prefetches.values())
+        queryset = queryset.prefetch_related(
+            *(prefetch for name, prefetch in self.prefetches.items() if name in fields)
+        )
+        opts = queryset.model._meta
+        columns = [name for name in fields if not opts.get_field(name).many_to_many]
+        # Conditional GETs need updated_at for the validators.
+        if any(field.name == "updated_at" for field in opts.concrete_fields):
+            columns.append("updated_at")
+        return queryset.only(*columns)
+
+
+class ValuesListMixin(SparseFieldsMixin):
+    """Serialise list pages from ``.values()`` rows with ``values_serializer_class``."""
+
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.values_serializer_class
+        fields = self.get_sparse_fields()
+        queryset = serializer_class.values(
+            self.filter_queryset(self.get_queryset()), fields
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page, fields).data)
+        return Response(serializer_class(queryset, fields).data)
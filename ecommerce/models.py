@@ -1,32 +1,337 @@
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from ecommerce.tenants import TenantManager, get_current_tenant_id, tenant_scope
 
 # Create your models here.
 
 
+class Tenant(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+def tenant_field(related_name, **kwargs):
+    # Rows belong to the tenant active when they are created; see
+    # ecommerce.tenants.
+    return models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        default=get_current_tenant_id,
+        editable=False,
+        related_name=related_name,
+        **kwargs,
+    )
+
+
 class Permission(models.Model):
-    code = models.CharField(max_length=7, unique=True)
+    tenant = tenant_field("permissions")
+    code = models.CharField(max_length=7)
     name = models.CharField(max_length=100)
+    # Position of the permission in role/person bitmasks. Assigned once from
+    # the tenant's counter and never changed or reused; rows created with
+    # bulk_create() get one the next time the catalog is loaded (see
+    # ecommerce.bitsets). Bits are unique within a tenant.
+    bit = models.PositiveIntegerField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager()
+    all_tenants = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "code"], name="unique_permission_code"
+            ),
+            models.UniqueConstraint(
+                fields=["tenant", "bit"], name="unique_permission_bit"
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        from ecommerce.bitsets import allocate_bits
+
+        if self.bit is None:
+            self.bit = allocate_bits(self.tenant_id, 1)
+        super().save(*args, **kwargs)
+
+    def get_roles(self):
+        """Roles granting this permission directly or through included roles."""
+        return Role.objects.filter(pk__in=Permission.granting_role_ids(pk=self.pk))
+
+    def get_persons(self):
+        """Persons holding this permission through any of their roles."""
+        # A semi-join instead of a join, so persons holding the permission
+        # through several roles are not repeated and no DISTINCT is needed.
+        return Person.objects.filter(pk__in=Permission.holder_ids(pk=self.pk))
+
+    @staticmethod
+    def granting_role_ids(**lookup):
+        """Subquery of the roles granting the permissions matching ``lookup``."""
+        closure = RoleClosure.objects.filter(
+            **{
+                f"descendant__permissions__{key}": value
+                for key, value in lookup.items()
+            }
+        )
+        return closure.values("ancestor_id")
+
+    @staticmethod
+    def holder_ids(**lookup):
+        """Subquery of the persons holding the permissions matching ``lookup``."""
+        if getattr(settings, "ECOMMERCE_MATERIALIZE_PERMISSIONS", False):
+            lookup = {f"permission__{key}": value for key, value in lookup.items()}
+            holders = PersonPermission.objects.filter(**lookup)
+        else:
+            holders = Person.roles.through.objects.filter(
+                role__in=Permission.granting_role_ids(**lookup)
+            )
+        return holders.values("person_id")
+
 
 class Role(models.Model):
-    name = models.CharField(max_length=100, unique=True)
+    tenant = tenant_field("roles")
+    name = models.CharField(max_length=100)
     permissions = models.ManyToManyField(Permission, related_name="roles")
+    # A role grants the permissions of every role it includes, transitively.
+    includes = models.ManyToManyField(
+        "self", symmetrical=False, related_name="included_by", blank=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager()
+    all_tenants = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tenant", "name"], name="unique_role_name")
+        ]
 
     def __str__(self):
         return self.name
 
+    def get_permission_mask(self):
+        from ecommerce.bitsets import get_masks_for_roles
+
+        # The catalog maps the codes of one tenant to bits.
+        with tenant_scope(self.tenant_id):
+            return get_masks_for_roles([self.pk])[self.pk]
+
 
 class Person(models.Model):
+    # Hash partitioned by tenant on PostgreSQL, so the primary key and unique
+    # constraints there include the tenant; see the 0015_tenants migration.
+    tenant = tenant_field("persons")
     name = models.CharField(max_length=100)
-    email = models.EmailField(unique=True)
+    email = models.EmailField()
     password = models.CharField(max_length=128)
-    roles = models.ManyToManyField(Role, related_name="persons")
+    roles = models.ManyToManyField(Role, related_name="persons", through="PersonRole")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager()
+    all_tenants = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "email"], name="unique_person_email"
+            )
+        ]
+        indexes = [
+            # Case-insensitive email lookups; see ecommerce.filters
+            models.Index(Upper("email"), name="person_email_upper_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
     def get_permissions(self):
-        return Permission.objects.filter(roles__persons=self).distinct()
+        if getattr(settings, "ECOMMERCE_MATERIALIZE_PERMISSIONS", False):
+            return Permission.objects.filter(person_grants__person=self)
+        return Permission.objects.filter(
+            roles__ancestor_links__ancestor__persons=self
+        ).distinct()
+
+    def get_permission_codes(self):
+        from ecommerce.cache import get_permission_codes_for_persons
+
+        return get_permission_codes_for_persons([self.pk])[self.pk]
+
+    def has_permission(self, code):
+        return code in self.get_permission_codes()
+
+    def get_permission_mask(self):
+        from ecommerce.bitsets import get_masks_for_persons
+
+        with tenant_scope(self.tenant_id):
+            return get_masks_for_persons([self.pk])[self.pk]
+
+
+class PersonRole(models.Model):
+    # The Person.roles through table, partitioned like Person. Rows get the
+    # active tenant, which must be the person's; PostgreSQL enforces it with a
+    # foreign key on (tenant_id, person_id).
+    tenant = tenant_field("+")
+    person = models.ForeignKey(Person, on_delete=models.CASCADE)
+    role = models.ForeignKey(Role, on_delete=models.CASCADE)
+
+    objects = TenantManager()
+    all_tenants = models.Manager()
+
+    class Meta:
+        db_table = "ecommerce_person_roles"
+        unique_together = [("person", "role")]
+        indexes = [
+            # "Persons with role X" as an ordered index range scan
+            models.Index(fields=["role", "person"], name="person_roles_role_person_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.person_id}:{self.role_id}"
+
+
+class RoleClosure(models.Model):
+    # Transitive closure of Role.includes, maintained by ecommerce.hierarchy.
+    # Every role has a row for itself, so the roles whose permissions a role
+    # grants are always one indexed lookup away. ``paths`` counts the distinct
+    # include chains from ancestor to descendant so removing an include can be
+    # applied incrementally.
+    ancestor = models.ForeignKey(
+        Role, on_delete=models.CASCADE, related_name="descendant_links"
+    )
+    descendant = models.ForeignKey(
+        Role, on_delete=models.CASCADE, related_name="ancestor_links"
+    )
+    paths = models.IntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestor", "descendant"], name="unique_role_closure"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["descendant", "ancestor"], name="closure_descendant_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id}>{self.descendant_id}"
+
+
+class PersonPermission(models.Model):
+    # Denormalised effective permissions, maintained from the M2M signals when
+    # ECOMMERCE_MATERIALIZE_PERMISSIONS is on. ``grants`` counts the roles
+    # that grant the permission so removals can be applied incrementally.
+    # No database constraint: a foreign key to the partitioned person table
+    # would need a tenant column here.
+    person = models.ForeignKey(
+        Person,
+        on_delete=models.CASCADE,
+        related_name="permission_grants",
+        db_constraint=False,
+    )
+    permission = models.ForeignKey(
+        Permission, on_delete=models.CASCADE, related_name="person_grants"
+    )
+    code = models.CharField(max_length=7)
+    grants = models.IntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["person", "permission"], name="unique_person_permission"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["person", "code"], name="person_code_idx"),
+            # Reverse lookups of the persons holding a permission
+            models.Index(fields=["permission", "person"], name="permission_person_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.person_id}:{self.code}"
+
+
+class ResourceVersion(models.Model):
+    # One row per collection, bumped on every change; see ecommerce.versioning
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name}@{self.version}"
+
+
+def log_tenant_field():
+    # History outlives the tenant, so no constraint and no cascade.
+    return models.ForeignKey(
+        Tenant,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        default=get_current_tenant_id,
+        related_name="+",
+    )
+
+
+class AuditEvent(models.Model):
+    # Written in batches by ecommerce.audit after the change commits.
+    # ``target`` is the row the change was made through; M2M changes list the
+    # ids added to or removed from ``relation`` in ``related_ids``.
+    tenant = log_tenant_field()
+    created_at = models.DateTimeField(default=timezone.now)
+    actor = models.CharField(max_length=150, blank=True)
+    remote_addr = models.GenericIPAddressField(null=True, blank=True)
+    action = models.CharField(max_length=10)
+    target_type = models.CharField(max_length=20)
+    target_id = models.BigIntegerField()
+    relation = models.CharField(max_length=20, blank=True)
+    related_ids = models.JSONField(default=list, blank=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["tenant", "created_at"], name="audit_tenant_idx"),
+            models.Index(fields=["actor", "created_at"], name="audit_actor_idx"),
+            models.Index(
+                fields=["target_type", "target_id", "created_at"],
+                name="audit_target_idx",
+            ),
+            models.Index(fields=["created_at"], name="audit_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.actor or '-'} {self.action} {self.target_type}:{self.target_id}"
+
+
+class ChangeLogEntry(models.Model):
+    # Append-only log behind the change feed; see ecommerce.versioning.
+    # Object entries (permissions, roles, persons) are upserts carrying the
+    # exported fields or deletes; relation entries (role_permissions,
+    # role_includes, person_roles) list the added or removed id pairs.
+    version = models.BigIntegerField(primary_key=True)
+    tenant = log_tenant_field()
+    created_at = models.DateTimeField(default=timezone.now)
+    resource = models.CharField(max_length=20)
+    action = models.CharField(max_length=10)
+    object_id = models.BigIntegerField(null=True, blank=True)
+    data = models.JSONField(null=True, blank=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["tenant", "version"], name="changelog_tenant_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.version} {self.action} {self.resource}"
@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class IdCursorPagination(CursorPagination):
+    # Keyset pagination on the primary key: every page is an indexed range
+    # scan, so deep pages cost the same as the first one.
+    ordering = "id"
+    page_size = None
+    page_size_query_param = "page_size"
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, "ECOMMERCE_MAX_PAGE_SIZE", 1000)
+
+    def get_page_size(self, request):
+        # Read PAGE_SIZE per request rather than at import time so it follows
+        # the current settings.
+        return super().get_page_size(request) or api_settings.PAGE_SIZE
+
+
+class NewestFirstCursorPagination(IdCursorPagination):
+    ordering = "-created_at"
+
+
+def estimate_count(queryset):
+    """Return the planner's row estimate for ``queryset``, or None."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]["Plan Rows"]
+
+
+def approximate_count(queryset):
+    """Return (count, exact): planner estimates replace large exact counts."""
+    threshold = getattr(settings, "ECOMMERCE_EXACT_COUNT_THRESHOLD", 10000)
+    estimate = estimate_count(queryset)
+    if estimate is None or estimate < threshold:
+        return queryset.count(), True
+    return estimate, False
+
+
+class CountedCursorPagination(IdCursorPagination):
+    """Keyset pagination that also reports a cheap, possibly estimated count."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count, self.count_exact = approximate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.count,
+                "count_exact": self.count_exact,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    UNUSABLE_PASSWORD_PREFIX,
+    check_password,
+    make_password,
+)
+from django.core.signals import setting_changed
+from rest_framework.exceptions import APIException
+
+from ecommerce.models import Person
+
+# Password hashing runs on a small dedicated thread pool. The hashers spend
+# their time in C code that releases the GIL, so a pool sized to the CPU count
+# keeps every core busy, while capping the hashes in flight stops a burst of
+# logins from tying up every request thread. Requests that find MAX_PENDING
+# hashes already queued are turned away with PoolBusy instead of waiting.
+
+DEFAULT_PASSWORD_HASHING = {
+    "WORKERS": os.cpu_count() or 1,
+    # Hashes queued or running at once, across all requests
+    "MAX_PENDING": 4 * (os.cpu_count() or 1),
+    # Seconds a request waits for its hash before giving up
+    "TIMEOUT": 5.0,
+}
+
+
+class PoolBusy(APIException):
+    status_code = 503
+    default_detail = "Too many password checks in progress, try again shortly."
+    default_code = "hashing_busy"
+    # Sent as Retry-After by DRF's exception handler
+    wait = 1
+
+
+def get_config():
+    return {
+        **DEFAULT_PASSWORD_HASHING,
+        **getattr(settings, "ECOMMERCE_PASSWORD_HASHING", {}),
+    }
+
+
+class HashingPool:
+    def __init__(self, workers, max_pending, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="hashing")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PoolBusy
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        try:
+            return self.submit(fn, *args).result(self.timeout)
+        except FutureTimeoutError:
+            raise PoolBusy from None
+
+    async def arun(self, fn, *args):
+        future = asyncio.wrap_future(self.submit(fn, *args))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolBusy from None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = get_config()
+                _pool = HashingPool(
+                    workers=config["WORKERS"],
+                    max_pending=config["MAX_PENDING"],
+                    timeout=config["TIMEOUT"],
+                )
+    return _pool
+
+
+def reset_pool(**kwargs):
+    global _pool
+    if kwargs.get("setting") in (None, "ECOMMERCE_PASSWORD_HASHING"):
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+
+
+setting_changed.connect(reset_pool)
+
+
+def hash_password(raw_password):
+    """Hash a password with the preferred hasher, on the hashing pool."""
+    return get_pool().run(make_password, raw_password)
+
+
+def _check(raw_password, encoded):
+    """Return (valid, new encoded password if the stored one is outdated)."""
+    if not encoded or encoded.startswith(UNUSABLE_PASSWORD_PREFIX):
+        # Unknown email or no password set: hash anyway so the response takes
+        # as long as for a wrong password.
+        make_password(raw_password)
+        return False, None
+    upgraded = []
+    # The setter runs when the hash is valid but uses an older hasher or
+    # fewer iterations than the current settings ask for.
+    valid = check_password(
+        raw_password, encoded, setter=lambda raw: upgraded.append(make_password(raw))
+    )
+    return valid, upgraded[0] if upgraded else None
+
+
+def _login_queryset(email):
+    return Person.objects.filter(email=email).only("id", "name", "email", "password")
+
+
+def _upgrade_queryset(person):
+    # Only replace the hash that was verified, so a password changed in the
+    # meantime is never overwritten.
+    return Person.objects.filter(pk=person.pk, password=person.password)
+
+
+def authenticate(email, password):
+    """Return the person with this email and password, or None."""
+    person = _login_queryset(email).first()
+    encoded = person.password if person is not None else None
+    valid, upgraded = get_pool().run(_check, password, encoded)
+    if not valid:
+        return None
+    if upgraded:
+        _upgrade_queryset(person).update(password=upgraded)
+    return person
+
+
+async def aauthenticate(email, password):
+    """Async counterpart of authenticate()."""
+    person = await _login_queryset(email).afirst()
+    encoded = person.password if person is not None else None
+    valid, upgraded = await get_pool().arun(_check, password, encoded)
+    if not valid:
+        return None
+    if upgraded:
+        await _upgrade_queryset(person).aupdate(password=upgraded)
+    return person
@@ -0,0 +1,88 @@
+import math
+import re
+
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson-backed drop-in replacements for DRF's JSON renderer and parser. The
+# output is byte-identical to JSONRenderer with the default COMPACT_JSON and
+# UNICODE_JSON settings; anything orjson would format differently (indented
+# output, ASCII escaping, floats Python writes with an exponent, NaN and
+# infinities, types it does not know) goes through the DRF implementation
+# instead. Without orjson installed both classes behave exactly like the DRF
+# ones.
+
+# Dates and times are passed through to DRF's encoder, whose format differs
+# from orjson's native one.
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+
+# orjson writes 1e-07 as 1e-7 and 1e-05 as 0.00001, where Python uses an
+# exponent for every nonzero float below 1e-4. Any match, even inside a
+# string, just means rendering again with DRF.
+EXPONENT = re.compile(rb"\d[eE][-+]?\d|(?<![\d.])0\.0000")
+
+
+def has_non_finite(data):
+    """Whether ``data`` holds NaN or an infinity, which orjson writes as null
+    and JSONRenderer rejects."""
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(map(has_non_finite, data.values()))
+    if isinstance(data, (list, tuple)):
+        return any(map(has_non_finite, data))
+    return False
+
+
+def _default(obj):
+    return encoders.JSONEncoder().default(obj)
+
+
+def is_fast_path(renderer, accepted_media_type, renderer_context):
+    if orjson is None or not getattr(settings, "ECOMMERCE_FAST_JSON", True):
+        return False
+    if renderer.ensure_ascii or not renderer.compact:
+        return False
+    return renderer.get_indent(accepted_media_type, renderer_context or {}) is None
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not is_fast_path(
+            self, accepted_media_type, renderer_context
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if EXPONENT.search(ret) or (b"null" in ret and has_non_finite(data)):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Match JSONRenderer, which escapes these for JavaScript embedding.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028")
+            ret = ret.replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
@@ -0,0 +1,109 @@
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Reads go to a random replica from ECOMMERCE_READ_REPLICAS and writes to the
+# primary. A request is pinned to the primary once it writes, or when the
+# client wrote within the last ECOMMERCE_PRIMARY_PIN_SECONDS (tracked with a
+# cookie by PrimaryPinningMiddleware), so clients always read their own writes
+# even while the replicas lag behind.
+
+PIN_COOKIE = "ecommerce_primary_until"
+
+# Holds a mutable dict so that pins made in sync_to_async threads, which run
+# in a copy of the context, are visible to the middleware.
+_state = ContextVar("ecommerce_primary_pin")
+
+
+def _get_state():
+    try:
+        return _state.get()
+    except LookupError:
+        state = {"pinned": False, "wrote": False}
+        _state.set(state)
+        return state
+
+
+def get_replicas():
+    return getattr(settings, "ECOMMERCE_READ_REPLICAS", [])
+
+
+def pin_primary():
+    _get_state()["wrote"] = True
+
+
+def is_pinned():
+    state = _get_state()
+    return state["pinned"] or state["wrote"]
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or is_pinned():
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction on the primary must see its writes.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class PrimaryPinningMiddleware:
+    """Pin requests to the primary for a short window after a client writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _state.set({"pinned": self.recently_wrote(request), "wrote": False})
+        try:
+            return self.finish(request, self.get_response(request))
+        finally:
+            _state.reset(token)
+
+    async def __acall__(self, request):
+        token = _state.set({"pinned": self.recently_wrote(request), "wrote": False})
+        try:
+            return self.finish(request, await self.get_response(request))
+        finally:
+            _state.reset(token)
+
+    def recently_wrote(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def finish(self, request, response):
+        if _get_state()["wrote"]:
+            seconds = settings.ECOMMERCE_PRIMARY_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -1,26 +1,343 @@
+from collections import defaultdict
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, identify_hasher
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from ecommerce.models import Permission, Role, Person
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.utils.serializer_helpers import ReturnList
+from rest_framework.validators import UniqueValidator
+from ecommerce import hierarchy, passwords
+from ecommerce.models import AuditEvent, Permission, Role, Person
+
+
+def parse_field_list(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def readable_fields(serializer_class):
+    """``Meta.fields`` without the write-only ones."""
+    meta = serializer_class.Meta
+    extra_kwargs = getattr(meta, "extra_kwargs", {})
+    return [
+        name
+        for name in meta.fields
+        if not extra_kwargs.get(name, {}).get("write_only", False)
+    ]
+
+
+def unique_in_tenant(model, field):
+    """What DRF derives for ``unique=True``, for fields unique per tenant."""
+    verbose_name = model._meta.get_field(field).verbose_name
+    return UniqueValidator(
+        queryset=model.objects.all(),
+        message=f"{model._meta.verbose_name} with this {verbose_name} already exists.",
+    )
+
+
+class SparseFieldsMixin:
+    """Limit read responses to ``?fields=a,b`` and drop ``?exclude=c,d``."""
+
+    @classmethod
+    def get_sparse_fields(cls, request):
+        """Return the requested field names, or None for all of them."""
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = request.query_params
+        if "fields" not in params and "exclude" not in params:
+            return None
+        available = readable_fields(cls)
+        requested = parse_field_list(params.get("fields", ",".join(available)))
+        excluded = parse_field_list(params.get("exclude", ""))
+        unknown = (set(requested) | set(excluded)) - set(available)
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": [f"Unknown field {name!r}." for name in sorted(unknown)]}
+            )
+        return [
+            name for name in available if name in requested and name not in excluded
+        ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.get_sparse_fields(self.context.get("request"))
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
-class PermissionSerializer(serializers.ModelSerializer):
+
+class PermissionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Permission
-        fields = ["id", "code", "name"]
+        fields = ["id", "code", "name", "bit"]
+        extra_kwargs = {"code": {"validators": [unique_in_tenant(Permission, "code")]}}
 
 
-class RoleSerializer(serializers.ModelSerializer):
+class RoleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     permissions = serializers.PrimaryKeyRelatedField(
         queryset=Permission.objects.all(), many=True
     )
+    includes = serializers.PrimaryKeyRelatedField(
+        queryset=Role.objects.all(), many=True, required=False
+    )
 
     class Meta:
         model = Role
-        fields = ["id", "name", "permissions"]
+        fields = ["id", "name", "permissions", "includes"]
+        extra_kwargs = {"name": {"validators": [unique_in_tenant(Role, "name")]}}
+
+    def validate_includes(self, value):
+        if self.instance is not None:
+            try:
+                hierarchy.check_includes((self.instance.pk, role.pk) for role in value)
+            except DjangoValidationError as error:
+                raise serializers.ValidationError(error.messages)
+        return value
 
 
-class PersonSerializer(serializers.ModelSerializer):
+class PersonSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     roles = serializers.PrimaryKeyRelatedField(queryset=Role.objects.all(), many=True)
 
     class Meta:
         model = Person
-        fields = ["id", "name", "email", "roles"]
+        fields = ["id", "name", "email", "roles", "password"]
+        extra_kwargs = {
+            "email": {"validators": [unique_in_tenant(Person, "email")]},
+            "password": {
+                "write_only": True,
+                "required": False,
+                "style": {"input_type": "password"},
+            },
+        }
+
+    def validate_password(self, value):
+        try:
+            validate_password(value)
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(error.messages)
+        return passwords.hash_password(value)
+
+
+class RoleSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Role
+        fields = ["id", "name"]
+
+
+class PersonSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Person
+        fields = ["id", "name", "email"]
+
+
+class ValuesSerializer:
+    """Read-only list serializer building output from ``.values()`` rows.
+
+    Produces the same representation as ``serializer_class`` for models whose
+    fields are plain columns plus many-to-many primary keys, without creating
+    model instances or running per-field serializer logic. Related ids are
+    loaded with one query on each through table.
+    """
+
+    serializer_class = None
+
+    def __init__(self, rows, fields=None):
+        self.rows = rows
+        self.model = self.serializer_class.Meta.model
+        self.columns, self.related = self.split_fields(fields)
+
+    @classmethod
+    def split_fields(cls, fields=None):
+        meta = cls.serializer_class.Meta
+        if fields is None:
+            fields = readable_fields(cls.serializer_class)
+        related = [
+            name for name in fields if meta.model._meta.get_field(name).many_to_many
+        ]
+        columns = [name for name in fields if name not in related]
+        return columns, related
+
+    @classmethod
+    def values(cls, queryset, fields=None):
+        """Return ``queryset`` as the rows this serializer expects."""
+        columns, _ = cls.split_fields(fields)
+        # The primary key is needed to attach related ids.
+        return queryset.prefetch_related(None).values(*dict.fromkeys(["id", *columns]))
+
+    def get_related_ids(self, name, pks):
+        field = self.model._meta.get_field(name)
+        source = field.m2m_column_name()
+        target = field.m2m_reverse_name()
+        ids = defaultdict(list)
+        rows = (
+            field.remote_field.through.objects.filter(**{f"{source}__in": pks})
+            .order_by(source, target)
+            .values_list(source, target)
+        )
+        for pk, related_pk in rows:
+            ids[pk].append(related_pk)
+        return ids
+
+    @property
+    def data(self):
+        # Copies: the paginator still reads the ids of the page rows when it
+        # builds the next link.
+        rows = [dict(row) for row in self.rows]
+        pks = [row["id"] for row in rows]
+        for name in self.related:
+            ids = self.get_related_ids(name, pks) if pks else {}
+            for row in rows:
+                row[name] = ids.get(row["id"], [])
+        if "id" not in self.columns:
+            for row in rows:
+                del row["id"]
+        return ReturnList(rows, serializer=self)
+
+
+class RoleValuesSerializer(ValuesSerializer):
+    serializer_class = RoleSerializer
+
+
+class PersonValuesSerializer(ValuesSerializer):
+    serializer_class = PersonSerializer
+
+
+class LoginSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    password = serializers.CharField(
+        max_length=4096, trim_whitespace=False, style={"input_type": "password"}
+    )
+
+
+class PermissionCheckSerializer(serializers.Serializer):
+    person_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+    codes = serializers.ListField(
+        child=serializers.CharField(max_length=7), allow_empty=False, max_length=1000
+    )
+
+
+class PermissionIdsSerializer(serializers.Serializer):
+    permission_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=10000
+    )
+
+
+class RoleIdsSerializer(serializers.Serializer):
+    role_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=10000
+    )
+
+
+class RoleAssignmentSerializer(serializers.Serializer):
+    person_id = serializers.IntegerField()
+    role_id = serializers.IntegerField()
+
+
+class RoleAssignmentsSerializer(serializers.Serializer):
+    assignments = RoleAssignmentSerializer(
+        many=True, allow_empty=False, max_length=10000
+    )
+
+
+# Import serializers validate one row without touching the database; the
+# importer checks uniqueness and resolves references once per batch.
+class ReferenceField(serializers.Field):
+    """An integer id or the natural key (code, name or email) of a row."""
+
+    default_error_messages = {"invalid": "Expected an id or a natural key."}
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("invalid")
+        if isinstance(data, int):
+            return data
+        if isinstance(data, str) and data.strip():
+            data = data.strip()
+            return int(data) if data.isdigit() else data
+        self.fail("invalid")
+
+
+class PermissionImportSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=7)
+    name = serializers.CharField(max_length=100)
+
+
+class RoleImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100)
+    permissions = serializers.ListField(child=ReferenceField(), required=False)
+
+
+class PersonImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100)
+    email = serializers.EmailField()
+    password = serializers.CharField(max_length=128, required=False)
+    roles = serializers.ListField(child=ReferenceField(), required=False)
+
+    def validate_password(self, value):
+        # Hashing is far too slow for bulk loads, so only accept values that
+        # are already hashed.
+        if value.startswith(UNUSABLE_PASSWORD_PREFIX):
+            return value
+        try:
+            identify_hasher(value)
+        except ValueError:
+            raise serializers.ValidationError("Expected an already hashed password.")
+        return value
+
+
+class RolePermissionImportSerializer(serializers.Serializer):
+    role_id = ReferenceField()
+    permission_id = ReferenceField()
+
+
+class PersonRoleImportSerializer(serializers.Serializer):
+    person_id = ReferenceField()
+    role_id = ReferenceField()
+
+
+class RoleIncludeImportSerializer(serializers.Serializer):
+    role_id = ReferenceField()
+    included_role_id = ReferenceField()
+
+
+class AuditEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditEvent
+        fields = [
+            "id",
+            "created_at",
+            "actor",
+            "remote_addr",
+            "action",
+            "target_type",
+            "target_id",
+            "relation",
+            "related_ids",
+        ]
+
+
+class AuditQuerySerializer(serializers.Serializer):
+    actor = serializers.CharField(max_length=150, required=False)
+    target_type = serializers.ChoiceField(
+        ["permission", "role", "person"], required=False
+    )
+    target_id = serializers.IntegerField(required=False)
+    action = serializers.ChoiceField(
+        ["create", "update", "delete", "add", "remove"], required=False
+    )
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if "target_id" in attrs and "target_type" not in attrs:
+            raise serializers.ValidationError(
+                {"target_type": ["Required with target_id."]}
+            )
+        return attrs
+
+
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, required=False)
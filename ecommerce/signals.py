@@ -0,0 +1,306 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from ecommerce import audit, hierarchy, materialized, versioning
+from ecommerce.bitsets import invalidate_permission_bits
+from ecommerce.cache import invalidate_persons, invalidate_roles
+from ecommerce.models import Permission, Person, Role, Tenant
+from ecommerce.tenants import forget_tenant
+
+CHANGE_ACTIONS = ("post_add", "post_remove", "post_clear")
+
+
+def _invalidate(invalidate, ids):
+    ids = list(ids)
+    if not ids:
+        return
+    invalidate(ids)
+    # A concurrent reader may repopulate the cache from the old rows before
+    # the write commits, so drop the entries once more after commit.
+    transaction.on_commit(lambda: invalidate(ids))
+
+
+@receiver(m2m_changed, sender=Person.roles.through)
+def person_roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        instance._cleared_person_ids = list(
+            instance.persons.values_list("pk", flat=True)
+        )
+    if action not in CHANGE_ACTIONS:
+        return
+    if not reverse:
+        person_ids = [instance.pk]
+    elif action == "post_clear":
+        person_ids = instance.__dict__.pop("_cleared_person_ids")
+    else:
+        person_ids = pk_set
+    _invalidate(invalidate_persons, person_ids)
+    versioning.touch(Person, person_ids)
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def role_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        instance._cleared_role_ids = list(instance.roles.values_list("pk", flat=True))
+    if action not in CHANGE_ACTIONS:
+        return
+    if not reverse:
+        role_ids = [instance.pk]
+    elif action == "post_clear":
+        role_ids = instance.__dict__.pop("_cleared_role_ids")
+    else:
+        role_ids = pk_set
+    # Roles including a changed role grant its permissions too.
+    _invalidate(invalidate_roles, hierarchy.ancestor_ids(role_ids))
+    versioning.touch(Role, role_ids)
+
+
+@receiver(post_save, sender=Permission)
+def permission_saved(sender, instance, created, **kwargs):
+    _invalidate(
+        lambda ids: invalidate_permission_bits(instance.tenant_id), [instance.pk]
+    )
+    # Role entries store permission codes, so a renamed code is stale.
+    if not created:
+        role_ids = instance.roles.values_list("pk", flat=True)
+        _invalidate(invalidate_roles, hierarchy.ancestor_ids(role_ids))
+
+
+@receiver(pre_delete, sender=Permission)
+def permission_deleting(sender, instance, **kwargs):
+    # The through rows are gone by post_delete, so remember the roles now.
+    role_ids = instance.roles.values_list("pk", flat=True)
+    instance._deleted_role_ids = list(role_ids)
+    instance._affected_role_ids = hierarchy.ancestor_ids(role_ids)
+
+
+@receiver(post_delete, sender=Permission)
+def permission_deleted(sender, instance, **kwargs):
+    role_ids = instance.__dict__.pop("_deleted_role_ids", [])
+    _invalidate(
+        lambda ids: invalidate_permission_bits(instance.tenant_id), [instance.pk]
+    )
+    _invalidate(invalidate_roles, instance.__dict__.pop("_affected_role_ids", []))
+    versioning.touch(Role, role_ids)
+
+
+@receiver(post_save, sender=Role)
+def role_saved(sender, instance, created, **kwargs):
+    if created:
+        hierarchy.add_roles([instance.pk])
+
+
+@receiver(m2m_changed, sender=Role.includes.through)
+def role_includes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    related = instance.included_by if reverse else instance.includes
+    if action == "pre_add":
+        pairs = _forward_pairs(instance, reverse, pk_set)
+        hierarchy.lock(instance.tenant_id)
+        hierarchy.check_includes(pairs)
+    changed, sign = _changed_pk_sets(
+        instance,
+        action,
+        pk_set,
+        related,
+        "_hierarchy_pk_set",
+        kwargs.get("verified", False),
+    )
+    if changed:
+        _apply_includes(_forward_pairs(instance, reverse, changed), sign)
+
+
+def _forward_pairs(instance, reverse, pk_set):
+    if reverse:
+        return [(pk, instance.pk) for pk in pk_set]
+    return [(instance.pk, pk) for pk in pk_set]
+
+
+def _apply_includes(pairs, sign):
+    hierarchy.apply_includes(pairs, sign)
+    role_ids = {role_id for role_id, _ in pairs}
+    # The including roles and everything including them gain or lose the
+    # permissions of the included roles.
+    affected = hierarchy.ancestor_ids(role_ids)
+    _invalidate(invalidate_roles, affected)
+    if materialized.is_enabled():
+        materialized.refresh_role_holders(affected)
+    versioning.touch(Role, role_ids)
+
+
+@receiver(pre_delete, sender=Role)
+def role_detaching(sender, instance, **kwargs):
+    # The include rows are deleted without m2m_changed, so take the role out
+    # of the hierarchy first. This runs before the materialization receiver
+    # below, which then only has to handle the role's own holders.
+    pairs = [(instance.pk, pk) for pk in instance.includes.values_list("pk", flat=True)]
+    pairs += [
+        (pk, instance.pk) for pk in instance.included_by.values_list("pk", flat=True)
+    ]
+    if pairs:
+        _apply_includes(pairs, -1)
+
+
+@receiver(pre_delete, sender=Role)
+def role_deleting(sender, instance, **kwargs):
+    # The persons' role lists change, but their through rows are deleted
+    # without m2m_changed.
+    versioning.touch(Person, instance.persons.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Role)
+def role_deleted(sender, instance, **kwargs):
+    # Person entries may still list the deleted role id; it resolves to an
+    # empty set of codes once the role entry is gone, so they stay correct.
+    _invalidate(invalidate_roles, [instance.pk])
+
+
+@receiver(post_delete, sender=Person)
+def person_deleted(sender, instance, **kwargs):
+    _invalidate(invalidate_persons, [instance.pk])
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_save, sender=Role)
+@receiver(post_save, sender=Person)
+@receiver(post_delete, sender=Permission)
+@receiver(post_delete, sender=Role)
+@receiver(post_delete, sender=Person)
+def collection_changed(sender, **kwargs):
+    versioning.bump_collection(sender)
+
+
+def _changed_pk_sets(instance, action, pk_set, related, stash, verified=False):
+    # Returns the pk_set actually affected by a post_* action. remove() passes
+    # the requested ids unfiltered and clear() passes none, so the real set
+    # is captured from the pre_* action. The bulk assignment paths send
+    # ``verified`` pk_sets that need no filtering.
+    if action == "pre_remove":
+        if not verified:
+            pk_set = related.filter(pk__in=pk_set).values_list("pk", flat=True)
+        setattr(instance, stash, set(pk_set))
+    elif action == "pre_clear":
+        setattr(instance, stash, set(related.values_list("pk", flat=True)))
+    elif action == "post_add":
+        return pk_set, 1
+    elif action in ("post_remove", "post_clear"):
+        return instance.__dict__.pop(stash), -1
+    return None, 0
+
+
+@receiver(m2m_changed, sender=Person.roles.through)
+def materialize_person_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if not materialized.is_enabled():
+        return
+    related = instance.persons if reverse else instance.roles
+    changed, sign = _changed_pk_sets(
+        instance,
+        action,
+        pk_set,
+        related,
+        "_materialize_pk_set",
+        kwargs.get("verified", False),
+    )
+    if not changed:
+        return
+    if reverse:
+        materialized.apply_person_roles(changed, [instance.pk], sign)
+    else:
+        materialized.apply_person_roles([instance.pk], changed, sign)
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def materialize_role_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if not materialized.is_enabled():
+        return
+    related = instance.roles if reverse else instance.permissions
+    changed, sign = _changed_pk_sets(
+        instance,
+        action,
+        pk_set,
+        related,
+        "_materialize_pk_set",
+        kwargs.get("verified", False),
+    )
+    if not changed:
+        return
+    if reverse:
+        materialized.apply_role_permissions(changed, [instance.pk], sign)
+    else:
+        materialized.apply_role_permissions([instance.pk], changed, sign)
+
+
+@receiver(post_save, sender=Permission)
+def materialize_permission_code(sender, instance, created, **kwargs):
+    if materialized.is_enabled() and not created:
+        materialized.update_code(instance)
+
+
+@receiver(pre_delete, sender=Role)
+def materialize_role_delete(sender, instance, **kwargs):
+    # Deleting a role drops its through rows without m2m_changed.
+    if materialized.is_enabled():
+        permission_ids = instance.permissions.values_list("pk", flat=True)
+        materialized.apply_role_permissions([instance.pk], permission_ids, -1)
+
+
+# Relations are logged from the side of the field, whichever side changed.
+LOGGED_RELATIONS = {
+    field.remote_field.through: (field, resource)
+    for field, resource in (
+        (Person._meta.get_field("roles"), "person_roles"),
+        (Role._meta.get_field("permissions"), "role_permissions"),
+        (Role._meta.get_field("includes"), "role_includes"),
+    )
+}
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_save, sender=Role)
+@receiver(post_save, sender=Person)
+def log_saved(sender, instance, created, **kwargs):
+    if audit.is_enabled():
+        audit.record("create" if created else "update", instance)
+    if versioning.feed_enabled():
+        versioning.log_changes([versioning.object_change(instance)])
+
+
+@receiver(post_delete, sender=Permission)
+@receiver(post_delete, sender=Role)
+@receiver(post_delete, sender=Person)
+def log_deleted(sender, instance, **kwargs):
+    if audit.is_enabled():
+        audit.record("delete", instance)
+    if versioning.feed_enabled():
+        versioning.log_changes([versioning.object_change(instance, deleted=True)])
+
+
+@receiver(m2m_changed, sender=Person.roles.through)
+@receiver(m2m_changed, sender=Role.permissions.through)
+@receiver(m2m_changed, sender=Role.includes.through)
+def log_relation_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not (audit.is_enabled() or versioning.feed_enabled()):
+        return
+    field, resource = LOGGED_RELATIONS[sender]
+    name = field.remote_field.related_name if reverse else field.name
+    changed, sign = _changed_pk_sets(
+        instance,
+        action,
+        pk_set,
+        getattr(instance, name),
+        "_log_pk_set",
+        kwargs.get("verified", False),
+    )
+    if not changed:
+        return
+    if audit.is_enabled():
+        audit.record("add" if sign > 0 else "remove", instance, name, changed)
+    if versioning.feed_enabled():
+        pairs = _forward_pairs(instance, reverse, changed)
+        change = versioning.relation_change(instance, resource, pairs, sign > 0)
+        versioning.log_changes([change])
+
+
+@receiver(post_delete, sender=Tenant)
+def tenant_deleted(sender, instance, **kwargs):
+    forget_tenant(instance.pk)
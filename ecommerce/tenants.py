@@ -0,0 +1,196 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import models
+from django.db.models.sql import Query
+from django.db.models.sql.constants import CURSOR
+from django.db.models.sql.subqueries import DeleteQuery
+from django.http import JsonResponse
+
+# Every request runs on behalf of one tenant, taken from a header set by the
+# gateway. TenantMiddleware stores it in ``current_tenant`` and the queries of
+# the default managers of tenant-owned models filter on it, so views only see
+# the caller's rows and queries on the partitioned tables (see the
+# 0015_tenants migration) touch one partition. Rows created while a tenant is
+# active belong to it. Outside a request nothing is filtered and new rows
+# belong to DEFAULT_TENANT unless the code runs in ``tenant_scope()``.
+
+DEFAULT_TENANCY = {
+    # Request header naming the caller's tenant by id
+    "HEADER": "X-Tenant",
+    # Tenant of requests without the header, and of rows created outside one
+    "DEFAULT_TENANT": 1,
+}
+
+current_tenant = ContextVar("current_tenant", default=None)
+
+
+def get_config():
+    return {**DEFAULT_TENANCY, **getattr(settings, "ECOMMERCE_TENANCY", {})}
+
+
+def get_current_tenant_id():
+    """The active tenant, or DEFAULT_TENANT outside any; a field default."""
+    tenant_id = current_tenant.get()
+    return get_config()["DEFAULT_TENANT"] if tenant_id is None else tenant_id
+
+
+@contextmanager
+def tenant_scope(tenant_id):
+    """Act as ``tenant_id`` (None for all tenants) inside the block."""
+    token = current_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+
+def iter_in_tenant(iterable, tenant_id):
+    """Iterate ``iterable`` as ``tenant_id``, for responses streamed after the
+    view, and so the middleware, has returned."""
+    iterator = iter(iterable)
+    while True:
+        # Set per item: a streaming response may be iterated from several
+        # contexts, like sync_to_async threads under ASGI.
+        with tenant_scope(tenant_id):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class TenantQueryMixin:
+    """Filters on the active tenant when compiled to SQL.
+
+    The filter is added to a copy at compile time, never to the query itself,
+    so querysets built outside a request, like ``queryset =
+    Role.objects.all()`` on a view or serializer field, stay unbound and
+    every evaluation, subquery, count, update or delete sees the tenant
+    active at that moment.
+    """
+
+    tenant_filtered = False
+
+    def chain(self, klass=None):
+        # Keep the filter when update() or aggregate() switch the query class.
+        if klass is not None and not issubclass(klass, TenantQueryMixin):
+            klass = tenant_query_class(klass)
+        return super().chain(klass)
+
+    def get_compiler(self, using=None, connection=None, elide_empty=True):
+        tenant_id = current_tenant.get()
+        if tenant_id is None or self.tenant_filtered or self.combinator:
+            return super().get_compiler(using, connection, elide_empty)
+        query = self.clone()
+        query.tenant_filtered = True
+        query.add_q(models.Q(tenant_id=tenant_id))
+        return query.get_compiler(using, connection, elide_empty)
+
+
+_tenant_query_classes = {}
+
+
+def tenant_query_class(klass):
+    if klass not in _tenant_query_classes:
+        _tenant_query_classes[klass] = type(
+            f"Tenant{klass.__name__}", (TenantQueryMixin, klass), {}
+        )
+    return _tenant_query_classes[klass]
+
+
+class TenantQuerySet(models.QuerySet):
+    """Restricted to the tenant active when it hits the database."""
+
+    def __init__(self, model=None, query=None, using=None, hints=None):
+        if query is None:
+            query = tenant_query_class(Query)(model)
+        super().__init__(model, query, using, hints)
+
+    def _raw_delete(self, using):
+        # QuerySet._raw_delete() swaps the query class directly.
+        query = self.query.clone()
+        query.__class__ = tenant_query_class(DeleteQuery)
+        cursor = query.get_compiler(using).execute_sql(CURSOR)
+        if cursor:
+            with cursor:
+                return cursor.rowcount
+        return 0
+
+
+class TenantManager(models.Manager.from_queryset(TenantQuerySet)):
+    """Default manager of the models owned by a tenant."""
+
+
+# Tenants seen to exist. Deleting a tenant removes it here (see
+# ecommerce.signals); other workers keep accepting it until they restart, and
+# such requests find no rows and fail to write.
+_known_tenants = set()
+_known_tenants_lock = threading.Lock()
+
+
+def tenant_exists(tenant_id):
+    from ecommerce.models import Tenant
+
+    if tenant_id in _known_tenants or tenant_id == get_config()["DEFAULT_TENANT"]:
+        return True
+    if not Tenant.objects.filter(pk=tenant_id).exists():
+        return False
+    with _known_tenants_lock:
+        _known_tenants.add(tenant_id)
+    return True
+
+
+def forget_tenant(tenant_id):
+    with _known_tenants_lock:
+        _known_tenants.discard(tenant_id)
+
+
+def unknown_tenant():
+    return JsonResponse({"detail": "Unknown tenant."}, status=400)
+
+
+class TenantMiddleware:
+    """Run each request as the tenant named by the HEADER request header."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def parse(self, request):
+        """Return the caller's tenant id and None, or None and an error."""
+        config = get_config()
+        value = request.headers.get(config["HEADER"])
+        if value is None:
+            return config["DEFAULT_TENANT"], None
+        if not value.isdigit() or int(value) == 0:
+            return None, JsonResponse({"detail": "Invalid tenant."}, status=400)
+        return int(value), None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tenant_id, error = self.parse(request)
+        if error is None and not tenant_exists(tenant_id):
+            error = unknown_tenant()
+        if error is not None:
+            return error
+        with tenant_scope(tenant_id):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        tenant_id, error = self.parse(request)
+        if error is None and tenant_id not in _known_tenants:
+            if not await sync_to_async(tenant_exists)(tenant_id):
+                error = unknown_tenant()
+        if error is not None:
+            return error
+        with tenant_scope(tenant_id):
+            return await self.get_response(request)
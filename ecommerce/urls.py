@@ -1,6 +1,6 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
-from ecommerce import views
+from ecommerce import async_views, views
 
 router = DefaultRouter()
 router.register(r"roles", views.RoleDetail, basename="role")
@@ -13,5 +13,57 @@ urlpatterns = [
         views.PermissionDetail.as_view(),
         name="permission-detail",
     ),
+    path(
+        "permissions/<int:pk>/roles/",
+        views.PermissionRoles.as_view(),
+        name="permission-roles",
+    ),
+    path(
+        "permissions/<int:pk>/persons/",
+        views.PermissionPersons.as_view(),
+        name="permission-persons",
+    ),
+    path(
+        "permission-checks/",
+        views.PermissionCheck.as_view(),
+        name="permission-check",
+    ),
+    re_path(
+        r"^export/(?P<resource>[a-z_]+)\.(?P<file_format>ndjson|csv)$",
+        views.Export.as_view(),
+        name="export",
+    ),
+    re_path(
+        r"^import/(?P<resource>[a-z_]+)\.(?P<file_format>ndjson|csv)$",
+        views.Import.as_view(),
+        name="import",
+    ),
+    path(
+        "async/permissions/",
+        async_views.permission_list,
+        name="async-permission-list",
+    ),
+    path(
+        "async/permissions/<int:pk>/",
+        async_views.permission_detail,
+        name="async-permission-detail",
+    ),
+    path("async/roles/<int:pk>/", async_views.role_detail, name="async-role-detail"),
+    path(
+        "async/persons/<int:pk>/",
+        async_views.person_detail,
+        name="async-person-detail",
+    ),
+    path(
+        "async/permission-checks/",
+        async_views.permission_check,
+        name="async-permission-check",
+    ),
+    path("async/login/", async_views.login, name="async-login"),
+    path("changes/", views.ChangeFeed.as_view(), name="change-feed"),
+    path("login/", views.Login.as_view(), name="login"),
+    path("audit/", views.AuditEventList.as_view(), name="audit-list"),
+    path("stats/", views.RequestStatsView.as_view(), name="request-stats"),
+    path("ready/", views.Readiness.as_view(), name="readiness"),
     path("", include(router.urls)),
 ]
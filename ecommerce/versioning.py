@@ -0,0 +1,165 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ecommerce.export import RESOURCES
+from ecommerce.models import ChangeLogEntry, Permission, Person, ResourceVersion, Role
+
+# Every Permission, Role and Person row carries ``updated_at``, which is also
+# bumped when its M2M relations change, and every collection has a
+# ResourceVersion row bumped on any create, update, delete or M2M change.
+# Conditional GETs compare against these instead of loading the rows.
+#
+# The same changes are appended to ChangeLogEntry for the change feed. Entry
+# versions are taken from the CHANGE_LOG ResourceVersion row, whose update
+# holds a row lock until commit, so versions become visible in commit order
+# and a mirror polling with the last version it saw never skips an entry.
+
+_local = threading.local()
+
+CHANGE_LOG = "ecommerce.changelog"
+
+# Object entries carry the fields of the matching export resource, so mirrors
+# can bootstrap from an export and apply the feed with the same field names.
+FEED_RESOURCES = {Permission: "permissions", Role: "roles", Person: "persons"}
+
+
+def collection_name(model):
+    return model._meta.label_lower
+
+
+def get_collection_versions(models):
+    """Return ([version, ...], latest updated_at) for the models' collections."""
+    names = [collection_name(model) for model in models]
+    rows = {
+        name: (version, updated_at)
+        for name, version, updated_at in ResourceVersion.objects.filter(
+            name__in=names
+        ).values_list("name", "version", "updated_at")
+    }
+    versions = [rows.get(name, (0, None))[0] for name in names]
+    updated_at = max((row[1] for row in rows.values() if row[1]), default=None)
+    return versions, updated_at
+
+
+def bump_collection(model):
+    name = collection_name(model)
+    now = timezone.now()
+    updated = ResourceVersion.objects.filter(name=name).update(
+        version=F("version") + 1, updated_at=now
+    )
+    if not updated:
+        ResourceVersion.objects.get_or_create(
+            name=name, defaults={"version": 1, "updated_at": now}
+        )
+
+
+def _touch(model, pks):
+    model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+    bump_collection(model)
+
+
+def touch(model, pks):
+    """Mark rows as changed after a change that bypasses ``save()``."""
+    pks = set(pks)
+    if not pks:
+        return
+    pending = getattr(_local, "pending", None)
+    if pending is not None:
+        pending[model].update(pks)
+    else:
+        _touch(model, pks)
+
+
+@contextmanager
+def batch():
+    """Collect touch() calls and apply them as one update per model."""
+    if getattr(_local, "pending", None) is not None:
+        yield
+        return
+    _local.pending = defaultdict(set)
+    _local.changes = []
+    try:
+        yield
+        pending, changes = _local.pending, _local.changes
+    finally:
+        _local.pending = _local.changes = None
+    for model, pks in pending.items():
+        _touch(model, pks)
+    log_changes(changes)
+
+
+def feed_enabled():
+    return getattr(settings, "ECOMMERCE_CHANGE_FEED", True)
+
+
+def get_change_version():
+    """Return the version of the latest committed change log entry."""
+    row = ResourceVersion.objects.filter(name=CHANGE_LOG).values_list("version")
+    return (row.first() or (0,))[0]
+
+
+def allocate_versions(count):
+    """Reserve ``count`` consecutive change versions and return the last one."""
+    now = timezone.now()
+    rows = ResourceVersion.objects.filter(name=CHANGE_LOG)
+    if not rows.update(version=F("version") + count, updated_at=now):
+        ResourceVersion.objects.get_or_create(
+            name=CHANGE_LOG, defaults={"version": 0, "updated_at": now}
+        )
+        rows.update(version=F("version") + count, updated_at=now)
+    return rows.values_list("version", flat=True).get()
+
+
+def _write_changes(entries):
+    # No savepoint: a failed insert has to abort the change it belongs to.
+    with transaction.atomic(savepoint=False):
+        last = allocate_versions(len(entries))
+        for version, entry in enumerate(entries, start=last - len(entries) + 1):
+            entry.version = version
+        ChangeLogEntry.objects.bulk_create(entries)
+
+
+def log_changes(entries):
+    """Append entries to the change log, once per batch() when inside one."""
+    entries = list(entries)
+    if not entries:
+        return
+    changes = getattr(_local, "changes", None)
+    if changes is not None:
+        changes.extend(entries)
+    else:
+        _write_changes(entries)
+
+
+def object_change(instance, deleted=False):
+    resource = FEED_RESOURCES[type(instance)]
+    if deleted:
+        return ChangeLogEntry(
+            tenant_id=instance.tenant_id,
+            resource=resource,
+            action="delete",
+            object_id=instance.pk,
+        )
+    fields = RESOURCES[resource][1]
+    return ChangeLogEntry(
+        tenant_id=instance.tenant_id,
+        resource=resource,
+        action="upsert",
+        object_id=instance.pk,
+        data={field: getattr(instance, field) for field in fields},
+    )
+
+
+def relation_change(instance, resource, pairs, added):
+    return ChangeLogEntry(
+        tenant_id=instance.tenant_id,
+        resource=resource,
+        action="add" if added else "remove",
+        data=sorted([source, target] for source, target in pairs),
+    )
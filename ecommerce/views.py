@@ -1,35 +1,115 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework import viewsets
 from rest_framework.decorators import action
-from ecommerce.models import Permission, Role, Person
+from rest_framework.exceptions import NotFound
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from ecommerce import passwords, versioning
+from ecommerce.assignments import person_roles, role_permissions
+from ecommerce.bitsets import encode_mask
+from ecommerce.cache import get_permission_codes_for_persons
+from ecommerce.export import iter_export
+from ecommerce.filters import PermissionFilter, PersonFilter, RoleFilter
+from ecommerce.importer import import_lines
+from ecommerce.middleware import get_config, request_stats
+from ecommerce.mixins import ConditionalGetMixin, SparseFieldsMixin, ValuesListMixin
+from ecommerce.pagination import CountedCursorPagination, NewestFirstCursorPagination
+from ecommerce.models import AuditEvent, ChangeLogEntry, Permission, Role, Person
 from ecommerce.serializers import (
     PermissionSerializer,
     RoleSerializer,
     PersonSerializer,
+    RoleSummarySerializer,
+    PersonSummarySerializer,
+    RoleValuesSerializer,
+    PersonValuesSerializer,
+    PermissionCheckSerializer,
+    PermissionIdsSerializer,
+    RoleIdsSerializer,
+    RoleAssignmentsSerializer,
+    AuditEventSerializer,
+    AuditQuerySerializer,
+    ChangeFeedQuerySerializer,
+    LoginSerializer,
 )
+from ecommerce.tenants import current_tenant, iter_in_tenant
+from ecommerce.warmup import warm_up, warmup_state
+
+# Related ids are ordered so that detail responses and the values-based list
+# serializers agree byte for byte.
+ROLE_PREFETCHES = {
+    "permissions": Prefetch(
+        "permissions", queryset=Permission.objects.only("id").order_by("id")
+    ),
+    "includes": Prefetch("includes", queryset=Role.objects.only("id").order_by("id")),
+}
+PERSON_PREFETCHES = {
+    "roles": Prefetch("roles", queryset=Role.objects.only("id").order_by("id"))
+}
+
 
 # Permission Views
-class PermissionList(generics.ListCreateAPIView):
+class PermissionList(
+    ConditionalGetMixin, SparseFieldsMixin, generics.ListCreateAPIView
+):
     queryset = Permission.objects.all()
     serializer_class = PermissionSerializer
+    filter_class = PermissionFilter
 
 
-class PermissionDetail(generics.RetrieveUpdateDestroyAPIView):
+class PermissionDetail(
+    ConditionalGetMixin, SparseFieldsMixin, generics.RetrieveUpdateDestroyAPIView
+):
     queryset = Permission.objects.all()
     serializer_class = PermissionSerializer
 
 
+class PermissionRoles(generics.ListAPIView):
+    """Roles granting the permission directly or through included roles."""
+
+    serializer_class = RoleSummarySerializer
+    pagination_class = CountedCursorPagination
+
+    def get_queryset(self):
+        permission = get_object_or_404(
+            Permission.objects.only("id"), pk=self.kwargs["pk"]
+        )
+        return permission.get_roles().only("id", "name")
+
+
+class PermissionPersons(generics.ListAPIView):
+    """Persons holding the permission through any of their roles."""
+
+    serializer_class = PersonSummarySerializer
+    pagination_class = CountedCursorPagination
+
+    def get_queryset(self):
+        permission = get_object_or_404(
+            Permission.objects.only("id"), pk=self.kwargs["pk"]
+        )
+        return permission.get_persons().only("id", "name", "email")
+
+
 # Role Views
-class RoleList(generics.ListCreateAPIView):
+class RoleList(ConditionalGetMixin, ValuesListMixin, generics.ListCreateAPIView):
     queryset = Role.objects.all()
+    prefetches = ROLE_PREFETCHES
     serializer_class = RoleSerializer
+    values_serializer_class = RoleValuesSerializer
+    filter_class = RoleFilter
 
 
-class RoleDetail(viewsets.ModelViewSet):
+class RoleDetail(ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Role.objects.all()
+    prefetches = ROLE_PREFETCHES
     serializer_class = RoleSerializer
+    values_serializer_class = RoleValuesSerializer
+    filter_class = RoleFilter
 
     @action(detail=True, methods=["post"])
     def add_permission(self, request, pk=None):
@@ -39,7 +119,6 @@ class RoleDetail(viewsets.ModelViewSet):
         permission = get_object_or_404(Permission, id=permission_id)
 
         role.permissions.add(permission)
-        role.save()
         return Response({"status": "permission added"})
 
     @action(detail=True, methods=["post"])
@@ -55,14 +134,57 @@ class RoleDetail(viewsets.ModelViewSet):
             )
 
         role.permissions.remove(permission)
-        role.save()
 
         return Response({"status": "Permission removed successfully."})
 
+    @action(detail=True, methods=["post"])
+    def add_permissions(self, request, pk=None):
+        return self._bulk_permissions(request, role_permissions.add)
+
+    @action(detail=True, methods=["post"])
+    def remove_permissions(self, request, pk=None):
+        return self._bulk_permissions(request, role_permissions.remove)
+
+    @action(
+        detail=True,
+        methods=["get"],
+        serializer_class=PersonSummarySerializer,
+        pagination_class=CountedCursorPagination,
+    )
+    def persons(self, request, pk=None):
+        role = get_object_or_404(Role.objects.only("id"), pk=pk)
+        queryset = role.persons.only("id", "name", "email")
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=["get"])
+    def permission_mask(self, request, pk=None):
+        role = self.get_object()
+        return Response(
+            {"id": role.id, "mask": encode_mask(role.get_permission_mask())}
+        )
 
-class PersonDetail(viewsets.ModelViewSet):
+    def _bulk_permissions(self, request, apply):
+        role = self.get_object()
+        serializer = PermissionIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        permission_ids = serializer.validated_data["permission_ids"]
+
+        statuses = apply([(role.id, pk) for pk in permission_ids])
+        results = [
+            {"permission_id": pk, "status": item_status}
+            for pk, item_status in zip(permission_ids, statuses)
+        ]
+        return Response({"results": results})
+
+
+class PersonDetail(ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Person.objects.all()
+    prefetches = PERSON_PREFETCHES
     serializer_class = PersonSerializer
+    values_serializer_class = PersonValuesSerializer
+    filter_class = PersonFilter
 
     @action(detail=True, methods=["post"])
     def add_role(self, request, pk=None):
@@ -72,7 +194,6 @@ class PersonDetail(viewsets.ModelViewSet):
         role = get_object_or_404(Role, id=role_id)
 
         person.roles.add(role)
-        person.save()
         return Response({"status": "role added"})
 
     @action(detail=True, methods=["post"])
@@ -89,5 +210,204 @@ class PersonDetail(viewsets.ModelViewSet):
             )
 
         person.roles.remove(role)
-        person.save()
         return Response({"status": "role removed"})
+
+    @action(detail=True, methods=["post"])
+    def add_roles(self, request, pk=None):
+        return self._bulk_roles(request, person_roles.add)
+
+    @action(detail=True, methods=["post"])
+    def remove_roles(self, request, pk=None):
+        return self._bulk_roles(request, person_roles.remove)
+
+    @action(detail=True, methods=["get"])
+    def permission_mask(self, request, pk=None):
+        person = self.get_object()
+        mask = person.get_permission_mask()
+        return Response({"id": person.id, "mask": encode_mask(mask)})
+
+    def _bulk_roles(self, request, apply):
+        person = self.get_object()
+        serializer = RoleIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        role_ids = serializer.validated_data["role_ids"]
+
+        statuses = apply([(person.id, pk) for pk in role_ids])
+        results = [
+            {"role_id": pk, "status": item_status}
+            for pk, item_status in zip(role_ids, statuses)
+        ]
+        return Response({"results": results})
+
+    @action(detail=False, methods=["post"])
+    def assign_roles(self, request):
+        return self._bulk_assignments(request, person_roles.add)
+
+    @action(detail=False, methods=["post"])
+    def unassign_roles(self, request):
+        return self._bulk_assignments(request, person_roles.remove)
+
+    def _bulk_assignments(self, request, apply):
+        serializer = RoleAssignmentsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        assignments = serializer.validated_data["assignments"]
+
+        statuses = apply([(item["person_id"], item["role_id"]) for item in assignments])
+        results = [
+            {**item, "status": item_status}
+            for item, item_status in zip(assignments, statuses)
+        ]
+        return Response({"results": results})
+
+
+# Authorization Views
+class PermissionCheck(generics.GenericAPIView):
+    serializer_class = PermissionCheckSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        person_ids = serializer.validated_data["person_ids"]
+        codes = serializer.validated_data["codes"]
+
+        codes_by_person = get_permission_codes_for_persons(person_ids)
+        matrix = [[code in codes_by_person[pk] for code in codes] for pk in person_ids]
+        return Response({"person_ids": person_ids, "codes": codes, "matrix": matrix})
+
+
+# Authentication Views
+class Login(APIView):
+    """Verify an email and password; 503 while the hashing pool is saturated."""
+
+    def post(self, request):
+        serializer = LoginSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        person = passwords.authenticate(**serializer.validated_data)
+        if person is None:
+            return Response(
+                {"detail": "Invalid email or password."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        return Response(PersonSummarySerializer(person).data)
+
+
+# Export Views
+class Export(APIView):
+    content_types = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+    def get(self, request, resource, file_format):
+        try:
+            chunk_size = int(request.query_params.get("chunk_size", 2000))
+            chunks = iter_export(resource, file_format, chunk_size)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            iter_in_tenant(chunks, current_tenant.get()),
+            content_type=self.content_types[file_format],
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="{resource}.{file_format}"'
+        return response
+
+
+class Import(APIView):
+    def post(self, request, resource, file_format):
+        # Read the body line by line instead of through request.data so large
+        # uploads are never held in memory at once.
+        try:
+            chunk_size = int(request.query_params.get("chunk_size", 1000))
+            report = import_lines(
+                request.stream or [], resource, file_format, chunk_size
+            )
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+
+# Audit Views
+class AuditEventList(generics.ListAPIView):
+    """Audit trail, newest first, filtered by actor, target, action and time."""
+
+    serializer_class = AuditEventSerializer
+    pagination_class = NewestFirstCursorPagination
+
+    def get_queryset(self):
+        query = AuditQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        filters = {
+            key: query.validated_data[key]
+            for key in ("actor", "target_type", "target_id", "action")
+            if key in query.validated_data
+        }
+        if "since" in query.validated_data:
+            filters["created_at__gte"] = query.validated_data["since"]
+        if "until" in query.validated_data:
+            filters["created_at__lt"] = query.validated_data["until"]
+        return AuditEvent.objects.filter(**filters)
+
+
+# Change Feed Views
+class ChangeFeed(APIView):
+    """Change log entries after ``?since=<version>``, oldest first.
+
+    Without ``since`` only the current version is returned, to be read before
+    taking the export a mirror starts from. Clients poll again with the
+    returned version, straight away while ``more`` is true.
+    """
+
+    def get(self, request):
+        query = ChangeFeedQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        since = query.validated_data.get("since")
+        if since is None:
+            version = versioning.get_change_version()
+            return Response({"version": version, "more": False, "changes": []})
+        limit = min(
+            query.validated_data.get("limit", api_settings.PAGE_SIZE),
+            settings.ECOMMERCE_MAX_PAGE_SIZE,
+        )
+
+        rows = list(
+            ChangeLogEntry.objects.filter(version__gt=since)
+            .order_by("version")
+            .values_list("version", "resource", "action", "object_id", "data")[
+                : limit + 1
+            ]
+        )
+        more = len(rows) > limit
+        rows = rows[:limit]
+        changes = [
+            {"v": version, "type": resource, "op": action, "id": object_id}
+            if data is None
+            else {"v": version, "type": resource, "op": action, "data": data}
+            for version, resource, action, object_id, data in rows
+        ]
+        version = rows[-1][0] if rows else since
+        return Response({"version": version, "more": more, "changes": changes})
+
+
+# Monitoring Views
+class RequestStatsView(APIView):
+    pagination_class = None
+
+    def get(self, request):
+        if not get_config()["EXPOSE_STATS"]:
+            raise NotFound()
+        return Response(request_stats.snapshot())
+
+
+class Readiness(APIView):
+    """200 once the worker has warmed up, 503 until then."""
+
+    pagination_class = None
+
+    def get(self, request):
+        if warmup_state.error is not None:
+            # Retry a failed warm-up, e.g. once the database is reachable.
+            warm_up()
+        state = warmup_state.snapshot()
+        if not state["ready"]:
+            return Response(state, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(state)
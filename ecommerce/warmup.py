@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import URLPattern, get_resolver
+from django.utils.module_loading import import_string
+
+from ecommerce.tenants import tenant_scope
+
+logger = logging.getLogger(__name__)
+
+# A fresh worker pays for URL regex compilation, model and serializer field
+# introspection, opening database connections and loading the permission
+# catalog on its first requests. eco/wsgi.py and eco/asgi.py call warm_up()
+# once the application is loaded so those costs are paid before the worker
+# reports ready at /ecommerce/ready/. The ASGI server imports the application
+# inside its event loop, where database access raises, so eco/asgi.py runs it
+# on a thread of its own.
+
+DEFAULT_WARMUP = {
+    "ENABLED": True,
+    # Callables run in order, as dotted paths
+    "STEPS": [
+        "ecommerce.warmup.compile_urls",
+        "ecommerce.warmup.build_serializers",
+        "ecommerce.warmup.connect_databases",
+        "ecommerce.warmup.load_permission_catalog",
+    ],
+}
+
+
+def get_config():
+    return {**DEFAULT_WARMUP, **getattr(settings, "ECOMMERCE_WARMUP", {})}
+
+
+def iter_patterns(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLPattern):
+            yield pattern
+        else:
+            # Touching the regex compiles it for the resolver.
+            pattern.pattern.regex
+            yield from iter_patterns(pattern.url_patterns)
+
+
+def iter_views():
+    for pattern in iter_patterns(get_resolver().url_patterns):
+        view = getattr(pattern.callback, "cls", None)
+        if view is not None:
+            yield view
+
+
+def compile_urls():
+    resolver = get_resolver()
+    for pattern in iter_patterns(resolver.url_patterns):
+        pattern.pattern.regex
+    # Builds the reverse() lookup tables.
+    resolver.reverse_dict
+
+
+def build_serializers():
+    serializer_classes = {
+        getattr(view, "serializer_class", None) for view in iter_views()
+    }
+    for serializer_class in serializer_classes - {None}:
+        serializer_class().fields
+
+
+def connect_databases():
+    for alias in settings.DATABASES:
+        connections[alias].ensure_connection()
+
+
+def load_permission_catalog():
+    from ecommerce.bitsets import get_permission_bits
+    from ecommerce.models import Tenant
+
+    # Requests always run as a tenant, so load each tenant's catalog.
+    for tenant_id in Tenant.objects.values_list("pk", flat=True):
+        with tenant_scope(tenant_id):
+            get_permission_bits()
+
+
+def close_connections():
+    # Connections belong to the warming thread, and a preloading server would
+    # hand them to every worker it forks. Those inside a transaction (a
+    # request retrying the warm-up, a test) are left alone.
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+class WarmUpState:
+    """Outcome of the last warm-up, shared by all threads of a worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started = None
+        self.ready = False
+        self.error = None
+        self.startup_ms = None
+        self.steps = {}
+
+    def run(self, started=None):
+        with self._lock:
+            # Retries keep the original start, so startup_ms always covers
+            # the time from worker start to ready.
+            if started is not None or self.started is None:
+                self.started = time.perf_counter() if started is None else started
+            config = get_config()
+            steps = {}
+            error = None
+            if config["ENABLED"]:
+                for path in config["STEPS"]:
+                    step_started = time.perf_counter()
+                    try:
+                        import_string(path)()
+                    except Exception as exc:
+                        logger.exception("Warm-up step %s failed", path)
+                        error = f"{path}: {exc}"
+                        break
+                    finally:
+                        steps[path] = (time.perf_counter() - step_started) * 1000
+            close_connections()
+            self.steps = steps
+            self.error = error
+            self.ready = error is None
+            self.startup_ms = (time.perf_counter() - self.started) * 1000
+            if self.ready:
+                logger.info("Worker ready after %.1fms", self.startup_ms)
+        return self.ready
+
+    def snapshot(self):
+        return {
+            "ready": self.ready,
+            "startup_ms": self.startup_ms,
+            "steps": dict(self.steps),
+            "error": self.error,
+        }
+
+
+warmup_state = WarmUpState()
+
+
+def warm_up(started=None):
+    """Run the configured warm-up steps; ``started`` is a perf_counter()."""
+    return warmup_state.run(started)
@@ -0,0 +1,17 @@
+import pytest
+from ecommerce.cache import get_permission_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_permission_cache():
+    # Rolled-back test transactions can hand out the same ids again.
+    get_permission_cache().clear()
+    yield
+    get_permission_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def audit_in_foreground(settings):
+    # Test databases are not shared with the background audit writer thread;
+    # tests that need the events call audit.flush().
+    settings.ECOMMERCE_AUDIT = {**settings.ECOMMERCE_AUDIT, "BACKGROUND": False}
@@ -0,0 +1,92 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = AsyncClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="perm_2", name="Permission 2")
+    permission3 = Permission.objects.create(code="perm_3", name="Permission 3")
+
+    role1 = Role.objects.create(name="Role 1")
+    role1.permissions.add(permission1, permission2)
+
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+    person1.roles.add(role1)
+
+    return {
+        "client": client,
+        "permissions": [permission1, permission2, permission3],
+        "role1": role1,
+        "person1": person1,
+    }
+
+
+def get(client, url, **kwargs):
+    return async_to_sync(client.get)(url, **kwargs)
+
+
+@pytest.mark.django_db
+def test_async_detail_matches_sync(setup_data):
+    client = setup_data["client"]
+    sync_client = APIClient()
+    for name, pk in [
+        ("permission-detail", setup_data["permissions"][0].id),
+        ("role-detail", setup_data["role1"].id),
+        ("person-detail", setup_data["person1"].id),
+    ]:
+        response = get(client, reverse(f"async-{name}", kwargs={"pk": pk}))
+        assert response.status_code == status.HTTP_200_OK
+        expected = sync_client.get(reverse(name, kwargs={"pk": pk})).json()
+        assert response.json() == expected
+
+
+@pytest.mark.django_db
+def test_async_detail_not_found(setup_data):
+    client = setup_data["client"]
+    response = get(client, reverse("async-role-detail", kwargs={"pk": 9999}))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_async_permission_list_keyset(setup_data):
+    client = setup_data["client"]
+    permissions = setup_data["permissions"]
+    url = reverse("async-permission-list")
+
+    response = get(client, url, data={"page_size": 2})
+    assert response.status_code == status.HTTP_200_OK
+    first = response.json()
+    assert [row["id"] for row in first["results"]] == [p.id for p in permissions[:2]]
+    assert first["next"] is not None
+
+    second = get(client, first["next"]).json()
+    assert [row["id"] for row in second["results"]] == [permissions[2].id]
+    assert second["next"] is None
+
+
+@pytest.mark.django_db
+def test_async_permission_check(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    data = {"person_ids": [person1.id, 9999], "codes": ["perm_1", "perm_3"]}
+    response = async_to_sync(client.post)(
+        reverse("async-permission-check"), data, content_type="application/json"
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["matrix"] == [[True, False], [False, False]]
+    assert "Server-Timing" in response.headers
+
+    response = async_to_sync(client.post)(
+        reverse("async-permission-check"),
+        {"person_ids": [], "codes": ["perm_1"]},
+        content_type="application/json",
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,170 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce import audit
+from ecommerce.models import AuditEvent, Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+    user = User.objects.create_user("auditor")
+    client.force_authenticate(user)
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="perm_2", name="Permission 2")
+    role1 = Role.objects.create(name="Role 1")
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+
+    return {
+        "client": client,
+        "permission1": permission1,
+        "permission2": permission2,
+        "role1": role1,
+        "person1": person1,
+    }
+
+
+def events():
+    audit.flush()
+    return list(
+        AuditEvent.objects.order_by("id").values_list(
+            "actor", "action", "target_type", "relation", "related_ids"
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_api_changes_are_audited(setup_data, django_capture_on_commit_callbacks):
+    client = setup_data["client"]
+    role1 = setup_data["role1"]
+    person1 = setup_data["person1"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(
+            reverse("role-add-permission", kwargs={"pk": role1.pk}),
+            {"permission_id": setup_data["permission1"].pk},
+            format="json",
+        )
+        client.post(
+            reverse("person-add-roles", kwargs={"pk": person1.pk}),
+            {"role_ids": [role1.pk]},
+            format="json",
+        )
+        client.post(
+            reverse("role-remove-permission", kwargs={"pk": role1.pk}),
+            {"permission_id": setup_data["permission1"].pk},
+            format="json",
+        )
+        client.delete(reverse("person-detail", kwargs={"pk": person1.pk}))
+
+    assert events() == [
+        ("auditor", "add", "role", "permissions", [setup_data["permission1"].pk]),
+        ("auditor", "add", "person", "roles", [role1.pk]),
+        ("auditor", "remove", "role", "permissions", [setup_data["permission1"].pk]),
+        ("auditor", "delete", "person", "", []),
+    ]
+    assert AuditEvent.objects.filter(remote_addr="127.0.0.1").count() == 4
+
+
+@pytest.mark.django_db
+def test_rolled_back_changes_are_not_audited(
+    setup_data, django_capture_on_commit_callbacks
+):
+    role1 = setup_data["role1"]
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(ValueError), transaction.atomic():
+            role1.permissions.add(setup_data["permission1"])
+            raise ValueError
+        role1.permissions.add(setup_data["permission2"])
+        role1.permissions.clear()
+
+    assert events() == [
+        ("", "add", "role", "permissions", [setup_data["permission2"].pk]),
+        ("", "remove", "role", "permissions", [setup_data["permission2"].pk]),
+    ]
+
+
+@pytest.mark.django_db
+def test_full_queue_is_written_by_the_producer():
+    writer = audit.AuditWriter(
+        batch_size=10, flush_interval=1.0, queue_size=2, put_timeout=0.01
+    )
+    for i in range(3):
+        writer.put(
+            AuditEvent(action="create", target_type="role", target_id=i),
+            background=False,
+        )
+    assert list(AuditEvent.objects.values_list("target_id", flat=True)) == [0, 1]
+    assert writer.queue.qsize() == 1
+
+    writer.flush()
+    assert AuditEvent.objects.count() == 3
+
+
+def test_background_batches_wait_for_size_or_interval():
+    writer = audit.AuditWriter(
+        batch_size=2, flush_interval=0.01, queue_size=10, put_timeout=0.01
+    )
+    for i in range(3):
+        writer.queue.put(i)
+    assert writer.collect() == [0, 1]
+    assert writer.collect() == [2]
+
+
+@pytest.mark.django_db
+def test_audit_query_endpoint(setup_data):
+    client = setup_data["client"]
+    now = timezone.now()
+    AuditEvent.objects.bulk_create(
+        [
+            AuditEvent(
+                created_at=now - timedelta(hours=2),
+                actor="alice",
+                action="add",
+                target_type="role",
+                target_id=1,
+                relation="permissions",
+                related_ids=[3],
+            ),
+            AuditEvent(
+                created_at=now - timedelta(hours=1),
+                actor="bob",
+                action="update",
+                target_type="role",
+                target_id=1,
+            ),
+            AuditEvent(
+                created_at=now,
+                actor="alice",
+                action="delete",
+                target_type="person",
+                target_id=1,
+            ),
+        ]
+    )
+    url = reverse("audit-list")
+
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert [event["action"] for event in response.data["results"]] == [
+        "delete",
+        "update",
+        "add",
+    ]
+
+    response = client.get(url, {"target_type": "role", "target_id": 1})
+    assert [event["actor"] for event in response.data["results"]] == ["bob", "alice"]
+
+    since = (now - timedelta(minutes=90)).isoformat()
+    response = client.get(url, {"actor": "alice", "since": since})
+    assert [event["target_type"] for event in response.data["results"]] == ["person"]
+
+    response = client.get(url, {"target_id": 1})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from ecommerce import benchmark, datagen
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.mark.django_db
+def test_generate_is_reproducible():
+    created = datagen.generate(persons=20, roles=5, permissions=8, seed=1)
+    assert created["persons"] == Person.objects.count() == 20
+    assert created["person_roles"] == Person.roles.through.objects.count()
+    assert created["role_permissions"] == Role.permissions.through.objects.count()
+    assert list(Permission.objects.values_list("bit", flat=True)) == list(range(8))
+    first = list(Person.roles.through.objects.values_list("person__name", "role__name"))
+
+    Person.objects.all().delete()
+    Role.objects.all().delete()
+    Permission.objects.all().delete()
+    datagen.generate(persons=20, roles=5, permissions=8, seed=1)
+    second = list(
+        Person.roles.through.objects.values_list("person__name", "role__name")
+    )
+    assert first == second
+
+
+@pytest.mark.django_db
+def test_run_benchmarks_writes_report(tmp_path, settings):
+    settings.ALLOWED_HOSTS = ["localhost"]
+    call_command("generate_rbac_data", persons=30, roles=5, permissions=10)
+    output = tmp_path / "bench.json"
+    call_command(
+        "run_benchmarks",
+        iterations=3,
+        warmup=1,
+        login_costs=[1000],
+        output=str(output),
+    )
+
+    report = json.loads(output.read_text())
+    assert report["meta"]["dataset"]["persons"] == 30
+    assert report["meta"]["connections"]["pool"] is None
+    assert set(report["results"]) == {
+        "permission-list",
+        "permission-detail",
+        "role-list",
+        "role-detail",
+        "person-list",
+        "person-detail",
+        "permission-check",
+        "connection",
+        "Person.get_permissions",
+        "Person.get_permission_codes[cold]",
+        "Person.get_permission_codes[warm]",
+        "login[pbkdf2=1000]",
+    }
+    for result in report["results"].values():
+        assert result["p50_ms"] <= result["p99_ms"]
+
+    rows = list(benchmark.compare(report, report))
+    assert all(change == 0 for *_, change in rows)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_request_cycle_sends_request_signals():
+    received = []
+
+    def receiver(sender, **kwargs):
+        received.append(sender)
+
+    request_started.connect(receiver)
+    request_finished.connect(receiver)
+    try:
+        assert benchmark.request_cycle(lambda: "done")() == "done"
+    finally:
+        request_started.disconnect(receiver)
+        request_finished.disconnect(receiver)
+    assert len(received) == 2
@@ -0,0 +1,185 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    # Setup test data
+    client = APIClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="perm_2", name="Permission 2")
+
+    role1 = Role.objects.create(name="Role 1")
+    role2 = Role.objects.create(name="Role 2")
+
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+    person2 = Person.objects.create(name="Person 2", email="person2@example.com")
+
+    return {
+        "client": client,
+        "permission1": permission1,
+        "permission2": permission2,
+        "role1": role1,
+        "role2": role2,
+        "person1": person1,
+        "person2": person2,
+    }
+
+
+@pytest.mark.django_db
+def test_add_permissions_to_role(setup_data):
+    client = setup_data["client"]
+    role1 = setup_data["role1"]
+    permission1 = setup_data["permission1"]
+    permission2 = setup_data["permission2"]
+    role1.permissions.add(permission1)
+
+    url = reverse("role-detail", kwargs={"pk": role1.id}) + "add_permissions/"
+    data = {"permission_ids": [permission1.id, permission2.id, 9999]}
+    response = client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in response.data["results"]] == [
+        "already_present",
+        "added",
+        "not_found",
+    ]
+    assert set(role1.permissions.all()) == {permission1, permission2}
+
+
+@pytest.mark.django_db
+def test_remove_permissions_from_role(setup_data):
+    client = setup_data["client"]
+    role1 = setup_data["role1"]
+    permission1 = setup_data["permission1"]
+    permission2 = setup_data["permission2"]
+    role1.permissions.add(permission1)
+
+    url = reverse("role-detail", kwargs={"pk": role1.id}) + "remove_permissions/"
+    data = {"permission_ids": [permission1.id, permission2.id, 9999]}
+    response = client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in response.data["results"]] == [
+        "removed",
+        "not_present",
+        "not_found",
+    ]
+    assert not role1.permissions.exists()
+
+
+@pytest.mark.django_db
+def test_add_and_remove_roles_on_person(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    role1 = setup_data["role1"]
+    role2 = setup_data["role2"]
+
+    url = reverse("person-detail", kwargs={"pk": person1.id}) + "add_roles/"
+    response = client.post(url, {"role_ids": [role1.id, role2.id]}, format="json")
+    assert [item["status"] for item in response.data["results"]] == ["added", "added"]
+    assert set(person1.roles.all()) == {role1, role2}
+
+    url = reverse("person-detail", kwargs={"pk": person1.id}) + "remove_roles/"
+    response = client.post(url, {"role_ids": [role1.id]}, format="json")
+    assert [item["status"] for item in response.data["results"]] == ["removed"]
+    assert set(person1.roles.all()) == {role2}
+
+
+@pytest.mark.django_db
+def test_assign_role_pairs_uses_constant_queries(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    person2 = setup_data["person2"]
+    role1 = setup_data["role1"]
+    role2 = setup_data["role2"]
+    person2.roles.add(role2)
+
+    url = reverse("person-assign-roles")
+    data = {
+        "assignments": [
+            {"person_id": person1.id, "role_id": role1.id},
+            {"person_id": person2.id, "role_id": role1.id},
+            {"person_id": person2.id, "role_id": role2.id},
+            {"person_id": 9999, "role_id": role1.id},
+        ]
+    }
+    # persons, roles, existing rows, insert, version bumps, the change log
+    # version, its read-back and entries, and the savepoint pair
+    with django_assert_num_queries(11):
+        response = client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in response.data["results"]] == [
+        "added",
+        "added",
+        "already_present",
+        "not_found",
+    ]
+    assert set(role1.persons.all()) == {person1, person2}
+
+    url = reverse("person-unassign-roles")
+    response = client.post(url, data, format="json")
+    assert [item["status"] for item in response.data["results"]] == [
+        "removed",
+        "removed",
+        "removed",
+        "not_found",
+    ]
+    assert not Person.roles.through.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_unassignment_constant_queries(setup_data):
+    client = setup_data["client"]
+    role1 = setup_data["role1"]
+    persons = Person.objects.bulk_create(
+        Person(name=f"Person {i}", email=f"bulk{i}@example.com") for i in range(20)
+    )
+    role1.persons.add(*persons)
+    url = reverse("person-unassign-roles")
+
+    def unassign(persons):
+        data = {
+            "assignments": [
+                {"person_id": person.id, "role_id": role1.id} for person in persons
+            ]
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(url, data, format="json")
+        assert {item["status"] for item in response.data["results"]} == {"removed"}
+        return len(queries)
+
+    assert unassign(persons[:2]) == unassign(persons[2:])
+
+
+@pytest.mark.django_db
+def test_bulk_assignment_invalidates_permission_cache(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    role1 = setup_data["role1"]
+    role1.permissions.add(setup_data["permission1"])
+    assert person1.get_permission_codes() == frozenset()
+
+    url = reverse("person-detail", kwargs={"pk": person1.id}) + "add_roles/"
+    client.post(url, {"role_ids": [role1.id]}, format="json")
+    assert person1.get_permission_codes() == {"perm_1"}
+
+    url = reverse("role-detail", kwargs={"pk": role1.id}) + "remove_permissions/"
+    client.post(url, {"permission_ids": [setup_data["permission1"].id]}, format="json")
+    assert person1.get_permission_codes() == frozenset()
+
+
+@pytest.mark.django_db
+def test_bulk_assignment_invalid_payload(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    url = reverse("person-detail", kwargs={"pk": person1.id}) + "add_roles/"
+    response = client.post(url, {"role_ids": "1"}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
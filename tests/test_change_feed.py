@@ -0,0 +1,136 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.importer import import_lines
+from ecommerce.models import ChangeLogEntry, Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    role1 = Role.objects.create(name="Role 1")
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+
+    return {
+        "client": client,
+        "permission1": permission1,
+        "role1": role1,
+        "person1": person1,
+    }
+
+
+def feed(client, **params):
+    response = client.get(reverse("change-feed"), params)
+    assert response.status_code == status.HTTP_200_OK
+    return response.data
+
+
+@pytest.mark.django_db
+def test_feed_returns_changes_since_version(setup_data):
+    client = setup_data["client"]
+    permission1 = setup_data["permission1"]
+    role1 = setup_data["role1"]
+    person1 = setup_data["person1"]
+    start = feed(client)["version"]
+    assert start == ChangeLogEntry.objects.count()
+
+    role1.permissions.add(permission1)
+    permission1.roles.remove(role1)
+    person1.roles.add(role1)
+    person1.name = "Renamed"
+    person1.save()
+    person_id = person1.pk
+    person1.delete()
+
+    data = feed(client, since=start)
+    assert data["more"] is False
+    assert data["version"] == start + 5
+    assert [change["v"] for change in data["changes"]] == list(
+        range(start + 1, start + 6)
+    )
+    assert [{k: v for k, v in c.items() if k != "v"} for c in data["changes"]] == [
+        {"type": "role_permissions", "op": "add", "data": [[role1.pk, permission1.pk]]},
+        {
+            "type": "role_permissions",
+            "op": "remove",
+            "data": [[role1.pk, permission1.pk]],
+        },
+        {"type": "person_roles", "op": "add", "data": [[person_id, role1.pk]]},
+        {
+            "type": "persons",
+            "op": "upsert",
+            "data": {
+                "id": person_id,
+                "name": "Renamed",
+                "email": "person1@example.com",
+            },
+        },
+        {"type": "persons", "op": "delete", "id": person_id},
+    ]
+
+    assert feed(client, since=data["version"]) == {
+        "version": data["version"],
+        "more": False,
+        "changes": [],
+    }
+
+
+@pytest.mark.django_db
+def test_feed_pages_with_limit(setup_data):
+    client = setup_data["client"]
+    start = feed(client)["version"]
+    roles = [Role.objects.create(name=f"Role {i}") for i in range(2, 7)]
+
+    data = feed(client, since=start, limit=3)
+    assert data["more"] is True
+    assert [change["data"]["name"] for change in data["changes"]] == [
+        "Role 2",
+        "Role 3",
+        "Role 4",
+    ]
+    data = feed(client, since=data["version"], limit=3)
+    assert data["more"] is False
+    assert [change["data"]["id"] for change in data["changes"]] == [
+        role.pk for role in roles[3:]
+    ]
+
+    response = client.get(reverse("change-feed"), {"since": -1})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_imports_are_logged(setup_data):
+    client = setup_data["client"]
+    start = feed(client)["version"]
+    report = import_lines(
+        [
+            '{"type": "roles", "name": "Role 2", "permissions": ["perm_1"]}\n',
+            '{"type": "persons", "name": "P2", "email": "p2@example.com"}\n',
+        ]
+    )
+    assert report["errors"] == []
+
+    changes = feed(client, since=start)["changes"]
+    assert [(change["type"], change["op"]) for change in changes] == [
+        ("roles", "upsert"),
+        ("role_permissions", "add"),
+        ("persons", "upsert"),
+    ]
+    assert changes[0]["data"]["name"] == "Role 2"
+    assert changes[2]["data"] == {
+        "id": Person.objects.get(email="p2@example.com").pk,
+        "name": "P2",
+        "email": "p2@example.com",
+    }
+
+
+@pytest.mark.django_db
+def test_feed_can_be_turned_off(setup_data, settings):
+    settings.ECOMMERCE_CHANGE_FEED = False
+    count = ChangeLogEntry.objects.count()
+    setup_data["person1"].roles.add(setup_data["role1"])
+    Role.objects.create(name="Role 2")
+    assert ChangeLogEntry.objects.count() == count
@@ -0,0 +1,128 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    role1 = Role.objects.create(name="Role 1")
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+
+    return {
+        "client": client,
+        "permission1": permission1,
+        "role1": role1,
+        "person1": person1,
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["permission-list", "role-list", "person-list"])
+def test_unchanged_list_is_not_modified(
+    setup_data, django_assert_num_queries, url_name
+):
+    client = setup_data["client"]
+    url = reverse(url_name)
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    etag = response.headers["ETag"]
+    assert "Last-Modified" in response.headers
+
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+
+    response = client.get(url + "?page_size=1", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_unchanged_detail_is_not_modified(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    url = reverse("person-detail", kwargs={"pk": setup_data["person1"].id})
+    etag = client.get(url).headers["ETag"]
+
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_m2m_change_invalidates_etags(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    role1 = setup_data["role1"]
+    detail_url = reverse("person-detail", kwargs={"pk": person1.id})
+    list_url = reverse("person-list")
+    detail_etag = client.get(detail_url).headers["ETag"]
+    list_etag = client.get(list_url).headers["ETag"]
+
+    client.post(detail_url + "add_role/", {"role_id": role1.id}, format="json")
+
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["roles"] == [role1.id]
+    response = client.get(list_url, HTTP_IF_NONE_MATCH=list_etag)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_filtered_list_follows_filtered_collections(
+    setup_data, django_assert_num_queries
+):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    person1.roles.add(setup_data["role1"])
+    url = reverse("person-list") + "?permission=perm_1"
+    response = client.get(url)
+    assert response.data["results"] == []
+    etag = response.headers["ETag"]
+
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # Only the role changes, yet the person now matches.
+    setup_data["role1"].permissions.add(setup_data["permission1"])
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert [row["id"] for row in response.data["results"]] == [person1.id]
+
+    url = reverse("role-list") + "?permission=perm_2"
+    etag = client.get(url).headers["ETag"]
+    setup_data["permission1"].code = "perm_2"
+    setup_data["permission1"].save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert [row["id"] for row in response.data["results"]] == [setup_data["role1"].id]
+
+
+@pytest.mark.django_db
+def test_permission_delete_invalidates_role_etag(setup_data):
+    client = setup_data["client"]
+    role1 = setup_data["role1"]
+    role1.permissions.add(setup_data["permission1"])
+    url = reverse("role-detail", kwargs={"pk": role1.id})
+    etag = client.get(url).headers["ETag"]
+
+    setup_data["permission1"].delete()
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["permissions"] == []
+
+
+@pytest.mark.django_db
+def test_if_modified_since(setup_data):
+    client = setup_data["client"]
+    url = reverse("permission-detail", kwargs={"pk": setup_data["permission1"].id})
+    last_modified = client.get(url).headers["Last-Modified"]
+
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    role1 = Role.objects.create(name="Role 1")
+    role1.permissions.add(permission1)
+    person1 = Person.objects.create(
+        name="Person 1", email="person1@example.com", password="secret"
+    )
+    person1.roles.add(role1)
+
+    return {
+        "client": client,
+        "permission1": permission1,
+        "role1": role1,
+        "person1": person1,
+    }
+
+
+def read(response):
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+def test_export_all_as_ndjson(setup_data):
+    client = setup_data["client"]
+    url = reverse("export", kwargs={"resource": "all", "file_format": "ndjson"})
+    response = client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    assert response["Content-Type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in read(response).splitlines()]
+    assert [record["type"] for record in records] == [
+        "permissions",
+        "roles",
+        "persons",
+        "role_permissions",
+        "person_roles",
+    ]
+    assert records[2] == {
+        "type": "persons",
+        "id": setup_data["person1"].id,
+        "name": "Person 1",
+        "email": "person1@example.com",
+    }
+
+
+@pytest.mark.django_db
+def test_export_resource_as_csv(setup_data):
+    client = setup_data["client"]
+    url = reverse("export", kwargs={"resource": "person_roles", "file_format": "csv"})
+    rows = list(csv.reader(io.StringIO(read(client.get(url)))))
+    assert rows == [
+        ["person_id", "role_id"],
+        [str(setup_data["person1"].id), str(setup_data["role1"].id)],
+    ]
+
+
+@pytest.mark.django_db
+def test_export_rejects_csv_of_everything(setup_data):
+    client = setup_data["client"]
+    url = reverse("export", kwargs={"resource": "all", "file_format": "csv"})
+    assert client.get(url).status_code == status.HTTP_400_BAD_REQUEST
+    url = reverse("export", kwargs={"resource": "users", "file_format": "ndjson"})
+    assert client.get(url).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_export_rejects_chunk_sizes_out_of_range(setup_data):
+    client = setup_data["client"]
+    url = reverse("export", kwargs={"resource": "all", "file_format": "ndjson"})
+    for chunk_size in ("0", "-5", "10001", "100000000"):
+        response = client.get(url, {"chunk_size": chunk_size})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {"error": "chunk_size must be between 1 and 10000."}
+    assert client.get(url, {"chunk_size": "10000"}).status_code == status.HTTP_200_OK
+    for chunk_size in (0, 10001):
+        with pytest.raises(CommandError):
+            call_command("export_rbac", chunk_size=chunk_size, stdout=io.StringIO())
+
+
+@pytest.mark.django_db
+def test_export_command(setup_data):
+    out = io.StringIO()
+    call_command("export_rbac", resource="permissions", chunk_size=1, stdout=out)
+    record = json.loads(out.getvalue())
+    assert record["code"] == "perm_1"
@@ -0,0 +1,106 @@
+import datetime
+import decimal
+import io
+import uuid
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+from ecommerce.models import Permission, Role, Person
+from ecommerce.renderers import ORJSONParser, ORJSONRenderer
+from ecommerce.serializers import (
+    PersonSerializer,
+    PersonValuesSerializer,
+    RoleSerializer,
+    RoleValuesSerializer,
+)
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="perm_2", name="Permission 2")
+
+    role1 = Role.objects.create(name="Rôle «1»")
+    role2 = Role.objects.create(name="Role 2")
+    role1.permissions.add(permission2, permission1)
+    role1.includes.add(role2)
+
+    person1 = Person.objects.create(name="Person 1", email="p1@example.com")
+    person2 = Person.objects.create(name="Person 2", email="p2@example.com")
+    person1.roles.add(role2, role1)
+
+    return {"role2": role2, "person2": person2}
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"id": 1, "name": 'Zoë     "quoted" \\ </script>', "list": []},
+        [1, -2, 3.5, 1e-7, 1e16, True, False, None, "", {"nested": {"a": [1, 2]}}],
+        {"small": [1e-05, -9.5e-05, 0.0001, 10.00001, 0.0]},
+        {1: "int key", "roles": (1, 2)},
+        {"at": datetime.datetime(2024, 5, 1, 12, 30, 15, 123456)},
+        {"at": datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)},
+        {"day": datetime.date(2024, 5, 1), "time": datetime.time(9, 15)},
+        {"price": decimal.Decimal("1.10"), "id": uuid.UUID(int=1)},
+        {"error": [ErrorDetail("Bad.", code="invalid")], "lazy": gettext_lazy("Yes")},
+        {"huge": 2**70},
+        ReturnDict({"id": 1}, serializer=None),
+    ],
+)
+def test_renderer_matches_drf(data):
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), -float("inf")])
+def test_renderer_rejects_non_finite_floats_like_drf(value):
+    data = {"stats": [{"p50": value}]}
+    with pytest.raises(ValueError):
+        JSONRenderer().render(data)
+    with pytest.raises(ValueError):
+        ORJSONRenderer().render(data)
+
+
+def test_renderer_respects_indent():
+    data = {"id": 1}
+    media_type = "application/json; indent=2"
+    assert ORJSONRenderer().render(data, media_type) == JSONRenderer().render(
+        data, media_type
+    )
+    assert ORJSONRenderer().render(None) == b""
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "model, serializer_class, values_serializer_class",
+    [
+        (Role, RoleSerializer, RoleValuesSerializer),
+        (Person, PersonSerializer, PersonValuesSerializer),
+    ],
+)
+def test_values_serializers_match_model_serializers(
+    setup_data, model, serializer_class, values_serializer_class
+):
+    related = values_serializer_class.split_fields()[1]
+    queryset = model.objects.prefetch_related(*related).order_by("id")
+    expected = serializer_class(queryset, many=True).data
+    # The views order related ids
+    for item in expected:
+        for name in related:
+            item[name] = sorted(item[name])
+    data = values_serializer_class(values_serializer_class.values(queryset)).data
+    assert data == expected
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(expected)
+
+
+def test_parser():
+    parser = ORJSONParser()
+    assert parser.parse(io.BytesIO('{"name": "Zoë", "ids": [1, 2]}'.encode())) == {
+        "name": "Zoë",
+        "ids": [1, 2],
+    }
+    with pytest.raises(ParseError):
+        parser.parse(io.BytesIO(b'{"name": NaN}'))
@@ -0,0 +1,143 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.models import Person
+
+PASSWORD = "correct horse battery"
+
+
+@pytest.fixture(scope="function")
+def setup_data(settings):
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+    client = APIClient()
+
+    response = client.post(
+        reverse("person-list"),
+        {
+            "name": "Person 1",
+            "email": "person1@example.com",
+            "roles": [],
+            "password": PASSWORD,
+        },
+        format="json",
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    person1 = Person.objects.get(pk=response.data["id"])
+
+    return {
+        "client": client,
+        "person1": person1,
+        "created": response.data,
+    }
+
+
+def login(client, email, password):
+    return client.post(
+        reverse("login"), {"email": email, "password": password}, format="json"
+    )
+
+
+@pytest.mark.django_db
+def test_login(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+
+    response = login(client, "person1@example.com", PASSWORD)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {
+        "id": person1.id,
+        "name": "Person 1",
+        "email": "person1@example.com",
+    }
+
+    for email, password in [
+        ("person1@example.com", "wrong password"),
+        ("nobody@example.com", PASSWORD),
+    ]:
+        response = login(client, email, password)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = client.post(reverse("login"), {"email": "x"}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_password_is_hashed_and_never_returned(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    assert "password" not in setup_data["created"]
+    assert person1.password.startswith("md5$")
+    assert check_password(PASSWORD, person1.password)
+
+    response = client.get(reverse("person-detail", kwargs={"pk": person1.pk}))
+    assert "password" not in response.data
+    response = client.get(reverse("person-list"), {"fields": "id,password"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = client.post(
+        reverse("person-list"),
+        {
+            "name": "Person 2",
+            "email": "person2@example.com",
+            "roles": [],
+            "password": "123",
+        },
+        format="json",
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "password" in response.data
+
+
+@pytest.mark.django_db
+def test_outdated_hash_is_upgraded(setup_data, settings):
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.PBKDF2PasswordHasher"]
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    hasher = PBKDF2PasswordHasher()
+    outdated = hasher.encode(PASSWORD, hasher.salt(), iterations=1000)
+    Person.objects.filter(pk=person1.pk).update(password=outdated)
+
+    response = login(client, "person1@example.com", PASSWORD)
+    assert response.status_code == status.HTTP_200_OK
+    person1.refresh_from_db()
+    assert person1.password != outdated
+    assert hasher.decode(person1.password)["iterations"] == hasher.iterations
+    assert check_password(PASSWORD, person1.password)
+
+
+@pytest.mark.django_db
+def test_saturated_pool_returns_503(setup_data, settings):
+    settings.ECOMMERCE_PASSWORD_HASHING = {"MAX_PENDING": 0}
+
+    response = login(setup_data["client"], "person1@example.com", PASSWORD)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+    response = async_to_sync(AsyncClient().post)(
+        reverse("async-login"),
+        {"email": "person1@example.com", "password": PASSWORD},
+        content_type="application/json",
+    )
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.django_db
+def test_async_login(setup_data):
+    client = AsyncClient()
+    person1 = setup_data["person1"]
+
+    def post(password):
+        data = {"email": "person1@example.com", "password": password}
+        return async_to_sync(client.post)(
+            reverse("async-login"), data, content_type="application/json"
+        )
+
+    response = post(PASSWORD)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["id"] == person1.id
+    assert post("wrong password").status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,124 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+from ecommerce import materialized
+from ecommerce.models import Permission, Role, Person, PersonPermission
+
+
+@pytest.fixture(scope="function")
+def setup_data(settings):
+    settings.ECOMMERCE_MATERIALIZE_PERMISSIONS = True
+    client = APIClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="perm_2", name="Permission 2")
+
+    role1 = Role.objects.create(name="Role 1")
+    role2 = Role.objects.create(name="Role 2")
+
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+    person2 = Person.objects.create(name="Person 2", email="person2@example.com")
+
+    return {
+        "client": client,
+        "permission1": permission1,
+        "permission2": permission2,
+        "role1": role1,
+        "role2": role2,
+        "person1": person1,
+        "person2": person2,
+    }
+
+
+def grants():
+    return set(PersonPermission.objects.values_list("person__name", "code", "grants"))
+
+
+def assert_consistent():
+    assert materialized.verify() == (0, 0)
+
+
+@pytest.mark.django_db
+def test_person_role_changes_are_materialized(setup_data):
+    role1 = setup_data["role1"]
+    role2 = setup_data["role2"]
+    person1 = setup_data["person1"]
+    role1.permissions.add(setup_data["permission1"])
+    role2.permissions.add(setup_data["permission1"], setup_data["permission2"])
+
+    person1.roles.add(role1, role2)
+    assert grants() == {("Person 1", "perm_1", 2), ("Person 1", "perm_2", 1)}
+    assert_consistent()
+
+    person1.roles.remove(role2, setup_data["role1"])
+    person1.roles.remove(role2)
+    assert grants() == set()
+
+    role1.persons.add(person1, setup_data["person2"])
+    assert grants() == {("Person 1", "perm_1", 1), ("Person 2", "perm_1", 1)}
+    role1.persons.clear()
+    assert grants() == set()
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_role_permission_changes_are_materialized(setup_data):
+    role1 = setup_data["role1"]
+    permission2 = setup_data["permission2"]
+    setup_data["person1"].roles.add(role1)
+    setup_data["person2"].roles.add(role1, setup_data["role2"])
+
+    role1.permissions.add(setup_data["permission1"], permission2)
+    permission2.roles.add(setup_data["role2"])
+    assert grants() == {
+        ("Person 1", "perm_1", 1),
+        ("Person 1", "perm_2", 1),
+        ("Person 2", "perm_1", 1),
+        ("Person 2", "perm_2", 2),
+    }
+    assert_consistent()
+
+    permission2.roles.clear()
+    assert grants() == {("Person 1", "perm_1", 1), ("Person 2", "perm_1", 1)}
+
+    setup_data["permission1"].code = "perm_9"
+    setup_data["permission1"].save()
+    role1.delete()
+    assert grants() == set()
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_view_actions_are_materialized(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    role1 = setup_data["role1"]
+    permission1 = setup_data["permission1"]
+
+    url = reverse("person-detail", kwargs={"pk": person1.id}) + "add_roles/"
+    client.post(url, {"role_ids": [role1.id]}, format="json")
+    url = reverse("role-detail", kwargs={"pk": role1.id}) + "add_permission/"
+    client.post(url, {"permission_id": permission1.id}, format="json")
+
+    assert list(person1.get_permissions()) == [permission1]
+    assert grants() == {("Person 1", "perm_1", 1)}
+
+    url = reverse("role-detail", kwargs={"pk": role1.id}) + "remove_permissions/"
+    client.post(url, {"permission_ids": [permission1.id]}, format="json")
+    assert grants() == set()
+
+
+@pytest.mark.django_db
+def test_rebuild_command(setup_data, settings):
+    settings.ECOMMERCE_MATERIALIZE_PERMISSIONS = False
+    setup_data["role1"].permissions.add(setup_data["permission1"])
+    setup_data["person1"].roles.add(setup_data["role1"])
+    assert grants() == set()
+
+    with pytest.raises(CommandError):
+        call_command("rebuild_person_permissions", "--verify-only")
+
+    call_command("rebuild_person_permissions")
+    assert grants() == {("Person 1", "perm_1", 1)}
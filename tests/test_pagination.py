@@ -0,0 +1,71 @@
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    Permission.objects.bulk_create(
+        Permission(code=f"perm_{i}", name=f"Permission {i}") for i in range(5)
+    )
+    Role.objects.bulk_create(Role(name=f"Role {i}") for i in range(5))
+    Person.objects.bulk_create(
+        Person(name=f"Person {i}", email=f"person{i}@example.com") for i in range(5)
+    )
+
+    return {"client": client}
+
+
+def collect_pages(client, url, page_size, django_assert_num_queries, queries):
+    ids = []
+    url = f"{url}?page_size={page_size}"
+    while url:
+        with django_assert_num_queries(queries):
+            response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) <= page_size
+        ids.extend(item["id"] for item in response.data["results"])
+        url = response.data["next"]
+    return ids
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url_name, model, queries",
+    [
+        ("permission-list", Permission, 2),
+        ("role-list", Role, 4),
+        ("person-list", Person, 3),
+    ],
+)
+def test_cursor_pages_cover_table_in_id_order(
+    setup_data, django_assert_num_queries, url_name, model, queries
+):
+    client = setup_data["client"]
+    ids = collect_pages(
+        client, reverse(url_name), 2, django_assert_num_queries, queries
+    )
+    assert ids == list(model.objects.order_by("id").values_list("id", flat=True))
+
+
+@pytest.mark.django_db
+def test_default_page_size(setup_data):
+    client = setup_data["client"]
+    with override_settings(REST_FRAMEWORK={"PAGE_SIZE": 3}):
+        response = client.get(reverse("person-list"))
+    assert len(response.data["results"]) == 3
+    assert response.data["next"] is not None
+    assert response.data["previous"] is None
+
+
+@pytest.mark.django_db
+def test_page_size_is_capped(setup_data):
+    client = setup_data["client"]
+    with override_settings(ECOMMERCE_MAX_PAGE_SIZE=2):
+        response = client.get(reverse("person-list") + "?page_size=50")
+    assert len(response.data["results"]) == 2
@@ -0,0 +1,90 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.bitsets import decode_mask, encode_mask, get_permission_bits, has_bit
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="perm_2", name="Permission 2")
+
+    role1 = Role.objects.create(name="Role 1")
+    role2 = Role.objects.create(name="Role 2")
+    role1.permissions.add(permission1)
+    role2.permissions.add(permission2)
+
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+    person1.roles.add(role1, role2)
+
+    return {
+        "client": client,
+        "permission1": permission1,
+        "permission2": permission2,
+        "role1": role1,
+        "person1": person1,
+    }
+
+
+def test_mask_round_trip():
+    for mask in (0, 1, 0b1010, 1 << 200 | 5):
+        assert decode_mask(encode_mask(mask)) == mask
+
+
+@pytest.mark.django_db
+def test_bits_are_sequential_and_stable(setup_data):
+    permission1 = setup_data["permission1"]
+    permission2 = setup_data["permission2"]
+    assert (permission1.bit, permission2.bit) == (0, 1)
+
+    permission1.name = "Renamed"
+    permission1.save()
+    permission1.refresh_from_db()
+    assert permission1.bit == 0
+
+
+@pytest.mark.django_db
+def test_bits_of_deleted_permissions_are_not_reused(setup_data):
+    setup_data["permission2"].delete()
+    permission3 = Permission.objects.create(code="perm_3", name="Permission 3")
+    assert permission3.bit == 2
+
+
+@pytest.mark.django_db
+def test_bulk_created_permissions_get_bits(setup_data):
+    Permission.objects.bulk_create(
+        [Permission(code="perm_3", name="3"), Permission(code="perm_4", name="4")]
+    )
+    assert get_permission_bits() == {"perm_1": 0, "perm_2": 1, "perm_3": 2, "perm_4": 3}
+
+
+@pytest.mark.django_db
+def test_person_and_role_masks(setup_data, django_assert_num_queries):
+    person1 = setup_data["person1"]
+    assert setup_data["role1"].get_permission_mask() == 0b01
+    assert person1.get_permission_mask() == 0b11
+
+    with django_assert_num_queries(0):
+        mask = person1.get_permission_mask()
+    assert has_bit(mask, setup_data["permission2"].bit)
+
+    person1.roles.remove(setup_data["role1"])
+    assert person1.get_permission_mask() == 0b10
+
+
+@pytest.mark.django_db
+def test_permission_mask_endpoints(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+
+    url = reverse("person-detail", kwargs={"pk": person1.id}) + "permission_mask/"
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert decode_mask(response.data["mask"]) == 0b11
+
+    url = reverse("permission-detail", kwargs={"pk": setup_data["permission2"].id})
+    assert client.get(url).data["bit"] == 1
@@ -0,0 +1,148 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.core.cache import cache as default_cache
+from ecommerce.cache import (
+    DjangoPermissionCache,
+    LocMemPermissionCache,
+    get_permission_codes_for_persons,
+)
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="perm_2", name="Permission 2")
+
+    role1 = Role.objects.create(name="Role 1")
+    role2 = Role.objects.create(name="Role 2")
+    role1.permissions.add(permission1)
+    role2.permissions.add(permission2)
+
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+    person2 = Person.objects.create(name="Person 2", email="person2@example.com")
+    person1.roles.add(role1)
+
+    return {
+        "client": APIClient(),
+        "permission1": permission1,
+        "permission2": permission2,
+        "role1": role1,
+        "role2": role2,
+        "person1": person1,
+        "person2": person2,
+    }
+
+
+def test_locmem_cache_evicts_least_recently_used():
+    cache = LocMemPermissionCache(max_entries=2)
+    cache.set_many({"a": 1, "b": 2})
+    cache.get_many(["a"])
+    cache.set_many({"c": 3})
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+
+
+def test_locmem_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("ecommerce.cache.time.monotonic", lambda: now[0])
+    cache = LocMemPermissionCache(timeout=5)
+    cache.set_many({"a": 1})
+    now[0] += 4
+    assert cache.get_many(["a"]) == {"a": 1}
+    now[0] += 1
+    assert cache.get_many(["a"]) == {}
+    assert len(cache) == 0
+
+
+def test_django_cache_clear_keeps_other_entries():
+    cache = DjangoPermissionCache()
+    default_cache.set("session:1", "kept")
+    cache.set_many({"a": 1, "b": 2})
+    cache.delete_many(["b"])
+    assert cache.get_many(["a", "b"]) == {"a": 1}
+
+    cache.clear()
+    assert cache.get_many(["a"]) == {}
+    assert default_cache.get("session:1") == "kept"
+    cache.set_many({"a": 3})
+    assert cache.get_many(["a"]) == {"a": 3}
+
+
+@pytest.mark.django_db
+def test_repeat_checks_hit_no_database(setup_data, django_assert_num_queries):
+    person1 = setup_data["person1"]
+    with django_assert_num_queries(2):
+        assert person1.get_permission_codes() == {"perm_1"}
+    with django_assert_num_queries(0):
+        assert person1.has_permission("perm_1")
+        assert not person1.has_permission("perm_2")
+
+
+@pytest.mark.django_db
+def test_batch_resolution_uses_constant_queries(setup_data, django_assert_num_queries):
+    person_ids = [setup_data["person1"].id, setup_data["person2"].id]
+    with django_assert_num_queries(2):
+        codes = get_permission_codes_for_persons(person_ids)
+    assert codes == {person_ids[0]: {"perm_1"}, person_ids[1]: frozenset()}
+
+
+@pytest.mark.django_db
+def test_person_roles_change_invalidates(setup_data):
+    person1 = setup_data["person1"]
+    role2 = setup_data["role2"]
+    assert person1.get_permission_codes() == {"perm_1"}
+
+    person1.roles.add(role2)
+    assert person1.get_permission_codes() == {"perm_1", "perm_2"}
+
+    role2.persons.remove(person1)
+    assert person1.get_permission_codes() == {"perm_1"}
+
+    setup_data["role1"].persons.clear()
+    assert person1.get_permission_codes() == frozenset()
+
+
+@pytest.mark.django_db
+def test_role_permissions_change_invalidates(setup_data):
+    person1 = setup_data["person1"]
+    role1 = setup_data["role1"]
+    permission2 = setup_data["permission2"]
+    assert person1.get_permission_codes() == {"perm_1"}
+
+    role1.permissions.add(permission2)
+    assert person1.get_permission_codes() == {"perm_1", "perm_2"}
+
+    permission2.roles.clear()
+    assert person1.get_permission_codes() == {"perm_1"}
+
+
+@pytest.mark.django_db
+def test_permission_and_role_changes_invalidate(setup_data):
+    person1 = setup_data["person1"]
+    permission1 = setup_data["permission1"]
+    assert person1.get_permission_codes() == {"perm_1"}
+
+    permission1.code = "perm_9"
+    permission1.save()
+    assert person1.get_permission_codes() == {"perm_9"}
+
+    permission1.delete()
+    assert person1.get_permission_codes() == frozenset()
+
+    setup_data["role1"].permissions.add(setup_data["permission2"])
+    assert person1.get_permission_codes() == {"perm_2"}
+    setup_data["role1"].delete()
+    assert person1.get_permission_codes() == frozenset()
+
+
+@pytest.mark.django_db
+def test_api_actions_invalidate(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    role2 = setup_data["role2"]
+    assert person1.get_permission_codes() == {"perm_1"}
+
+    url = reverse("person-detail", kwargs={"pk": person1.id}) + "add_role/"
+    client.post(url, {"role_id": role2.id}, format="json")
+    assert person1.get_permission_codes() == {"perm_1", "perm_2"}
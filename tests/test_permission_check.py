@@ -0,0 +1,72 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="perm_2", name="Permission 2")
+
+    role1 = Role.objects.create(name="Role 1")
+    role2 = Role.objects.create(name="Role 2")
+    role1.permissions.add(permission1)
+    role2.permissions.add(permission1, permission2)
+
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+    person2 = Person.objects.create(name="Person 2", email="person2@example.com")
+    person1.roles.add(role1)
+    person2.roles.add(role2)
+
+    return {
+        "client": client,
+        "person1": person1,
+        "person2": person2,
+    }
+
+
+@pytest.mark.django_db
+def test_permission_check_matrix(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    person2 = setup_data["person2"]
+    url = reverse("permission-check")
+    data = {
+        "person_ids": [person1.id, person2.id, 9999],
+        "codes": ["perm_1", "perm_2"],
+    }
+    response = client.post(url, data, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["matrix"] == [[True, False], [True, True], [False, False]]
+
+
+@pytest.mark.django_db
+def test_permission_check_constant_queries(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    url = reverse("permission-check")
+    roles = Role.objects.all()
+    persons = Person.objects.bulk_create(
+        Person(name=f"Person {i}", email=f"bulk{i}@example.com") for i in range(50)
+    )
+    for person in persons:
+        person.roles.set(roles)
+
+    data = {"person_ids": [p.id for p in persons], "codes": ["perm_1", "perm_2"]}
+    with django_assert_num_queries(2):
+        response = client.post(url, data, format="json")
+    assert all(row == [True, True] for row in response.data["matrix"])
+
+    with django_assert_num_queries(0):
+        client.post(url, data, format="json")
+
+
+@pytest.mark.django_db
+def test_permission_check_invalid_payload(setup_data):
+    client = setup_data["client"]
+    url = reverse("permission-check")
+    response = client.post(url, {"person_ids": [], "codes": ["perm_1"]}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,94 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from ecommerce import views
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    # Enough rows that a per-row query would blow the expected counts
+    client = APIClient()
+
+    permissions = Permission.objects.bulk_create(
+        Permission(code=f"perm_{i}", name=f"Permission {i}") for i in range(10)
+    )
+    roles = Role.objects.bulk_create(Role(name=f"Role {i}") for i in range(10))
+    persons = Person.objects.bulk_create(
+        Person(name=f"Person {i}", email=f"person{i}@example.com") for i in range(10)
+    )
+    for role in roles:
+        role.permissions.set(permissions)
+    for person in persons:
+        person.roles.set(roles)
+
+    return {
+        "client": client,
+        "permission": permissions[0],
+        "role": roles[0],
+        "person": persons[0],
+    }
+
+
+@pytest.mark.django_db
+def test_permission_list_queries(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    # collection version plus the page
+    with django_assert_num_queries(2):
+        response = client.get(reverse("permission-list"))
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_permission_detail_queries(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    url = reverse("permission-detail", kwargs={"pk": setup_data["permission"].id})
+    with django_assert_num_queries(1):
+        response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_role_list_view_queries(setup_data, django_assert_num_queries):
+    request = APIRequestFactory().get("/ecommerce/roles/")
+    # collection version, page, permission ids and included role ids
+    with django_assert_num_queries(4):
+        response = views.RoleList.as_view()(request)
+        response.render()
+    assert len(response.data["results"]) == 10
+    assert len(response.data["results"][0]["permissions"]) == 10
+
+
+@pytest.mark.django_db
+def test_role_list_queries(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    with django_assert_num_queries(4):
+        response = client.get(reverse("role-list"))
+    assert len(response.data["results"]) == 10
+
+
+@pytest.mark.django_db
+def test_role_detail_queries(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    url = reverse("role-detail", kwargs={"pk": setup_data["role"].id})
+    with django_assert_num_queries(3):
+        response = client.get(url)
+    assert len(response.data["permissions"]) == 10
+
+
+@pytest.mark.django_db
+def test_person_list_queries(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    with django_assert_num_queries(3):
+        response = client.get(reverse("person-list"))
+    assert len(response.data["results"]) == 10
+
+
+@pytest.mark.django_db
+def test_person_detail_queries(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    url = reverse("person-detail", kwargs={"pk": setup_data["person"].id})
+    with django_assert_num_queries(2):
+        response = client.get(url)
+    assert len(response.data["roles"]) == 10
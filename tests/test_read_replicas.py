@@ -0,0 +1,93 @@
+import contextvars
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce import routers
+from ecommerce.models import Permission, Role, Person
+from ecommerce.routers import (
+    PIN_COOKIE,
+    PrimaryPinningMiddleware,
+    PrimaryReplicaRouter,
+    is_pinned,
+)
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    role1 = Role.objects.create(name="Role 1")
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+
+    return {"client": client, "role1": role1, "person1": person1}
+
+
+def in_new_context(func):
+    def run():
+        routers._state.set({"pinned": False, "wrote": False})
+        return func()
+
+    return contextvars.copy_context().run(run)
+
+
+def test_router_reads_from_replica_until_write(settings):
+    settings.ECOMMERCE_READ_REPLICAS = ["replica1"]
+    router = PrimaryReplicaRouter()
+
+    def route():
+        before = router.db_for_read(Permission)
+        write = router.db_for_write(Permission)
+        after = router.db_for_read(Permission)
+        return before, write, after
+
+    assert in_new_context(route) == ("replica1", "default", "default")
+
+
+def test_router_without_replicas_uses_primary():
+    router = PrimaryReplicaRouter()
+    assert in_new_context(lambda: router.db_for_read(Permission)) == "default"
+
+
+def test_middleware_pins_client_after_write(settings):
+    settings.ECOMMERCE_PRIMARY_PIN_SECONDS = 5
+    factory = RequestFactory()
+    seen = []
+
+    def write(request):
+        PrimaryReplicaRouter().db_for_write(Role)
+        return HttpResponse()
+
+    def read(request):
+        seen.append(is_pinned())
+        return HttpResponse()
+
+    response = in_new_context(
+        lambda: PrimaryPinningMiddleware(write)(factory.post("/"))
+    )
+    cookie = response.cookies[PIN_COOKIE]
+    assert cookie["max-age"] == 5
+
+    middleware = PrimaryPinningMiddleware(read)
+    in_new_context(lambda: middleware(factory.get("/")))
+    factory.cookies[PIN_COOKIE] = cookie.value
+    response = in_new_context(lambda: middleware(factory.get("/")))
+    assert seen == [False, True]
+    assert PIN_COOKIE not in response.cookies
+
+
+@pytest.mark.django_db
+def test_add_role_sets_pin_cookie(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    role1 = setup_data["role1"]
+    url = reverse("person-detail", kwargs={"pk": person1.id}) + "add_role/"
+    response = client.post(url, {"role_id": role1.id}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert PIN_COOKIE in response.cookies
+
+    response = client.get(reverse("person-detail", kwargs={"pk": person1.id}))
+    assert response.json()["roles"] == [role1.id]
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.http import JsonResponse
+from django.test import AsyncClient, RequestFactory
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.middleware import (
+    RequestStatsMiddleware,
+    current_recorder,
+    percentile,
+    record_query,
+    request_stats,
+)
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data(settings):
+    settings.ECOMMERCE_REQUEST_STATS = {"EXPOSE_STATS": True}
+    request_stats.reset()
+    client = APIClient()
+
+    Permission.objects.create(code="perm_1", name="Permission 1")
+    Role.objects.create(name="Role 1")
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+
+    return {"client": client, "person1": person1}
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 51
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) is None
+
+
+@pytest.mark.django_db
+def test_server_timing_header(setup_data):
+    client = setup_data["client"]
+    response = client.get(reverse("person-list"))
+    assert response.status_code == status.HTTP_200_OK
+    timing = response.headers["Server-Timing"]
+    assert 'desc="3 queries"' in timing
+    assert "total;dur=" in timing
+    assert "nplusone" not in timing
+
+
+@pytest.mark.django_db
+def test_stats_endpoint_reports_per_url_name(setup_data):
+    client = setup_data["client"]
+    url = reverse("person-detail", kwargs={"pk": setup_data["person1"].id})
+    for _ in range(3):
+        client.get(url)
+
+    response = client.get(reverse("request-stats"))
+    assert response.status_code == status.HTTP_200_OK
+    stats = response.data["person-detail"]
+    assert stats["requests"] == 3
+    assert stats["queries"]["p50"] == 2
+    assert stats["wall_ms"]["p99"] >= stats["db_ms"]["p99"]
+
+
+@pytest.mark.django_db
+def test_stats_endpoint_can_be_hidden(setup_data, settings):
+    settings.ECOMMERCE_REQUEST_STATS = {"EXPOSE_STATS": False}
+    response = setup_data["client"].get(reverse("request-stats"))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_repeated_queries_are_flagged(setup_data, caplog):
+    def view(request):
+        for _ in range(3):
+            list(Person.objects.filter(pk=1))
+        return JsonResponse({})
+
+    middleware = RequestStatsMiddleware(view)
+    response = middleware(RequestFactory().get("/"))
+    assert "nplusone" in response.headers["Server-Timing"]
+    assert "Repeated queries" in caplog.text
+    # One permanent wrapper, which records nothing outside a request.
+    assert connection.execute_wrappers == [record_query]
+    assert current_recorder.get() is None
+
+
+@pytest.mark.django_db
+def test_concurrent_async_requests_record_their_own_queries(setup_data):
+    role_id = Role.objects.get().id
+    url = reverse("async-role-detail", kwargs={"pk": role_id})
+
+    async def fetch_all():
+        client = AsyncClient()
+        return await asyncio.gather(*(client.get(url) for _ in range(10)))
+
+    for response in async_to_sync(fetch_all)():
+        assert response.status_code == status.HTTP_200_OK
+        timing = response.headers["Server-Timing"]
+        assert 'desc="3 queries"' in timing
+        assert "nplusone" not in timing
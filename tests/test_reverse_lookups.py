@@ -0,0 +1,110 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce import materialized
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="perm_2", name="Permission 2")
+
+    role1 = Role.objects.create(name="Role 1")
+    role2 = Role.objects.create(name="Role 2")
+    role3 = Role.objects.create(name="Role 3")
+    role1.permissions.add(permission1)
+    role2.permissions.add(permission1, permission2)
+    role3.permissions.add(permission2)
+
+    persons = Person.objects.bulk_create(
+        Person(name=f"Person {i}", email=f"person{i}@example.com") for i in range(5)
+    )
+    # Person 0 holds permission 1 through two roles
+    persons[0].roles.add(role1, role2)
+    for person in persons[1:4]:
+        person.roles.add(role1)
+    persons[4].roles.add(role3)
+
+    return {
+        "client": client,
+        "permission1": permission1,
+        "permission2": permission2,
+        "role1": role1,
+        "role2": role2,
+        "persons": persons,
+    }
+
+
+def ids(response):
+    return [item["id"] for item in response.json()["results"]]
+
+
+@pytest.mark.django_db
+def test_permission_roles(setup_data):
+    client = setup_data["client"]
+    url = reverse("permission-roles", kwargs={"pk": setup_data["permission1"].id})
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["results"] == [
+        {"id": setup_data["role1"].id, "name": "Role 1"},
+        {"id": setup_data["role2"].id, "name": "Role 2"},
+    ]
+    assert response.json()["count"] == 2
+    assert response.json()["count_exact"] is True
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("materialize", [False, True])
+def test_permission_persons(setup_data, settings, materialize):
+    client = setup_data["client"]
+    persons = setup_data["persons"]
+    if materialize:
+        settings.ECOMMERCE_MATERIALIZE_PERMISSIONS = True
+        materialized.rebuild()
+    url = reverse("permission-persons", kwargs={"pk": setup_data["permission1"].id})
+
+    first = client.get(url, {"page_size": 3})
+    assert first.status_code == status.HTTP_200_OK
+    assert first.json()["count"] == 4
+    assert ids(first) == [person.id for person in persons[:3]]
+
+    second = client.get(first.json()["next"])
+    assert ids(second) == [persons[3].id]
+    assert second.json()["next"] is None
+
+
+@pytest.mark.django_db
+def test_permission_persons_queries(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    url = reverse("permission-persons", kwargs={"pk": setup_data["permission2"].id})
+    # permission lookup, count and page
+    with django_assert_num_queries(3):
+        response = client.get(url)
+    assert ids(response) == [setup_data["persons"][0].id, setup_data["persons"][4].id]
+
+
+@pytest.mark.django_db
+def test_role_persons(setup_data):
+    client = setup_data["client"]
+    persons = setup_data["persons"]
+    url = reverse("role-persons", kwargs={"pk": setup_data["role1"].id})
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert ids(response) == [person.id for person in persons[:4]]
+    assert response.json()["results"][0] == {
+        "id": persons[0].id,
+        "name": "Person 0",
+        "email": "person0@example.com",
+    }
+
+
+@pytest.mark.django_db
+def test_reverse_lookups_not_found(setup_data):
+    client = setup_data["client"]
+    for name in ("permission-roles", "permission-persons", "role-persons"):
+        response = client.get(reverse(name, kwargs={"pk": 9999}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
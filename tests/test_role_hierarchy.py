@@ -0,0 +1,194 @@
+import io
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce import materialized
+from ecommerce.export import iter_export
+from ecommerce.importer import import_lines
+from ecommerce.models import Permission, Role, RoleClosure, Person, Tenant
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="perm_2", name="Permission 2")
+    permission3 = Permission.objects.create(code="perm_3", name="Permission 3")
+
+    # admin includes editor, which includes viewer
+    viewer = Role.objects.create(name="Viewer")
+    editor = Role.objects.create(name="Editor")
+    admin = Role.objects.create(name="Admin")
+    viewer.permissions.add(permission1)
+    editor.permissions.add(permission2)
+    admin.permissions.add(permission3)
+    editor.includes.add(viewer)
+    admin.includes.add(editor)
+
+    person1 = Person.objects.create(name="Person 1", email="person1@example.com")
+    person1.roles.add(admin)
+
+    return {
+        "client": client,
+        "permission1": permission1,
+        "permission2": permission2,
+        "permission3": permission3,
+        "viewer": viewer,
+        "editor": editor,
+        "admin": admin,
+        "person1": person1,
+    }
+
+
+def closure():
+    return set(
+        RoleClosure.objects.exclude(ancestor=F("descendant")).values_list(
+            "ancestor__name", "descendant__name", "paths"
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_permissions_are_inherited(setup_data):
+    person1 = setup_data["person1"]
+    assert person1.get_permission_codes() == {"perm_1", "perm_2", "perm_3"}
+    assert set(person1.get_permissions().values_list("code", flat=True)) == {
+        "perm_1",
+        "perm_2",
+        "perm_3",
+    }
+    assert list(setup_data["permission1"].get_persons()) == [person1]
+    assert set(setup_data["permission1"].get_roles()) == {
+        setup_data["viewer"],
+        setup_data["editor"],
+        setup_data["admin"],
+    }
+
+
+@pytest.mark.django_db
+def test_cache_follows_hierarchy_changes(setup_data):
+    person1 = setup_data["person1"]
+    editor = setup_data["editor"]
+    assert person1.get_permission_codes() == {"perm_1", "perm_2", "perm_3"}
+
+    permission4 = Permission.objects.create(code="perm_4", name="Permission 4")
+    setup_data["viewer"].permissions.add(permission4)
+    assert "perm_4" in person1.get_permission_codes()
+
+    editor.includes.remove(setup_data["viewer"])
+    assert person1.get_permission_codes() == {"perm_2", "perm_3"}
+
+    editor.delete()
+    assert person1.get_permission_codes() == {"perm_3"}
+
+
+@pytest.mark.django_db
+def test_cycles_are_rejected(setup_data):
+    viewer = setup_data["viewer"]
+    # m2m add() does not use a savepoint, so give it one here.
+    with pytest.raises(ValidationError), transaction.atomic():
+        viewer.includes.add(setup_data["admin"])
+    with pytest.raises(ValidationError), transaction.atomic():
+        viewer.includes.add(viewer)
+    assert not viewer.includes.exists()
+
+    client = setup_data["client"]
+    url = reverse("role-detail", kwargs={"pk": viewer.pk})
+    response = client.patch(url, {"includes": [setup_data["editor"].pk]}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "includes" in response.data
+
+    response = client.patch(url, {"includes": []}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["includes"] == []
+
+
+@pytest.mark.django_db
+def test_include_writers_lock_the_tenant(setup_data):
+    role = Role.objects.create(name="Auditor")
+    with CaptureQueriesContext(connection) as queries:
+        role.includes.add(setup_data["viewer"])
+    tables = [Tenant._meta.db_table, RoleClosure._meta.db_table]
+    first = [
+        next(i for i, query in enumerate(queries) if table in query["sql"])
+        for table in tables
+    ]
+    # Before the cycle check reads the closure.
+    assert first[0] < first[1]
+
+
+@pytest.mark.django_db
+def test_closure_counts_paths(setup_data):
+    admin = setup_data["admin"]
+    viewer = setup_data["viewer"]
+    assert closure() == {
+        ("Admin", "Editor", 1),
+        ("Admin", "Viewer", 1),
+        ("Editor", "Viewer", 1),
+    }
+
+    # A second chain from admin to viewer
+    admin.includes.add(viewer)
+    assert ("Admin", "Viewer", 2) in closure()
+
+    setup_data["editor"].includes.remove(viewer)
+    assert closure() == {("Admin", "Editor", 1), ("Admin", "Viewer", 1)}
+    assert setup_data["person1"].get_permission_codes() == {
+        "perm_1",
+        "perm_2",
+        "perm_3",
+    }
+
+    expected = closure()
+    call_command("rebuild_role_closure", stdout=io.StringIO())
+    assert closure() == expected
+
+
+@pytest.mark.django_db
+def test_materialized_permissions_follow_includes(setup_data, settings):
+    settings.ECOMMERCE_MATERIALIZE_PERMISSIONS = True
+    materialized.rebuild()
+    person1 = setup_data["person1"]
+    viewer = setup_data["viewer"]
+
+    setup_data["editor"].includes.remove(viewer)
+    assert materialized.verify() == (0, 0)
+    assert set(person1.get_permissions().values_list("code", flat=True)) == {
+        "perm_2",
+        "perm_3",
+    }
+
+    viewer.included_by.add(setup_data["admin"])
+    assert materialized.verify() == (0, 0)
+    assert "perm_1" in set(person1.get_permissions().values_list("code", flat=True))
+
+    setup_data["editor"].delete()
+    assert materialized.verify() == (0, 0)
+
+
+@pytest.mark.django_db
+def test_role_includes_round_trip(setup_data):
+    dump = "".join(iter_export("role_includes", "ndjson"))
+    Role.includes.through.objects.all().delete()
+    call_command("rebuild_role_closure", stdout=io.StringIO())
+
+    report = import_lines(dump.splitlines(), resource="role_includes")
+    assert report["errors"] == []
+    assert report["assigned"] == {"role_includes": 2}
+    assert list(setup_data["admin"].includes.all()) == [setup_data["editor"]]
+
+    report = import_lines(
+        ['{"role_id": "Viewer", "included_role_id": "Admin"}'],
+        resource="role_includes",
+    )
+    assert report["assigned"] == {}
+    assert report["errors"][0]["line"] == 1
+    assert not setup_data["viewer"].includes.exists()
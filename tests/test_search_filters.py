@@ -0,0 +1,117 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.filters import PersonFilter
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    permission2 = Permission.objects.create(code="other", name="Other")
+    role1 = Role.objects.create(name="Role 1")
+    role2 = Role.objects.create(name="Admin")
+    role1.permissions.add(permission1)
+    role2.permissions.add(permission2)
+    role2.includes.add(role1)
+    person1 = Person.objects.create(name="Alice Smith", email="Alice@Example.com")
+    person2 = Person.objects.create(name="Bob Smithson", email="bob@example.com")
+    person1.roles.add(role1)
+    person2.roles.add(role2)
+
+    return {
+        "client": client,
+        "permission1": permission1,
+        "permission2": permission2,
+        "role1": role1,
+        "role2": role2,
+        "person1": person1,
+        "person2": person2,
+    }
+
+
+def ids(client, url_name, **params):
+    response = client.get(reverse(url_name), params)
+    assert response.status_code == status.HTTP_200_OK
+    return [item["id"] for item in response.data["results"]]
+
+
+@pytest.mark.django_db
+def test_person_filters(setup_data):
+    client = setup_data["client"]
+    person1 = setup_data["person1"]
+    person2 = setup_data["person2"]
+
+    assert ids(client, "person-list", email="alice@example.COM") == [person1.id]
+    assert ids(client, "person-list", name="ali") == [person1.id]
+    assert ids(client, "person-list", name="smith") == []
+    assert ids(client, "person-list", search="SMITH") == [person1.id, person2.id]
+    assert ids(client, "person-list", search="smithson") == [person2.id]
+    assert ids(client, "person-list", role=setup_data["role2"].id) == [person2.id]
+    # perm_1 is granted to Admin through the included role
+    assert ids(client, "person-list", permission="perm_1") == [person1.id, person2.id]
+    assert ids(client, "person-list", permission="other", name="b") == [person2.id]
+
+
+@pytest.mark.django_db
+def test_role_and_permission_filters(setup_data):
+    client = setup_data["client"]
+    role1 = setup_data["role1"]
+    role2 = setup_data["role2"]
+
+    assert ids(client, "role-list", name="Ro") == [role1.id]
+    assert ids(client, "role-list", permission="perm_1") == [role1.id, role2.id]
+    assert ids(client, "role-list", permission="other") == [role2.id]
+    assert ids(client, "permission-list", code="per") == [setup_data["permission1"].id]
+
+
+@pytest.mark.django_db
+def test_invalid_filters(setup_data):
+    client = setup_data["client"]
+    for params in ({"role": "x"}, {"search": "ab"}, {"permission": "too_long"}):
+        response = client.get(reverse("person-list"), params)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    # Detail requests ignore list filters.
+    url = reverse("person-detail", kwargs={"pk": setup_data["person1"].id})
+    assert client.get(url, {"email": "nobody"}).status_code == status.HTTP_200_OK
+
+
+def plan(params):
+    query = PersonFilter(data=params)
+    assert query.is_valid(), query.errors
+    return query.filter(Person.objects.all()).explain()
+
+
+@pytest.fixture
+def many_persons(setup_data):
+    role1 = setup_data["role1"]
+    persons = Person.objects.bulk_create(
+        Person(name=f"Person {i:05d}", email=f"person{i}@example.com")
+        for i in range(5000)
+    )
+    Person.roles.through.objects.bulk_create(
+        Person.roles.through(person_id=person.pk, role_id=role1.pk)
+        for person in persons[:50]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return persons
+
+
+@pytest.mark.django_db
+def test_filters_use_indexes(many_persons):
+    assert "person_email_upper_idx" in plan({"email": "PERSON42@example.com"})
+    assert "person_roles_role_person_idx" in plan({"role": 1})
+
+
+@pytest.mark.django_db
+def test_name_search_uses_indexes(many_persons):
+    if connection.vendor != "postgresql":
+        pytest.skip("The name indexes are PostgreSQL only.")
+    assert "person_name_upper_idx" in plan({"name": "person 001"})
+    assert "person_name_trgm_idx" in plan({"search": "son 0042"})
@@ -0,0 +1,113 @@
+import gzip
+import json
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.models import Permission, Role, Person
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+
+    permissions = Permission.objects.bulk_create(
+        Permission(code=f"perm_{i}", name=f"Permission {i}") for i in range(5)
+    )
+    role1 = Role.objects.create(name="Role 1")
+    role1.permissions.set(permissions)
+    persons = Person.objects.bulk_create(
+        Person(name=f"Person {i}", email=f"person{i}@example.com") for i in range(50)
+    )
+    for person in persons:
+        person.roles.add(role1)
+
+    return {"client": client, "role1": role1, "person1": persons[0]}
+
+
+@pytest.mark.django_db
+def test_list_fields(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    # collection version plus the page, no through-table query
+    with django_assert_num_queries(2):
+        response = client.get(reverse("person-list"), {"fields": "id,name"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["results"][0] == {
+        "id": setup_data["person1"].id,
+        "name": "Person 0",
+    }
+
+
+@pytest.mark.django_db
+def test_list_exclude(setup_data):
+    client = setup_data["client"]
+    response = client.get(reverse("role-list"), {"exclude": "id,permissions,includes"})
+    assert response.json()["results"] == [{"name": "Role 1"}]
+
+    response = client.get(reverse("permission-list"), {"fields": "code"})
+    assert response.json()["results"][0] == {"code": "perm_0"}
+
+
+@pytest.mark.django_db
+def test_list_without_id_across_pages(setup_data):
+    client = setup_data["client"]
+    response = client.get(
+        reverse("person-list"), {"exclude": "id,roles", "page_size": 2}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["results"] == [
+        {"name": "Person 0", "email": "person0@example.com"},
+        {"name": "Person 1", "email": "person1@example.com"},
+    ]
+
+    response = client.get(response.json()["next"])
+    assert [row["name"] for row in response.json()["results"]] == [
+        "Person 2",
+        "Person 3",
+    ]
+
+
+@pytest.mark.django_db
+def test_detail_fields(setup_data, django_assert_num_queries):
+    client = setup_data["client"]
+    url = reverse("role-detail", kwargs={"pk": setup_data["role1"].id})
+    with django_assert_num_queries(1):
+        response = client.get(url, {"fields": "name"})
+    assert response.json() == {"name": "Role 1"}
+
+    response = client.get(url, {"exclude": "name"})
+    assert list(response.json()) == ["id", "permissions", "includes"]
+
+
+@pytest.mark.django_db
+def test_unknown_field(setup_data):
+    client = setup_data["client"]
+    response = client.get(reverse("person-list"), {"fields": "id,password"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"fields": ["Unknown field 'password'."]}
+
+
+@pytest.mark.django_db
+def test_fields_ignored_on_writes(setup_data):
+    client = setup_data["client"]
+    response = client.post(
+        reverse("role-list") + "?fields=id",
+        {"name": "Role 2", "permissions": []},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert set(response.json()) == {"id", "name", "permissions", "includes"}
+
+
+@pytest.mark.django_db
+def test_gzip_is_negotiated(setup_data):
+    client = setup_data["client"]
+    url = reverse("person-list")
+    plain = client.get(url)
+    assert "Content-Encoding" not in plain.headers
+
+    response = client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.content) < len(plain.content)
+    assert json.loads(gzip.decompress(response.content)) == plain.json()
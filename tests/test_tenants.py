@@ -0,0 +1,282 @@
+import importlib
+import json
+import warnings
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import clear_url_caches, reverse
+from django.utils.deprecation import RemovedInDjango60Warning
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce.bitsets import get_permission_bits
+from ecommerce.models import (
+    ChangeLogEntry,
+    Permission,
+    PersonRole,
+    Role,
+    Person,
+    Tenant,
+)
+from ecommerce.tenants import tenant_scope
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+    other_client = APIClient()
+
+    tenant1 = Tenant.objects.get(pk=1)
+    tenant2 = Tenant.objects.create(name="Tenant 2")
+    other_client.credentials(HTTP_X_TENANT=str(tenant2.pk))
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+    role1 = Role.objects.create(name="Admin")
+    role1.permissions.add(permission1)
+    person1 = Person.objects.create(name="Person 1", email="person@example.com")
+    person1.roles.add(role1)
+    with tenant_scope(tenant2.pk):
+        permission2 = Permission.objects.create(code="perm_1", name="Permission 1")
+        role2 = Role.objects.create(name="Admin")
+        role2.permissions.add(permission2)
+        person2 = Person.objects.create(name="Person 2", email="person@example.com")
+        person2.roles.add(role2)
+
+    return {
+        "client": client,
+        "other_client": other_client,
+        "tenant1": tenant1,
+        "tenant2": tenant2,
+        "permission1": permission1,
+        "permission2": permission2,
+        "role1": role1,
+        "role2": role2,
+        "person1": person1,
+        "person2": person2,
+    }
+
+
+def reload_views():
+    import eco.urls
+    import ecommerce.serializers
+    import ecommerce.urls
+    import ecommerce.views
+
+    with warnings.catch_warnings():
+        # DRF registers its format suffix converter again.
+        warnings.simplefilter("ignore", RemovedInDjango60Warning)
+        for module in (
+            ecommerce.serializers,
+            ecommerce.views,
+            ecommerce.urls,
+            eco.urls,
+        ):
+            importlib.reload(module)
+    clear_url_caches()
+
+
+@pytest.fixture
+def views_loaded_by_tenant1():
+    # Like a first request without the header loading the URLconf lazily.
+    with tenant_scope(1):
+        reload_views()
+    yield
+    reload_views()
+
+
+def ids(client, url_name):
+    response = client.get(reverse(url_name))
+    assert response.status_code == status.HTTP_200_OK
+    return [item["id"] for item in response.data["results"]]
+
+
+@pytest.mark.django_db
+def test_rows_belong_to_the_active_tenant(setup_data):
+    tenant2 = setup_data["tenant2"]
+    assert setup_data["person1"].tenant == setup_data["tenant1"]
+    assert setup_data["person2"].tenant == tenant2
+    assert PersonRole.all_tenants.get(person=setup_data["person2"]).tenant == tenant2
+    assert Person.objects.count() == 2
+    with tenant_scope(tenant2.pk):
+        assert list(Person.objects.all()) == [setup_data["person2"]]
+        assert list(Role.objects.filter(persons__isnull=False)) == [setup_data["role2"]]
+
+
+@pytest.mark.django_db
+def test_views_only_see_the_callers_tenant(setup_data):
+    client = setup_data["client"]
+    other_client = setup_data["other_client"]
+
+    assert ids(client, "person-list") == [setup_data["person1"].id]
+    assert ids(other_client, "person-list") == [setup_data["person2"].id]
+    assert ids(other_client, "role-list") == [setup_data["role2"].id]
+    assert ids(other_client, "permission-list") == [setup_data["permission2"].id]
+
+    url = reverse("person-detail", kwargs={"pk": setup_data["person1"].id})
+    assert other_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+    url = reverse("async-role-detail", kwargs={"pk": setup_data["role1"].id})
+    tenant_id = str(setup_data["tenant2"].pk)
+    response = async_to_sync(AsyncClient().get)(url, headers={"X-Tenant": tenant_id})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    url = reverse("permission-persons", kwargs={"pk": setup_data["permission2"].id})
+    response = other_client.get(url)
+    assert [row["id"] for row in response.data["results"]] == [setup_data["person2"].id]
+
+
+@pytest.mark.django_db
+def test_querysets_built_at_import_are_not_bound(setup_data, views_loaded_by_tenant1):
+    other_client = setup_data["other_client"]
+    assert ids(other_client, "permission-list") == [setup_data["permission2"].id]
+
+    # Related fields and unique validators of the serializers check the
+    # caller's tenant.
+    response = other_client.post(
+        reverse("role-list"),
+        {"name": "Editor", "permissions": [setup_data["permission2"].id]},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    response = other_client.post(
+        reverse("role-list"), {"name": "Editor", "permissions": []}, format="json"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_writes_stay_in_the_callers_tenant(setup_data):
+    other_client = setup_data["other_client"]
+    role1 = setup_data["role1"]
+
+    response = other_client.post(
+        reverse("role-list"),
+        {"name": "Editor", "permissions": [setup_data["permission2"].id]},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Role.objects.get(pk=response.data["id"]).tenant == setup_data["tenant2"]
+
+    # Names are unique per tenant.
+    response = other_client.post(
+        reverse("role-list"), {"name": "Editor", "permissions": []}, format="json"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data["name"] == ["role with this name already exists."]
+    response = setup_data["client"].post(
+        reverse("role-list"), {"name": "Editor", "permissions": []}, format="json"
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    # Rows of other tenants cannot be referenced.
+    response = other_client.post(
+        reverse("role-list"),
+        {"name": "Viewer", "permissions": [setup_data["permission1"].id]},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    url = reverse("person-add-roles", kwargs={"pk": setup_data["person2"].id})
+    response = other_client.post(url, {"role_ids": [role1.id]}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["results"] == [{"role_id": role1.id, "status": "not_found"}]
+    assert not setup_data["person2"].roles.filter(pk=role1.id).exists()
+
+
+@pytest.mark.django_db
+def test_permission_checks_ignore_other_tenants(setup_data):
+    person1 = setup_data["person1"]
+    person2 = setup_data["person2"]
+    data = {"person_ids": [person1.id, person2.id], "codes": ["perm_1"]}
+
+    # The first request caches both persons.
+    response = setup_data["client"].post(
+        reverse("permission-check"), data, format="json"
+    )
+    assert response.data["matrix"] == [[True], [False]]
+    response = setup_data["other_client"].post(
+        reverse("permission-check"), data, format="json"
+    )
+    assert response.data["matrix"] == [[False], [True]]
+
+
+@pytest.mark.django_db
+def test_bits_are_allocated_per_tenant(setup_data):
+    assert setup_data["permission1"].bit == setup_data["permission2"].bit == 0
+    with tenant_scope(setup_data["tenant2"].pk):
+        permission3 = Permission.objects.create(code="perm_3", name="Permission 3")
+        assert get_permission_bits() == {"perm_1": 0, "perm_3": 1}
+    assert setup_data["person2"].get_permission_mask() == 1
+    assert get_permission_bits() == {"perm_1": 0}
+    assert permission3.bit == 1
+
+
+@pytest.mark.django_db
+def test_export_and_change_feed_are_scoped(setup_data):
+    other_client = setup_data["other_client"]
+
+    url = reverse("export", kwargs={"resource": "all", "file_format": "ndjson"})
+    response = other_client.get(url)
+    records = [json.loads(line) for line in response.getvalue().splitlines()]
+    assert {record["type"]: record for record in records}["role_permissions"] == {
+        "type": "role_permissions",
+        "role_id": setup_data["role2"].id,
+        "permission_id": setup_data["permission2"].id,
+    }
+    assert [record["id"] for record in records if record["type"] == "persons"] == [
+        setup_data["person2"].id
+    ]
+
+    response = other_client.get(reverse("change-feed"), {"since": 0})
+    assert {change["type"] for change in response.data["changes"]} == {
+        "permissions",
+        "roles",
+        "persons",
+        "role_permissions",
+        "person_roles",
+    }
+    assert (
+        len(response.data["changes"])
+        == ChangeLogEntry.objects.filter(tenant=setup_data["tenant2"]).count()
+    )
+
+
+@pytest.mark.django_db
+def test_changes_outside_requests_keep_the_rows_tenant(setup_data):
+    role2 = setup_data["role2"]
+    with tenant_scope(setup_data["tenant2"].pk):
+        permission = Permission.objects.create(code="perm_2", name="Permission 2")
+    version = ChangeLogEntry.objects.latest("version").version
+
+    # Like a management command, with no tenant active.
+    role2.permissions.add(permission)
+    role2.includes.add(Role.all_tenants.create(name="Viewer", tenant=role2.tenant))
+    setup_data["person2"].roles.remove(role2)
+
+    entries = ChangeLogEntry.objects.filter(version__gt=version)
+    assert {(entry.resource, entry.tenant_id) for entry in entries} == {
+        ("roles", setup_data["tenant2"].pk),
+        ("role_permissions", setup_data["tenant2"].pk),
+        ("role_includes", setup_data["tenant2"].pk),
+        ("person_roles", setup_data["tenant2"].pk),
+    }
+
+
+@pytest.mark.django_db
+def test_validators_differ_per_tenant(setup_data):
+    url = reverse("permission-list")
+    response = setup_data["client"].get(url)
+    assert "X-Tenant" in response.headers["Vary"]
+
+    response = setup_data["other_client"].get(
+        url, HTTP_IF_NONE_MATCH=response.headers["ETag"]
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert "X-Tenant" in response.headers["Vary"]
+
+
+@pytest.mark.django_db
+def test_invalid_tenant_header(setup_data):
+    client = APIClient()
+    for value, detail in [("x", "Invalid tenant."), ("999", "Unknown tenant.")]:
+        response = client.get(reverse("person-list"), HTTP_X_TENANT=value)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {"detail": detail}
@@ -0,0 +1,100 @@
+import asyncio
+import importlib
+import sys
+import threading
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ecommerce import warmup
+from ecommerce.bitsets import catalog_key
+from ecommerce.cache import get_permission_cache
+from ecommerce.models import Permission
+
+
+@pytest.fixture(scope="function")
+def setup_data():
+    client = APIClient()
+    warmup.warmup_state.reset()
+
+    permission1 = Permission.objects.create(code="perm_1", name="Permission 1")
+
+    yield {
+        "client": client,
+        "permission1": permission1,
+    }
+    warmup.warmup_state.reset()
+
+
+def fail():
+    raise RuntimeError("database unavailable")
+
+
+@pytest.mark.django_db
+def test_ready_only_after_warm_up(setup_data):
+    client = setup_data["client"]
+    url = reverse("readiness")
+
+    response = client.get(url)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.data["ready"] is False
+
+    assert warmup.warm_up() is True
+    key = catalog_key(setup_data["permission1"].tenant_id)
+    assert get_permission_cache().get_many([key]) == {
+        key: {"perm_1": setup_data["permission1"].bit}
+    }
+
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["ready"] is True
+    assert response.data["error"] is None
+    assert list(response.data["steps"]) == warmup.DEFAULT_WARMUP["STEPS"]
+    assert response.data["startup_ms"] >= sum(response.data["steps"].values())
+
+
+@pytest.mark.django_db
+def test_failed_warm_up_is_retried(setup_data, settings, monkeypatch):
+    client = setup_data["client"]
+    settings.ECOMMERCE_WARMUP = {
+        "STEPS": ["ecommerce.warmup.compile_urls", "tests.test_warmup.fail"]
+    }
+
+    assert warmup.warm_up() is False
+    response = client.get(reverse("readiness"))
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.data["error"] == "tests.test_warmup.fail: database unavailable"
+    assert list(response.data["steps"]) == [
+        "ecommerce.warmup.compile_urls",
+        "tests.test_warmup.fail",
+    ]
+
+    monkeypatch.setattr("tests.test_warmup.fail", lambda: None)
+    response = client.get(reverse("readiness"))
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_warm_up_can_be_turned_off(setup_data, settings):
+    settings.ECOMMERCE_WARMUP = {"ENABLED": False}
+    assert warmup.warm_up() is True
+    assert warmup.warmup_state.steps == {}
+
+
+@pytest.mark.django_db
+def test_asgi_application_loads_in_the_event_loop(setup_data, settings):
+    settings.ECOMMERCE_WARMUP = {
+        "STEPS": ["ecommerce.warmup.compile_urls", "ecommerce.warmup.connect_databases"]
+    }
+
+    async def load():
+        # Like uvicorn importing the application from its running loop.
+        sys.modules.pop("eco.asgi", None)
+        importlib.import_module("eco.asgi")
+
+    asyncio.run(load())
+    for thread in threading.enumerate():
+        if thread.name == "warm-up":
+            thread.join()
+    assert warmup.warmup_state.ready is True